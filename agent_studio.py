@@ -1,91 +1,613 @@
 import os
 import sys
-import re
-from typing import Tuple, List
+import time
+import argparse
+import functools
+import importlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 
 # --- Tool Imports ---
 # Ensure the tools directory is in the Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'tools'))
-from topic_fetcher import fetch_topic
-from article_generator import generate_article
-from category_assigner import assign_category
-from image_creator import create_image
-from github_publisher import publish_to_github
-
-# --- Keyword Parsing ---
-def parse_keywords(topic_line: str) -> Tuple[str, List[str]]:
-    """Helper function to parse keywords from a string."""
-    primary_match = re.search(r"Primary:\s*(.*?)(;|$)", topic_line)
-    secondary_match = re.search(r"Secondary:\s*(.*)", topic_line)
-    primary_keyword = primary_match.group(1).strip() if primary_match else ""
-    if secondary_match and secondary_match.group(1):
-        secondary_keywords: List[str] = [kw.strip() for kw in secondary_match.group(1).split(',')]
-    else:
-        secondary_keywords: List[str] = []
-    return primary_keyword, secondary_keywords
+# Only stdlib-backed tools are imported up front. The tools that pull in openai, PyGithub,
+# requests or Pillow are loaded by import_tool() when their stage first runs, so a run
+# with nothing to do never pays for them.
+_started = time.perf_counter()
+from topic_queue import Topic, TopicQueue, parse_keywords
+from article_parser import clean_title, parse_article
+from stage_scheduler import Stage, StageError, run_stages
+from instrumentation import recorder, SamplingProfiler
+from run_checkpoint import RunCheckpoint, list_checkpoints
+_import_times: Dict[str, float] = {"(startup tools)": time.perf_counter() - _started}
 
-# --- Main Execution Logic ---
-def main():
-    """Main function to run the entire blog creation pipeline."""
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    github_token = os.getenv("GITHUB_TOKEN")
-    github_repo_name = os.getenv("GITHUB_REPO_NAME")
-
-    if not all([openai_api_key, github_token, github_repo_name]):
-        print("Error: Required environment variables are not set.")
-        sys.exit(1)
-
-    topic_line = fetch_topic()
-    if not topic_line or "처리할 주제가 없습니다" in topic_line:
-        print("No topics to process. Exiting.")
-        return
+def import_tool(module_name: str):
+    """Imports a tool module on first use and records how long that import took."""
+    # import_module, not a sys.modules lookup: it waits while another stage's thread is
+    # still initializing the same module.
+    first_use = module_name not in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    if first_use:
+        _import_times.setdefault(module_name, time.perf_counter() - started)
+    return module
 
-    print(f"--- Starting Blog Post Generation for topic ---")
-    print(f"Topic: {topic_line}")
-    print("----------------------------------------------------")
+def print_import_times() -> None:
+    """Prints the --import-time report: what this process imported and what it cost."""
+    print("--- Import Time ---")
+    for name, seconds in sorted(_import_times.items(), key=lambda item: -item[1]):
+        print(f"{name:<22}{seconds * 1000:>9.1f} ms")
+    print(f"{'(total runtime)':<22}{(time.perf_counter() - _started) * 1000:>9.1f} ms")
+    print("Run with `python -X importtime` for a per-module breakdown.")
+
+def llm_cache_stats() -> Dict[str, int]:
+    """Hit/miss counts of the LLM response cache, or zeros if no LLM call was made."""
+    llm_client = sys.modules.get("llm_client")
+    if llm_client is None:
+        return {"hits": 0, "misses": 0}
+    return {"hits": llm_client.llm_cache.hits, "misses": llm_client.llm_cache.misses}
+
+# --- Pipeline ---
+class RunSettings:
+    """Credentials and switches shared by every pipeline in a run."""
+    def __init__(self, openai_api_key: str, github_token: str, github_repo_name: str, stream: bool = False,
+                 duplicates: str = "flag"):
+        self.openai_api_key = openai_api_key
+        self.github_token = github_token
+        self.github_repo_name = github_repo_name
+        self.stream = stream
+        self.duplicates = duplicates
+
+def log(label: str, message: str) -> None:
+    """Prints a pipeline message prefixed with the topic it belongs to."""
+    print(f"[{label}] {message}", flush=True)
+
+def check_result(result: str, action: str) -> str:
+    """Turns the tools' "Error: ..." return convention into a StageError."""
+    if "Error:" in result or "오류:" in result:
+        raise StageError(f"Error: Failed to {action}: {result}")
+    return result
+
+def build_stages(settings: RunSettings, defer_publish: bool = False) -> List[Stage]:
+    """
+    Declares every pipeline stage with the inputs it really needs. The scheduler runs
+    stages whose inputs are ready in parallel, so new stages only need to be listed here.
+    With defer_publish the publish stage only renders the post for a later batch commit.
+    In streaming mode the article stage also emits `title` as soon as it has arrived,
+    and the image stage waits for it to rank the Pixabay hits against the title.
+    """
+    def article_stage(topic_line: str, primary_keyword: str, secondary_keywords: List[str], emit=None) -> str:
+        log(primary_keyword, "Generating article" + (" (streaming)" if settings.stream else ""))
 
+        def on_event(name: str, value: str) -> None:
+            if name == "title":
+                emit("title", value)
+            elif name == "section":
+                log(primary_keyword, f"Section received: {value}")
+
+        generate_article = import_tool("article_generator").generate_article
+        article = generate_article(primary_keyword, secondary_keywords, api_key=settings.openai_api_key,
+                                   stream=settings.stream, on_event=on_event if settings.stream else None,
+                                   topic_line=topic_line)
+        return check_result(article, "generate article")
+
+    def category_stage(primary_keyword: str) -> str:
+        log(primary_keyword, "Assigning category")
+        assign_category = import_tool("category_assigner").assign_category
+        return check_result(assign_category(primary_keyword, api_key=settings.openai_api_key), "assign category")
+
+    def image_stage(topic_line: str, primary_keyword: str, title: Optional[str] = None) -> str:
+        # create_image searches Pixabay on the keyword only, so it never waits for the whole
+        # article; a streamed title arrives within the first line and only re-ranks the hits.
+        # The image is claimed for the topic line, so release_images() can give it back.
+        log(primary_keyword, "Creating image")
+        create_image = import_tool("image_creator").create_image
+        return check_result(create_image("", primary_keyword, title=clean_title(title or ""), owner=topic_line),
+                            "create image")
+
+    def publish_stage(primary_keyword: str, article: str, category: str, image: str) -> str:
+        title = parse_article(article)["title"]
+        github_publisher = import_tool("github_publisher")
+        if defer_publish:
+            log(primary_keyword, "Staging post for the batch commit")
+            return github_publisher.build_post(title, article, category, image)
+        log(primary_keyword, "Publishing post")
+        return check_result(github_publisher.publish_to_github(
+            title=title,
+            full_article_content=article,
+            category=category,
+            image_local_path=image,
+            github_token=settings.github_token,
+            repo_name=settings.github_repo_name
+        ), "publish post")
+
+    return [
+        Stage("article", article_stage, inputs=("topic_line", "primary_keyword", "secondary_keywords"),
+              emits=("title",) if settings.stream else ()),
+        Stage("category", category_stage, inputs=("primary_keyword",)),
+        Stage("image", image_stage,
+              inputs=("topic_line", "primary_keyword", "title") if settings.stream else ("topic_line", "primary_keyword"),
+              required=False),
+        Stage("publish", publish_stage, inputs=("primary_keyword", "article", "category", "image")),
+    ]
+
+def save_output(checkpoint: RunCheckpoint, stage_name: str, func):
+    """Wraps a stage function so its result is written to the topic's run directory."""
+    @functools.wraps(func)
+    def wrapper(**kwargs):
+        return checkpoint.save(stage_name, func(**kwargs))
+    return wrapper
+
+def run_pipeline(topic_line: str, settings: RunSettings, pending_posts: Optional[Dict[str, dict]] = None) -> str:
+    """
+    Runs the full blog creation pipeline for a single topic line.
+    Failures are returned as "Error: ..." strings so one topic never takes down a batch.
+    When pending_posts is given, the rendered post is stored there under the topic line
+    instead of being published, so a batch can commit everything at once.
+    """
     primary_keyword, secondary_keywords = parse_keywords(topic_line)
     if not primary_keyword:
-        print("Error: Could not parse the primary keyword from the topic line.")
-        sys.exit(1)
-
-    # 1. Generate Article
-    print(f"Generating article for: {primary_keyword}")
-    article_content = generate_article(primary_keyword, secondary_keywords, api_key=openai_api_key)
-    if "Error:" in article_content:
-        print(f"Failed to generate article: {article_content}")
-        sys.exit(1)
-
-    # 2. Assign Category
-    print(f"Assigning category for: {primary_keyword}")
-    category = assign_category(primary_keyword, api_key=openai_api_key)
-    if "Error:" in category:
-        print(f"Failed to assign category: {category}")
-        sys.exit(1)
-
-    # 3. Create Image
-    print(f"Creating image for: {primary_keyword}")
-    body_content = "\n".join(article_content.split('\n')[2:])
-    image_path = create_image(body_content, primary_keyword)
-    if "Error:" in image_path:
-        print(f"Failed to create image: {image_path}")
-        # sys.exit(1)
-
-    # 4. Publish to GitHub
-    print(f"Publishing post for: {primary_keyword}")
-    title = article_content.split('\n')[0].strip()
-    result = publish_to_github(
-        title=title,
-        full_article_content=article_content,
-        category=category,
-        image_local_path=image_path,
-        github_token=github_token,
-        repo_name=github_repo_name
-    )
-    
+        return "Error: Could not parse the primary keyword from the topic line."
+
+    # Outputs of an earlier attempt are reused, so a retry never pays twice for them.
+    checkpoint = RunCheckpoint(topic_line)
+    saved = checkpoint.load()
+    if "publish" in saved:
+        return saved["publish"]
+    if saved:
+        log(primary_keyword, f"Resuming from saved stage(s): {', '.join(saved)}")
+
+    # Checked before anything is generated, so a near-duplicate costs no API calls.
+    if settings.duplicates != "off" and not saved:
+        with recorder.stage_timer("dedupe", topic_line):
+            match = import_tool("similarity_index").get_index().check_topic(primary_keyword, secondary_keywords)
+        if match:
+            duplicate = f"Duplicate: {match.score:.0%} similar to '{match.title}' ({match.doc_id})"
+            if settings.duplicates == "skip":
+                return duplicate
+            log(primary_keyword, f"Warning: {duplicate}. Generating anyway.")
+
+    defer_publish = pending_posts is not None
+    stages = [stage for stage in build_stages(settings, defer_publish) if stage.name not in saved]
+    for stage in stages:
+        if not (defer_publish and stage.name == "publish"):
+            stage.func = save_output(checkpoint, stage.name, stage.func)
+        stage.func = recorder.timed(stage.name, topic_line)(stage.func)
+    initial = {"topic_line": topic_line, "primary_keyword": primary_keyword, "secondary_keywords": secondary_keywords}
+    if "article" in saved:
+        initial["title"] = parse_article(saved["article"])["title"]  # what the skipped article stage would emit
+    context, errors = run_stages(stages, {**initial, **saved})
+
+    for name, error in errors.items():
+        log(primary_keyword, f"Stage '{name}' did not complete: {error}")
+    if "publish" not in context:
+        failures = [errors[stage.name] for stage in stages
+                    if stage.required and stage.name in errors and not errors[stage.name].startswith("Skipped")]
+        if not failures:
+            return "Error: The pipeline did not complete."
+        return failures[0] if failures[0].startswith("Error:") else f"Error: {failures[0]}"
+    if pending_posts is not None:
+        pending_posts[topic_line] = context["publish"]
+        return "Pending: Post is staged for the batch commit."
+    return context["publish"]
+
+def run_batch(topic_lines: List[str], concurrency: int, settings: RunSettings) -> List[Tuple[str, str]]:
+    """
+    Runs up to `concurrency` pipelines at once. Each pipeline is mostly network wait,
+    so threads are enough. A batch of several topics is published as a single commit.
+    Returns (topic_line, result) pairs in the original order.
+    """
+    pending_posts: Optional[Dict[str, dict]] = {} if len(topic_lines) > 1 else None
+    results: List[Tuple[str, str]] = [("", "")] * len(topic_lines)
+    durations: Dict[str, float] = {}
+    try:
+        # Before any post reserves a slug, so slugs avoid the posts already in the blog.
+        import_tool("github_publisher").prepare_manifest(settings.github_token, settings.github_repo_name)
+    except Exception as e:
+        print(f"Warning: Could not read the existing posts of '{settings.github_repo_name}' - {e}")
+
+    def timed_pipeline(topic_line: str) -> str:
+        started = time.perf_counter()
+        try:
+            return run_pipeline(topic_line, settings, pending_posts)
+        finally:
+            durations[topic_line] = time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(timed_pipeline, topic_line): index
+            for index, topic_line in enumerate(topic_lines)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = f"Error: An unexpected error occurred in the pipeline - {e}"
+            results[index] = (topic_lines[index], result)
+
+    if pending_posts:
+        github_publisher = import_tool("github_publisher")
+        staged_topics = list(pending_posts)
+        print(f"Publishing {len(staged_topics)} post(s) in a single commit...")
+        posts = [pending_posts[topic_line] for topic_line in staged_topics]
+        publish_results: Dict[str, str] = {}
+        try:
+            with recorder.stage_timer("batch-publish"):
+                publish_results = dict(zip(staged_topics, github_publisher.publish_posts(
+                    posts, settings.github_token, settings.github_repo_name)))
+        finally:
+            # Images of posts that did not go out stay in their run directory for the retry.
+            published = [topic_line for topic_line in staged_topics if publish_results.get(topic_line, "").startswith("Success")]
+            for topic_line in published:
+                RunCheckpoint(topic_line).save("publish", publish_results[topic_line])
+            github_publisher.cleanup_post_files([pending_posts[topic_line] for topic_line in published])
+        results = [(topic_line, publish_results.get(topic_line, result)) for topic_line, result in results]
+
+    for topic_line, result in results:
+        recorder.record_topic(topic_line, result, durations.get(topic_line, 0.0))
+    return results
+
+def release_images(topic_line: str) -> None:
+    """Frees the Pixabay images a topic claimed once it is parked for good, so other posts can use them."""
+    released = import_tool("image_creator").ImageLedger().release_topic(topic_line)
+    if released:
+        print(f"Released {released} image(s) claimed by: {topic_line}")
+
+def settle_topics(queue: TopicQueue, topics: List[Topic], results: List[Tuple[str, str]]) -> None:
+    """
+    Acks published topics, parks duplicates and returns failed ones to the queue with
+    their error. A failed topic keeps its run directory for the retry or `resume`;
+    its images are only released once it gives up, as are a duplicate's.
+    """
+    for topic, (_, result) in zip(topics, results):
+        if result.startswith("Duplicate:"):
+            queue.mark_duplicate(topic.id, result)
+            release_images(topic.line)
+        elif "Error:" in result:
+            RunCheckpoint(topic.line).record_failure(result)
+            status = queue.nack(topic.id, result)
+            if status == "failed":
+                print(f"Topic gave up after {topic.attempts + 1} attempt(s): {topic.line}")
+                release_images(topic.line)
+        else:
+            queue.ack(topic.id)
+            RunCheckpoint(topic.line).remove()
+
+def print_summary(results: List[Tuple[str, str]]) -> None:
+    """Prints one status line per processed topic."""
     print("--- Pipeline Finished ---")
-    print(f"Final Output: {result}")
+    for topic_line, result in results:
+        status = "FAILED" if "Error:" in result else "SKIPPED" if result.startswith("Duplicate:") else "OK"
+        print(f"[{status}] {topic_line}")
+        print(f"    {result}")
+    failed = sum(1 for _, result in results if "Error:" in result)
+    print(f"Processed {len(results)} topic(s): {len(results) - failed} succeeded, {failed} failed.")
+    cache = llm_cache_stats()
+    print(f"LLM cache: {cache['hits']} hit(s), {cache['misses']} miss(es) in this run.")
     print("-------------------------")
 
+# --- Commands ---
+def require_env(*names: str) -> Optional[List[str]]:
+    """Returns the values of the named environment variables, or prints which are unset and returns None."""
+    values = [os.getenv(name) for name in names]
+    missing = [name for name, value in zip(names, values) if not value]
+    if missing:
+        print(f"Error: Required environment variables are not set: {', '.join(missing)}.")
+        return None
+    return values
+
+def command_run(args: argparse.Namespace) -> int:
+    """Claims topics from the queue and runs the full pipeline for them."""
+    if args.no_cache:
+        os.environ["LLM_CACHE_BYPASS"] = "1"
+
+    env = require_env("OPENAI_API_KEY", "GITHUB_TOKEN", "GITHUB_REPO_NAME")
+    if env is None:
+        return 1
+    openai_api_key, github_token, github_repo_name = env
+
+    queue = TopicQueue()
+    try:
+        queue.import_file('topics.txt')
+    except FileNotFoundError:
+        print("Error: topics.txt was not found.")
+        return 1
+    topics = queue.claim(max(1, args.batch))
+    if not topics:
+        print("No topics to process. Exiting.")
+        return 0
+    topic_lines = [topic.line for topic in topics]
+
+    print(f"--- Starting Blog Post Generation for {len(topic_lines)} topic(s) ---")
+    for topic_line in topic_lines:
+        print(f"Topic: {topic_line}")
+    print("----------------------------------------------------")
+
+    if args.duplicates != "off":
+        counts = import_tool("similarity_index").get_index().sync_posts()
+        if counts["added"] or counts["updated"]:
+            print(f"Similarity index: {counts['added']} new and {counts['updated']} changed post(s) indexed.")
+
+    settings = RunSettings(openai_api_key, github_token, github_repo_name, stream=args.stream, duplicates=args.duplicates)
+    profiler = SamplingProfiler().start() if args.profile else None
+    # If the process dies before settling, the leases expire and the topics are retried.
+    results = run_batch(topic_lines, args.concurrency, settings)
+    settle_topics(queue, topics, results)
+    queue.export_file('topics.txt')
+    print_summary(results)
+
+    if profiler:
+        profile_path = profiler.stop(os.path.join("logs", f"profile-{recorder.run_id}.folded"))
+        print(f"Profile written to '{profile_path}' (render with flamegraph.pl or speedscope).")
+    log_path = recorder.append_to_log(
+        batch=args.batch,
+        concurrency=args.concurrency,
+        stream=args.stream,
+        llm_cache=llm_cache_stats(),
+        import_ms={name: round(seconds * 1000, 1) for name, seconds in _import_times.items()},
+    )
+    print(f"Run record appended to '{log_path}'.")
+
+    return 1 if any("Error:" in result for _, result in results) else 0
+
+def command_batch(args: argparse.Namespace) -> int:
+    """
+    Bulk generation through the OpenAI Batch API. `submit` claims topics for the length
+    of the completion window and sends their article/category requests as one batch.
+    `poll` (run from cron) downloads finished batches and publishes their topics through
+    the normal pipeline, with the batch answers standing in for the live API calls.
+    Topics that fail are returned to the queue and listed in the summary; they do not
+    fail `poll`, so the scheduled run after it still goes ahead.
+    """
+    openai_batch = import_tool("openai_batch")
+    store = openai_batch.BatchStore()
+    if args.action == "status":
+        rows = store.summary() if store.exists() else []
+        for batch_id, status, downloaded, requests_total, answered, settled in rows:
+            print(f"{batch_id}  {status:<12} {answered or 0}/{requests_total} answered, {settled or 0} settled"
+                  + ("" if downloaded else "  (polling)"))
+        print(f"{len(rows)} batch(es).")
+        return 0
+
+    env = require_env("OPENAI_API_KEY", "GITHUB_TOKEN", "GITHUB_REPO_NAME")
+    if env is None:
+        return 1
+    openai_api_key, github_token, github_repo_name = env
+    queue = TopicQueue()
+
+    if args.action == "submit":
+        try:
+            queue.import_file('topics.txt')
+        except FileNotFoundError:
+            print("Error: topics.txt was not found.")
+            return 1
+        topics = TopicQueue(lease_seconds=openai_batch.batch_lease_seconds()).claim(max(1, args.count))
+        if args.duplicates != "off":
+            # Checked before anything is paid for, as in a normal run.
+            index = import_tool("similarity_index").get_index()
+            index.sync_posts()
+            for topic in list(topics):
+                match = index.check_topic(*parse_keywords(topic.line))
+                if not match:
+                    continue
+                duplicate = f"Duplicate: {match.score:.0%} similar to '{match.title}' ({match.doc_id})"
+                if args.duplicates == "skip":
+                    queue.mark_duplicate(topic.id, duplicate)
+                    print(f"Skipping duplicate topic: {topic.line}")
+                    topics.remove(topic)
+                else:
+                    print(f"Warning: {duplicate}. Submitting anyway: {topic.line}")
+        if not topics:
+            print("No topics to process. Exiting.")
+            return 0
+        batch_id = openai_batch.submit_batch(openai_api_key, topics, store)
+        print(f"Submitted batch '{batch_id}' for {len(topics)} topic(s). Run `agent_studio.py batch poll` to publish them.")
+        return 0
+
+    if not store.exists():
+        print("No OpenAI batches have been submitted.")
+        return 0
+    for batch_id, status in openai_batch.poll_batches(openai_api_key, store):
+        print(f"Batch '{batch_id}': {status}")
+    for topic_id in store.in_flight_topic_ids():
+        queue.extend(topic_id, openai_batch.batch_lease_seconds())
+
+    ready, failed = store.finished_topics()
+    for topic, error in failed:
+        if queue.nack(topic.id, error) == "failed":
+            release_images(topic.line)
+        print(f"Returned to the queue: {topic.line}\n    {error}")
+    store.mark_settled([topic.id for topic, _ in failed])
+    if not ready:
+        print("No finished batch topics to publish.")
+        return 0
+
+    llm_client = import_tool("llm_client")
+    for _, answers in ready:
+        for request, content in answers:
+            llm_client.preload_response(request, content)
+    topics = [topic for topic, _ in ready]
+    settings = RunSettings(openai_api_key, github_token, github_repo_name, duplicates=args.duplicates)
+    results = run_batch([topic.line for topic in topics], args.concurrency, settings)
+    settle_topics(queue, topics, results)
+    store.mark_settled([topic.id for topic in topics])
+    queue.export_file('topics.txt')
+    print_summary(results)
+    log_path = recorder.append_to_log(mode="openai-batch", batch=len(topics), concurrency=args.concurrency,
+                                      llm_cache=llm_cache_stats())
+    print(f"Run record appended to '{log_path}'.")
+    if failed:
+        print(f"{len(failed)} topic(s) without a usable batch answer were returned to the queue.")
+    return 0
+
+def command_resume(args: argparse.Namespace) -> int:
+    """
+    Re-runs the topics that have a run directory from an earlier failed attempt, out of
+    queue order and even if they used up their attempts. Each one starts at its first
+    incomplete stage; with --list the run directories are only shown.
+    """
+    checkpoints = list_checkpoints()
+    if args.list or not checkpoints:
+        for checkpoint in checkpoints:
+            info = checkpoint.info()
+            print(checkpoint.topic_line)
+            print(f"    completed: {', '.join(checkpoint.load()) or 'nothing'}  ({checkpoint.path})")
+            if info.get("last_error"):
+                print(f"    last error: {info['last_error']}")
+        print(f"{len(checkpoints)} unfinished run(s).")
+        return 0
+
+    env = require_env("OPENAI_API_KEY", "GITHUB_TOKEN", "GITHUB_REPO_NAME")
+    if env is None:
+        return 1
+    openai_api_key, github_token, github_repo_name = env
+
+    queue = TopicQueue()
+    topics = queue.claim_lines([checkpoint.topic_line for checkpoint in checkpoints])
+    claimed = {topic.line for topic in topics}
+    for checkpoint in checkpoints:
+        if checkpoint.topic_line not in claimed:
+            print(f"Not resumable (in flight, finished or no longer queued): {checkpoint.topic_line}")
+    if not topics:
+        return 0
+
+    print(f"--- Resuming {len(topics)} topic(s) ---")
+    settings = RunSettings(openai_api_key, github_token, github_repo_name)
+    results = run_batch([topic.line for topic in topics], args.concurrency, settings)
+    settle_topics(queue, topics, results)
+    queue.export_file('topics.txt')
+    print_summary(results)
+    log_path = recorder.append_to_log(mode="resume", batch=len(topics), concurrency=args.concurrency,
+                                      llm_cache=llm_cache_stats())
+    print(f"Run record appended to '{log_path}'.")
+    return 1 if any("Error:" in result for _, result in results) else 0
+
+def command_publish_only(args: argparse.Namespace) -> int:
+    """Publishes already generated article files in one commit, without calling OpenAI or Pixabay."""
+    env = require_env("GITHUB_TOKEN", "GITHUB_REPO_NAME")
+    if env is None:
+        return 1
+    github_token, github_repo_name = env
+    if args.image and len(args.articles) > 1:
+        print("Error: --image can only be used when publishing a single article.")
+        return 1
+    # Checked before the blog repository is read, so a typo costs no API calls.
+    missing = [path for path in args.articles + [args.image] if path and not os.path.isfile(path)]
+    if missing:
+        print(f"Error: File not found: {', '.join(missing)}")
+        return 1
+
+    github_publisher = import_tool("github_publisher")
+    try:
+        github_publisher.prepare_manifest(github_token, github_repo_name)
+    except Exception as e:
+        print(f"Error: Could not read the existing posts of '{github_repo_name}' - {e}")
+        return 1
+    posts = []
+    for article_path in args.articles:
+        with open(article_path, 'r', encoding='utf-8') as f:
+            article = f.read()
+        title = parse_article(article)["title"]
+        category = args.category or import_tool("category_classifier").classify_category(title)[0]
+        posts.append(github_publisher.build_post(title, article, category, args.image))
+
+    results = github_publisher.publish_posts(posts, github_token, github_repo_name)
+    print_summary(list(zip(args.articles, results)))
+    return 1 if any("Error:" in result for result in results) else 0
+
+def command_classify(args: argparse.Namespace) -> int:
+    """Prints the category for each topic, from the local classifier or, with --llm, assign_category."""
+    for topic in args.topics:
+        primary_keyword = parse_keywords(topic)[0] or topic
+        if args.llm:
+            category = import_tool("category_assigner").assign_category(primary_keyword, api_key=os.getenv("OPENAI_API_KEY"))
+            print(f"{category}\t{primary_keyword}")
+        else:
+            category, confidence = import_tool("category_classifier").classify_category(primary_keyword)
+            print(f"{category}\t{confidence:.2f}\t{primary_keyword}")
+    return 0
+
+# Commands that hand their arguments to a tool's own command line parser
+PASSTHROUGH_COMMANDS = {
+    "queue": ("topic_queue", "Manage the durable topic queue (import, export, status, requeue-failed)."),
+    "bench": ("benchmark", "Benchmark the pipeline against local stand-ins for the APIs."),
+    "report": ("instrumentation", "Aggregate the JSON-lines run log."),
+    "dedupe": ("similarity_index", "Near-duplicate checks: sync the index, check a topic, dedupe the queue."),
+    "manifest": ("post_manifest", "Maintain the post manifest and write the site's index JSON."),
+    "prompts": ("prompt_registry", "List the prompt templates and their token budgets."),
+    "backfill": ("post_backfill", "Apply transforms to every existing post in one commit."),
+}
+
+COMMANDS = {"run", "resume", "batch", "publish-only", "classify", *PASSTHROUGH_COMMANDS}
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate and publish blog posts from topics.txt.")
+    parser.add_argument("--import-time", action="store_true", help="Print how long each tool import took before exiting.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run = subparsers.add_parser("run", help="Claim topics from the queue and publish posts for them (the default).")
+    run.add_argument("--batch", type=int, default=1, help="Number of topics to claim and process in this run.")
+    run.add_argument("--concurrency", type=int, default=1, help="Maximum number of pipelines to run at once.")
+    run.add_argument("--stream", action="store_true", help="Stream article generation, parsing it as it arrives and saving a draft.")
+    run.add_argument("--profile", action="store_true", help="Write a flamegraph-ready folded stack profile of the run to logs/.")
+    run.add_argument("--no-cache", action="store_true", help="Ignore cached LLM responses and regenerate (fresh answers are still cached).")
+    run.add_argument("--duplicates", choices=["skip", "flag", "off"], default="flag",
+                     help="What to do with a topic too similar to a published post: warn and generate it anyway "
+                          "(flag, the default) or park it for good (skip). Threshold: DUPLICATE_THRESHOLD.")
+    run.set_defaults(handler=command_run)
+
+    resume = subparsers.add_parser("resume", help="Finish failed topics from their saved stage outputs.")
+    resume.add_argument("--list", action="store_true", help="Only list the unfinished runs and their completed stages.")
+    resume.add_argument("--concurrency", type=int, default=1, help="Maximum number of pipelines to run at once.")
+    resume.set_defaults(handler=command_resume)
+
+    batch = subparsers.add_parser("batch", help="Generate articles through the OpenAI Batch API (submit, poll, status).")
+    batch.add_argument("action", choices=["submit", "poll", "status"])
+    batch.add_argument("--count", type=int, default=20, help="For submit: number of topics to put in the batch.")
+    batch.add_argument("--concurrency", type=int, default=4, help="For poll: pipelines to run at once while publishing.")
+    batch.add_argument("--duplicates", choices=["skip", "flag", "off"], default="flag",
+                       help="For submit: as for `run`.")
+    batch.set_defaults(handler=command_batch)
+
+    publish_only = subparsers.add_parser("publish-only", help="Publish generated article files without regenerating them.")
+    publish_only.add_argument("articles", nargs="+", help="Markdown files in the format generate_article returns.")
+    publish_only.add_argument("--category", help="Category for every article (default: the local classifier's guess).")
+    publish_only.add_argument("--image", help="Local image for a single article.")
+    publish_only.set_defaults(handler=command_publish_only)
+
+    classify = subparsers.add_parser("classify", help="Print the category a topic would be assigned.")
+    classify.add_argument("topics", nargs="+", help="Keywords or topics.txt lines.")
+    classify.add_argument("--llm", action="store_true", help="Fall back to OpenAI when the local classifier is not confident.")
+    classify.set_defaults(handler=command_classify)
+
+    for name, (_, help_text) in PASSTHROUGH_COMMANDS.items():
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    return parser
+
+# --- Main Execution Logic ---
+def main(argv: Optional[List[str]] = None) -> int:
+    """Dispatches to a subcommand. Without one, `run` is assumed, as the scheduled job expects."""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    parser = build_parser()
+    # `agent_studio.py --batch 3` keeps working as `agent_studio.py run --batch 3`.
+    first = next((arg for arg in argv if arg != "--import-time"), None)
+    if first not in COMMANDS and first not in ("-h", "--help"):
+        argv.insert(argv.index(first) if first else len(argv), "run")
+
+    args, extra = parser.parse_known_args(argv)
+    if args.command in PASSTHROUGH_COMMANDS:
+        module_name = PASSTHROUGH_COMMANDS[args.command][0]
+        command_args = extra if args.command != "report" else ["report", *extra]
+        exit_code = import_tool(module_name).main(command_args) or 0
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    else:
+        exit_code = args.handler(args)
+
+    if args.import_time:
+        print_import_times()
+    return exit_code
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,21 @@
+import agent_studio
+
+def test_publish_only_reports_a_missing_article_before_reading_the_blog(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("GITHUB_TOKEN", "token")
+    monkeypatch.setenv("GITHUB_REPO_NAME", "owner/blog")
+    monkeypatch.setattr(agent_studio, "import_tool", lambda name: 1 / 0)
+    article = tmp_path / "seoul-street-food.md"
+    article.write_text("### Seoul Street Food\n#### Subtitle\n\nBody.\n\n#Seoul", encoding="utf-8")
+
+    status = agent_studio.main(["publish-only", str(article), str(tmp_path / "busan-beaches.md")])
+
+    assert status == 1
+    assert capsys.readouterr().out == f"Error: File not found: {tmp_path / 'busan-beaches.md'}\n"
+
+def test_unset_environment_variables_are_named(monkeypatch, capsys):
+    monkeypatch.setenv("GITHUB_TOKEN", "token")
+    monkeypatch.delenv("GITHUB_REPO_NAME", raising=False)
+
+    assert agent_studio.require_env("GITHUB_TOKEN", "GITHUB_REPO_NAME") is None
+    assert capsys.readouterr().out == "Error: Required environment variables are not set: GITHUB_REPO_NAME.\n"
+    assert agent_studio.require_env("GITHUB_TOKEN") == ["token"]
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from article_parser import ArticleStreamParser, clean_title, parse_article, parse_post
+
+ARTICLES = {
+    "compact": (
+        "### Seoul Street Food: An Insider's Guide\n"
+        "#### What tteokbokki taught me about slowing down\n"
+        "Gwangjang market is where I grew up eating.\n"
+        "## 🌶️ Tteokbokki Like a Local\n"
+        "Body text.\n"
+        "### Hotteok for the Walk Home\n"
+        "More body text, with a #hashtag in the middle of a sentence.\n"
+        "#Seoul #StreetFood #Tteokbokki"
+    ),
+    "blank lines": (
+        "\n\n**Seoul Street Food**\n\n"
+        "#### What tteokbokki taught me\n\n"
+        "## Tteokbokki\n\nBody.\n\n"
+        "#Seoul #StreetFood\n"
+    ),
+    "crlf": "### Busan Beaches\r\n#### Sand and sea\r\n\r\n## Haeundae\r\nBody.\r\n#Busan #Beach\r\n",
+}
+
+def chunks(text, sizes):
+    position = 0
+    while position < len(text):
+        size = next(sizes)
+        yield text[position:position + size]
+        position += size
+
+def stream(text, sizes):
+    events = []
+    parser = ArticleStreamParser(lambda name, value: events.append((name, value)))
+    for delta in chunks(text, sizes):
+        parser.feed(delta)
+    assert parser.close() == text
+    return events
+
+def chunkings():
+    for size in (1, 2, 3):
+        yield f"{size}-char", lambda size=size: iter(lambda: size, None)
+    for seed in range(5):
+        yield f"random-{seed}", lambda seed=seed: (random.Random(seed).randint(1, 3) for _ in iter(int, 1))
+
+@pytest.mark.parametrize("article", ARTICLES.values(), ids=list(ARTICLES))
+@pytest.mark.parametrize("name, sizes", list(chunkings()), ids=[name for name, _ in chunkings()])
+def test_streamed_events_match_parse_article_however_the_text_is_split(article, name, sizes):
+    expected = parse_article(article)
+
+    events = stream(article, sizes())
+    values = {}
+    for event, value in events:
+        values.setdefault(event, []).append(value)
+
+    assert values["title"] == [expected["title"]]
+    assert values.get("section", []) == expected["sections"]
+    assert values["tags"][-1] == expected["tag_line"]
+    assert values["done"] == [article]
+    assert clean_title(values["title"][0]) in ("Seoul Street Food: An Insider's Guide", "Seoul Street Food", "Busan Beaches")
+
+def test_the_title_is_emitted_as_soon_as_its_line_is_complete():
+    events = []
+    parser = ArticleStreamParser(lambda name, value: events.append((name, value)))
+
+    parser.feed("### Seoul Str")
+    assert events == []
+    parser.feed("eet Food\n#### Sub")
+
+    assert events == [("title", "### Seoul Street Food")]
+
+def test_post_front_matter_split_from_the_body():
+    front_matter, body = parse_post('---\ntitle: "Seoul Street Food"\ndate: 2024-01-05\n---\n\n### Seoul Street Food\n')
+
+    assert front_matter == {"title": "Seoul Street Food", "date": "2024-01-05"}
+    assert parse_article(body)["title"] == "### Seoul Street Food"
+
+def test_a_heading_is_never_taken_for_the_tag_line():
+    parsed = parse_article("### Busan Beaches\n#### Sand and sea\n\nBody.\n\n## Getting There\nTake the subway.")
+
+    assert parsed["tag_line"] == ""
+    assert parsed["sections"] == ["Getting There"]
+    assert parsed["subtitle_and_body"].endswith("Take the subway.")
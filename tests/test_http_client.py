@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+import pytest
+
+import http_client
+from http_client import TokenBucket, _parse_duration, retry_after_seconds, update_limits
+
+class FakeClock:
+    """Stands in for the time module inside http_client: sleep() only moves the clock."""
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+        self.slept = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+        self.slept += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(http_client, "time", fake)
+    monkeypatch.setattr(http_client, "_buckets", {})
+    return fake
+
+def test_a_full_bucket_allows_its_burst_without_waiting(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4)
+
+    for _ in range(4):
+        bucket.acquire()
+
+    assert clock.slept == 0
+
+def test_an_empty_bucket_waits_for_the_refill(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4)
+    for _ in range(4):
+        bucket.acquire()
+
+    bucket.acquire()
+
+    assert clock.slept == pytest.approx(0.5)
+
+def test_idle_time_refills_only_up_to_the_burst(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4)
+    for _ in range(4):
+        bucket.acquire()
+    clock.now += 60
+
+    for _ in range(5):
+        bucket.acquire()
+
+    assert clock.slept == pytest.approx(0.5)
+
+def test_no_quota_left_blocks_until_the_reset(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4)
+
+    bucket.adapt(remaining=0, reset_seconds=40)
+    bucket.acquire()
+
+    assert clock.slept == pytest.approx(40, abs=0.6)
+
+def test_the_rate_spreads_what_is_left_of_the_window(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4)
+
+    bucket.adapt(remaining=10, reset_seconds=100)
+    assert bucket.rate == pytest.approx(0.1)
+    assert bucket.tokens == 4
+
+    bucket.adapt(remaining=10_000, reset_seconds=100)  # never faster than the default budget
+    assert bucket.rate == 2.0
+
+def test_a_429_retry_after_pauses_the_service(clock):
+    update_limits("example", {"Retry-After": "3", "X-RateLimit-Remaining": "0"})
+    update_limits("example", {})
+
+    http_client.get_bucket("example").acquire()
+
+    assert clock.slept == pytest.approx(3, abs=0.1)
+
+def test_an_epoch_reset_header_is_read_relative_to_now(clock):
+    update_limits("github", {"X-RateLimit-Remaining": "50", "X-RateLimit-Reset": str(int(clock.now) + 100)})
+
+    assert http_client.get_bucket("github").rate == pytest.approx(0.5)
+
+@pytest.mark.parametrize("value, seconds", [
+    ("12", 12.0), ("1.5", 1.5), ("1m30s", 90.0), ("6m0s", 360.0), ("250ms", 0.25), ("1h", 3600.0),
+    ("soon", None), ("5x", None),
+])
+def test_durations(value, seconds):
+    assert _parse_duration(value) == seconds
+
+def test_retry_after_as_an_http_date(clock):
+    date = format_datetime(datetime.fromtimestamp(clock.now + 120, tz=timezone.utc), usegmt=True)
+
+    assert retry_after_seconds({"Retry-After": date}) == pytest.approx(120)
+    assert retry_after_seconds({"retry-after": "7"}) == 7.0
+    assert retry_after_seconds({"Retry-After": "not a date"}) is None
+    assert retry_after_seconds({}) is None
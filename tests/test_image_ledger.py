@@ -0,0 +1,47 @@
+from image_creator import ImageLedger, rank_hits
+
+def test_claimed_images_are_not_handed_out_twice(tmp_path):
+    ledger = ImageLedger(str(tmp_path / "ledger.sqlite3"))
+
+    assert ledger.claim(1, "Seoul street food, tteokbokki")
+    assert not ledger.claim(1, "Busan beaches, haeundae")
+    assert ledger.used_ids([1, 2]) == {1}
+
+def test_release_only_gives_back_images_that_were_never_downloaded(tmp_path):
+    ledger = ImageLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.claim(1, "Seoul street food, tteokbokki")
+    ledger.claim(2, "Seoul street food, tteokbokki")
+    ledger.set_hash(2, "0123456789abcdef")
+
+    ledger.release(1)
+    ledger.release(2)
+
+    assert ledger.used_ids([1, 2]) == {2}
+
+def test_release_topic_frees_every_image_of_that_topic_only(tmp_path):
+    ledger = ImageLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.claim(1, "Seoul street food, tteokbokki")
+    ledger.claim(2, "Seoul street food, tteokbokki")
+    ledger.set_hash(2, "0123456789abcdef")
+    ledger.claim(3, "Seoul street food, hotteok")
+
+    assert ledger.release_topic("Seoul street food, tteokbokki") == 2
+    assert ledger.used_ids([1, 2, 3]) == {3}
+    assert ledger.claim(1, "Busan beaches, haeundae")
+
+def hit(pixabay_id, width, height, likes=10):
+    return {"id": pixabay_id, "imageWidth": width, "imageHeight": height, "likes": likes,
+            "largeImageURL": f"https://pixabay.test/{pixabay_id}_1280.jpg", "tags": ""}
+
+def test_resolution_is_scored_on_the_downloaded_size():
+    # Both download as 1280x853; only the likes tell them apart.
+    huge = hit(1, 6000, 4000, likes=10)
+    full = hit(2, 1280, 853, likes=20)
+    small = hit(3, 640, 427, likes=20)
+
+    assert [h["id"] for h in rank_hits([huge, full, small], used_ids=set())] == [2, 1, 3]
+
+def test_used_hits_and_hits_without_a_download_are_not_ranked():
+    no_url = dict(hit(2, 1920, 1280), largeImageURL=None)
+
+    assert [h["id"] for h in rank_hits([hit(1, 1920, 1280), no_url, hit(3, 1920, 1280)], used_ids={1})] == [3]
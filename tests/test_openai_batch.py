@@ -0,0 +1,54 @@
+import json
+
+from openai_batch import BatchStore, _download, _response_content
+from topic_queue import Topic
+
+def output_line(custom_id, message=None, choices=None, status_code=200):
+    if choices is None:
+        choices = [{"index": 0, "message": message, "finish_reason": "stop"}]
+    return {"custom_id": custom_id, "error": None,
+            "response": {"status_code": status_code, "body": {"choices": choices, "usage": {}}}}
+
+class FakeFiles:
+    def __init__(self, lines):
+        self.text = "\n".join(json.dumps(line) for line in lines)
+
+    def content(self, file_id):
+        return self
+
+class FakeClient:
+    def __init__(self, lines):
+        self.files = FakeFiles(lines)
+
+def test_an_answer_is_stripped():
+    line = output_line("topic-1-article", {"role": "assistant", "content": "  ### Title\n\nBody\n  "})
+
+    assert _response_content(line) == ("### Title\n\nBody", None)
+
+def test_null_content_fails_only_that_request():
+    refusal = output_line("topic-1-article", {"role": "assistant", "content": None, "refusal": "I can't help with that."})
+    tool_call = output_line("topic-2-article", {"role": "assistant", "content": None, "tool_calls": [{}]})
+    no_choices = output_line("topic-3-article", choices=[])
+
+    assert _response_content(refusal) == (None, "empty response (I can't help with that.)")
+    assert _response_content(tool_call) == (None, "empty response (stop)")
+    assert _response_content(no_choices) == (None, "empty response")
+
+def test_a_null_answer_fails_its_topic_and_the_others_are_still_published(tmp_path):
+    store = BatchStore(str(tmp_path / "batches.sqlite3"))
+    topics = [Topic(1, "Primary: Seoul street food", 0), Topic(2, "Primary: Busan beaches", 0)]
+    store.add_batch("batch-1", "file-1", "in_progress", [
+        {"custom_id": f"topic-{topic.id}-article", "topic": topic, "kind": "article", "request": {"topic": topic.id}}
+        for topic in topics
+    ])
+    client = FakeClient([
+        output_line("topic-1-article", {"role": "assistant", "content": "### Seoul Street Food"}),
+        output_line("topic-2-article", {"role": "assistant", "content": None}),
+    ])
+
+    store.store_results("batch-1", _download(client, "output-file"))
+    ready, failed = store.finished_topics()
+
+    assert [(topic.id, answers) for topic, answers in ready] == [(1, [({"topic": 1}, "### Seoul Street Food")])]
+    assert [(topic.id, error) for topic, error in failed] == [
+        (2, "Error: The OpenAI batch did not answer every request - empty response (stop)")]
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from post_backfill import BackfillTarget, DryRunTarget, LocalTarget, backfill, front_matter_lines, main
+from post_manifest import PostManifest
+
+HAND_WRITTEN = """---
+layout: post
+title: "## **Seoul street food**"
+date: 2024-01-05 09:00:00 +0900
+category: "Food"
+tags: [seoul, food]
+# written before the agent existed
+---
+
+Tteokbokki and hotteok.
+"""
+
+def write_post(tmp_path, name, text):
+    posts = tmp_path / "_posts"
+    posts.mkdir(exist_ok=True)
+    (posts / name).write_text(text, encoding="utf-8")
+    return posts / name
+
+def run(tmp_path, transforms, dry_run=False):
+    manifest = PostManifest(str(tmp_path / "manifest.json"))
+    return backfill(LocalTarget(str(tmp_path)), transforms, dry_run, manifest)
+
+def test_only_the_lines_a_transform_touched_are_rewritten(tmp_path):
+    path = write_post(tmp_path, "2024-01-05-seoul-street-food.md", HAND_WRITTEN)
+
+    assert run(tmp_path, ["normalize-title", "add-permalink"]) == ["_posts/2024-01-05-seoul-street-food.md"]
+
+    assert path.read_text(encoding="utf-8") == """---
+layout: post
+title: "Seoul street food"
+date: 2024-01-05 09:00:00 +0900
+category: "Food"
+permalink: "/seoul-street-food/"
+tags: [seoul, food]
+# written before the agent existed
+---
+
+Tteokbokki and hotteok.
+"""
+
+def test_posts_already_up_to_date_are_not_rewritten(tmp_path):
+    text = HAND_WRITTEN.replace('"## **Seoul street food**"', '"Seoul street food"')
+    path = write_post(tmp_path, "2024-01-05-seoul-street-food.md", text)
+
+    assert run(tmp_path, ["normalize-title"]) == []
+    assert path.read_text(encoding="utf-8") == text
+
+@pytest.mark.parametrize("front_matter", [
+    "tags:\n  - seoul\n  - food\n",
+    "summary: >\n  Folded text\n",
+    "title: \"A title\ncontinued\"\n",
+    "tags: [seoul,\n  food]\n",
+    "title: One\ntitle: Two\n",
+])
+def test_front_matter_the_flat_parser_cannot_describe_is_skipped(tmp_path, front_matter):
+    text = f"---\n{front_matter}---\n\nBody.\n"
+    path = write_post(tmp_path, "2024-01-05-post.md", text)
+
+    assert front_matter_lines(text) is None
+    assert run(tmp_path, ["add-permalink"]) == []
+    assert path.read_text(encoding="utf-8") == text
+
+def test_posts_without_front_matter_are_skipped(tmp_path):
+    assert front_matter_lines("Just a body.\n") is None
+
+def test_dry_run_reports_without_writing(tmp_path):
+    path = write_post(tmp_path, "2024-01-05-seoul-street-food.md", HAND_WRITTEN)
+
+    assert run(tmp_path, ["add-permalink"], dry_run=True) == ["_posts/2024-01-05-seoul-street-food.md"]
+    assert path.read_text(encoding="utf-8") == HAND_WRITTEN
+
+def test_dry_run_target_can_finish(tmp_path):
+    target = DryRunTarget(LocalTarget(str(tmp_path)))
+    target.write("_posts/2024-01-05-post.md", "text")
+
+    assert target.finish("unused") == "Dry run: 1 file(s) would be written."
+    assert not (tmp_path / "_posts").exists()
+
+def test_targets_must_implement_every_operation():
+    class PartialTarget(BackfillTarget):
+        def post_paths(self):
+            return []
+
+    with pytest.raises(TypeError):
+        PartialTarget()
+
+def test_local_backfill_indexes_the_whole_checkout_without_touching_the_global_manifest(tmp_path, monkeypatch):
+    monkeypatch.setenv("POST_MANIFEST_PATH", str(tmp_path / "global_manifest.json"))
+    blog = tmp_path / "blog"
+    blog.mkdir()
+    write_post(blog, "2024-01-05-seoul-street-food.md", HAND_WRITTEN)
+    write_post(blog, "2024-02-01-busan-beaches.md",
+               '---\ntitle: "Busan beaches"\ndate: 2024-02-01\ncategory: "Beaches"\npermalink: "/busan-beaches/"\n---\n\nSand.\n')
+
+    assert main(["--local", str(blog), "--transform", "add-permalink"]) == 0
+
+    categories = json.loads((blog / "_data" / "post_categories.json").read_text(encoding="utf-8"))
+    assert sorted(categories) == ["Beaches", "Food"]
+    assert not (tmp_path / "global_manifest.json").exists()
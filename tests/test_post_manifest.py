@@ -0,0 +1,93 @@
+import pytest
+
+from post_manifest import RELATED_COUNT, PostManifest
+
+def render(title, date, category, tags, slug=None):
+    permalink = f'permalink: "/{slug}/"\n' if slug else ""
+    hashtags = " ".join(f"#{tag}" for tag in tags)
+    return (f'---\ntitle: "{title}"\ndate: {date}\ncategory: "{category}"\n{permalink}---\n\n'
+            f"### {title}\n#### Subtitle\n\nBody.\n\n{hashtags}")
+
+def add(manifest, slug, date, category, tags):
+    path = f"_posts/{date}-{slug}.md"
+    manifest.add(PostManifest.entry_from_post(path, render(slug.replace("-", " ").title(), date, category, tags, slug)))
+
+def related_slugs(manifest, slug):
+    return [other for _, other in manifest.related.get(slug, [])]
+
+def test_reserved_slugs_avoid_published_and_in_flight_posts(tmp_path):
+    manifest = PostManifest(str(tmp_path / "manifest.json"))
+    add(manifest, "seoul-street-food", "2024-01-05", "Food", ["Seoul"])
+
+    assert manifest.reserve_slug("Seoul Street Food") == "seoul-street-food-2"
+    assert manifest.reserve_slug("Seoul Street Food!") == "seoul-street-food-3"
+    assert manifest.reserve_slug("Busan Beaches") == "busan-beaches"
+
+def test_publishing_a_reserved_slug_frees_the_reservation(tmp_path):
+    manifest = PostManifest(str(tmp_path / "manifest.json"))
+    slug = manifest.reserve_slug("Busan Beaches")
+
+    add(manifest, slug, "2024-02-01", "Beaches", ["Busan"])
+
+    assert manifest.has_slug(slug)
+    assert manifest.reserve_slug("Busan Beaches") == "busan-beaches-2"
+
+def test_related_posts_are_symmetric_after_add(tmp_path):
+    manifest = PostManifest(str(tmp_path / "manifest.json"))
+    add(manifest, "seoul-street-food", "2024-01-05", "Food", ["Seoul", "StreetFood"])
+    add(manifest, "busan-beaches", "2024-02-01", "Beaches", ["Busan"])
+    add(manifest, "seoul-night-markets", "2024-03-01", "Food", ["Seoul", "NightMarket"])
+
+    assert related_slugs(manifest, "seoul-night-markets") == ["seoul-street-food"]
+    assert related_slugs(manifest, "seoul-street-food") == ["seoul-night-markets"]
+    assert related_slugs(manifest, "busan-beaches") == []
+
+@pytest.mark.parametrize("posts_per_day", [1, 2])  # a batch run publishes several posts a day
+def test_incremental_related_posts_match_a_full_recompute(tmp_path, posts_per_day):
+    manifest = PostManifest(str(tmp_path / "manifest.json"))
+    for number in range(1, RELATED_COUNT + 4):
+        tags = ["Seoul", "Food"] if number % 2 else ["Seoul"]
+        day = (number + posts_per_day - 1) // posts_per_day
+        add(manifest, f"post-{number}", f"2024-01-{day:02d}", "Food" if number % 3 else "Culture", tags)
+    # Replacing a post re-scores the lists it was in.
+    add(manifest, "post-1", "2024-01-01", "Culture", ["Busan"])
+
+    for slug in manifest.posts:
+        assert manifest.related[slug] == manifest._top_related(slug), slug
+
+def test_seeding_without_content_records_stubs(tmp_path):
+    manifest = PostManifest(str(tmp_path / "manifest.json"))
+
+    manifest.seed_from_listing("owner/blog", ["2024-01-05-seoul-street-food.md", "README.txt"], ["abc.jpg"])
+
+    assert manifest.has_path("_posts/2024-01-05-seoul-street-food.md")
+    assert manifest.posts["seoul-street-food"]["stub"]
+    assert not manifest.has_path("_posts/README.txt")
+    assert manifest.images == {"images/abc.jpg"}
+    assert manifest.seeded_repos == {"owner/blog"}
+    assert manifest.reserve_slug("Seoul Street Food") == "seoul-street-food-2"
+    assert '"seoul-street-food"' not in manifest.site_files()["post_categories.json"]
+
+def test_seeding_with_content_gives_full_entries(tmp_path):
+    manifest = PostManifest(str(tmp_path / "manifest.json"))
+    files = {
+        "2024-01-05-seoul-street-food.md": render("Seoul Street Food", "2024-01-05", "Food", ["Seoul"]),
+        "2024-03-01-seoul-night-markets.md": render("Seoul Night Markets", "2024-03-01", "Food", ["Seoul"]),
+    }
+
+    manifest.seed_from_listing("owner/blog", files, [], files.__getitem__)
+    manifest.save()
+    reloaded = PostManifest(manifest.path)
+
+    assert sorted(reloaded.posts) == ["seoul-night-markets", "seoul-street-food"]
+    assert not any(post.get("stub") for post in reloaded.posts.values())
+    assert related_slugs(reloaded, "seoul-street-food") == ["seoul-night-markets"]
+    assert "Seoul Night Markets" in reloaded.site_files()["post_categories.json"]
+
+def test_seeding_keeps_entries_the_manifest_already_has(tmp_path):
+    manifest = PostManifest(str(tmp_path / "manifest.json"))
+    add(manifest, "seoul-street-food", "2024-01-05", "Food", ["Seoul"])
+
+    manifest.seed_from_listing("owner/blog", ["2024-01-05-seoul-street-food.md"], [], lambda name: 1 / 0)
+
+    assert manifest.posts["seoul-street-food"]["category"] == "Food"
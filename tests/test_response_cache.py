@@ -0,0 +1,95 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, make_key
+
+class FakeClock:
+    """Stands in for the time module inside response_cache."""
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(response_cache, "time", fake)
+    monkeypatch.delenv("LLM_CACHE_BYPASS", raising=False)
+    return fake
+
+def make_cache(tmp_path, namespace="llm", **kwargs) -> ResponseCache:
+    return ResponseCache(namespace, path=str(tmp_path / "responses.sqlite3"), **kwargs)
+
+def test_keys_depend_on_every_part_but_not_dict_order():
+    assert make_key("gpt-4o", {"a": 1, "b": 2}) == make_key("gpt-4o", {"b": 2, "a": 1})
+    assert make_key("gpt-4o", {"a": 1}) != make_key("gpt-4o-mini", {"a": 1})
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    cache.set("key", "answer")
+
+    clock.now += 60
+    assert cache.get("key") == "answer"
+    clock.now += 1
+    assert cache.get("key") is None
+
+def test_expired_entries_are_deleted_on_the_next_write(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    cache.set("old", "answer")
+    clock.now += 61
+
+    cache.set("new", "answer")
+
+    assert cache.stats()["entries"] == 1
+
+def test_the_least_recently_used_entries_are_evicted_first(tmp_path, clock):
+    cache = make_cache(tmp_path, max_bytes=30)
+    for key in ("a", "b", "c"):
+        cache.set(key, "x" * 10)
+        clock.now += 1
+    assert cache.get("a") == "x" * 10  # now the most recently used
+    clock.now += 1
+
+    cache.set("d", "x" * 10)
+
+    assert [key for key in "abcd" if cache.get(key)] == ["a", "c", "d"]
+    assert cache.stats()["bytes"] == 30
+
+def test_namespaces_are_evicted_separately(tmp_path, clock):
+    articles = make_cache(tmp_path, "articles", max_bytes=10)
+    categories = make_cache(tmp_path, "categories", max_bytes=10)
+    categories.set("key", "x" * 10)
+
+    articles.set("key", "y" * 10)
+
+    assert categories.get("key") == "x" * 10
+    assert articles.get("key") == "y" * 10
+
+def test_bypass_skips_reads_but_still_stores(tmp_path, clock, monkeypatch):
+    cache = make_cache(tmp_path)
+    cache.set("key", "old answer")
+    monkeypatch.setenv("LLM_CACHE_BYPASS", "1")
+
+    assert cache.get("key") is None
+    cache.set("key", "fresh answer")
+    monkeypatch.setenv("LLM_CACHE_BYPASS", "0")
+
+    assert cache.get("key") == "fresh answer"
+    assert (cache.hits, cache.misses) == (1, 0)
+
+def test_hits_and_misses_are_counted_per_process_and_in_the_file(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.get("key")
+    cache.set("key", "answer")
+    cache.get("key")
+    cache.get("key")
+
+    later = make_cache(tmp_path)
+    later.get("other")
+
+    assert (cache.hits, cache.misses) == (2, 1)
+    stats = later.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 1)
+    assert (stats["total_hits"], stats["total_misses"]) == (2, 2)
+    assert stats["entries"] == 1
@@ -0,0 +1,127 @@
+import os
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import agent_studio
+from image_creator import image_variants
+from run_checkpoint import RunCheckpoint, list_checkpoints
+from topic_queue import TopicQueue
+
+TOPIC = "Primary: Seoul street food; Secondary: tteokbokki, hotteok"
+ARTICLE = "### Seoul Street Food\n#### Subtitle\n\nBody.\n\n#Seoul #StreetFood"
+
+@pytest.fixture(autouse=True)
+def run_root(tmp_path, monkeypatch):
+    monkeypatch.setenv("RUN_CHECKPOINT_DIR", str(tmp_path / "runs"))
+    return tmp_path / "runs"
+
+def write_image(directory, name="abc123"):
+    directory.mkdir(parents=True, exist_ok=True)
+    for file_name in (f"{name}.jpg", f"{name}-800w.jpg", f"{name}-800w.webp"):
+        (directory / file_name).write_bytes(b"image")
+    return str(directory / f"{name}.jpg")
+
+class FakeTools:
+    """Stands in for the tool modules agent_studio imports lazily, counting the calls."""
+    def __init__(self, monkeypatch, tmp_path):
+        self.calls = []
+        self.publish_results = []
+        self.tmp_path = tmp_path
+        tools = {
+            "article_generator": {"generate_article": self.generate_article},
+            "category_assigner": {"assign_category": self.assign_category},
+            "image_creator": {"create_image": self.create_image, "image_variants": image_variants},
+            "github_publisher": {"publish_to_github": self.publish_to_github},
+        }
+        for name, functions in tools.items():
+            monkeypatch.setitem(agent_studio.sys.modules, name, types.SimpleNamespace(**functions))
+
+    def generate_article(self, primary_keyword, secondary_keywords, **kwargs):
+        self.calls.append("article")
+        return ARTICLE
+
+    def assign_category(self, primary_keyword, **kwargs):
+        self.calls.append("category")
+        return "Food"
+
+    def create_image(self, article_content, topic, **kwargs):
+        self.calls.append("image")
+        return write_image(self.tmp_path / "images")
+
+    def publish_to_github(self, **kwargs):
+        self.calls.append("publish")
+        self.published_image = kwargs["image_local_path"]
+        return self.publish_results.pop(0)
+
+@pytest.fixture
+def tools(monkeypatch, tmp_path):
+    return FakeTools(monkeypatch, tmp_path)
+
+def settings():
+    return agent_studio.RunSettings("key", "token", "owner/blog", duplicates="off")
+
+def test_stage_outputs_round_trip_and_the_image_moves_into_the_run(tmp_path):
+    checkpoint = RunCheckpoint(TOPIC)
+    image = write_image(tmp_path / "images")
+
+    checkpoint.save("article", ARTICLE)
+    kept_image = checkpoint.save("image", image)
+
+    assert kept_image == os.path.join(checkpoint.path, "images", "abc123.jpg")
+    assert sorted(os.listdir(os.path.join(checkpoint.path, "images"))) == [
+        "abc123-800w.jpg", "abc123-800w.webp", "abc123.jpg"]
+    assert not os.listdir(tmp_path / "images")
+    assert RunCheckpoint(TOPIC).load() == {"article": ARTICLE, "image": kept_image}
+    assert [saved.topic_line for saved in list_checkpoints()] == [TOPIC]
+
+def test_an_image_whose_file_is_gone_is_not_reused(tmp_path):
+    checkpoint = RunCheckpoint(TOPIC)
+    os.remove(checkpoint.save("image", write_image(tmp_path / "images")))
+
+    assert checkpoint.load() == {}
+
+def test_stages_finishing_at_once_can_all_save(tmp_path):
+    checkpoint = RunCheckpoint(TOPIC)
+    outputs = {"article": ARTICLE, "category": "Food", "publish": "Success: Post was published."}
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        for _ in range(50):
+            list(executor.map(checkpoint.save, outputs, outputs.values()))
+
+    assert checkpoint.load() == outputs
+
+def test_a_retry_runs_only_the_stages_that_did_not_complete(tools):
+    tools.publish_results = ["Error: GitHub is down", "Success: Post was published."]
+
+    first = agent_studio.run_pipeline(TOPIC, settings())
+    assert first == "Error: Failed to publish post: Error: GitHub is down"
+    assert sorted(tools.calls) == ["article", "category", "image", "publish"]
+    kept_image = RunCheckpoint(TOPIC).load()["image"]
+
+    tools.calls.clear()
+    second = agent_studio.run_pipeline(TOPIC, settings())
+
+    assert second == "Success: Post was published."
+    assert tools.calls == ["publish"]
+    assert tools.published_image == kept_image
+
+def test_the_run_directory_is_only_removed_once_the_topic_is_published(tools, tmp_path):
+    tools.publish_results = ["Error: GitHub is down", "Success: Post was published."]
+    queue = TopicQueue(str(tmp_path / "queue.sqlite3"))
+    (tmp_path / "topics.txt").write_text(f"{TOPIC}\n", encoding="utf-8")
+    queue.import_file(str(tmp_path / "topics.txt"))
+
+    topics = queue.claim(1)
+    agent_studio.settle_topics(queue, topics, [(TOPIC, agent_studio.run_pipeline(TOPIC, settings()))])
+
+    checkpoint = RunCheckpoint(TOPIC)
+    assert checkpoint.exists()
+    assert checkpoint.info()["last_error"].startswith("Error:")
+
+    topics = queue.claim(1)
+    agent_studio.settle_topics(queue, topics, [(TOPIC, agent_studio.run_pipeline(TOPIC, settings()))])
+
+    assert not os.path.exists(checkpoint.path)
+    assert queue.counts()["done"] == 1
@@ -0,0 +1,91 @@
+import pytest
+
+from similarity_index import SimilarityIndex, _words, topic_shingles
+from topic_queue import parse_keywords
+
+SEOCHON = """---
+title: "Exploring Seochon's Hidden Alleys: Unveil Seoul's Best-Kept Secrets"
+date: 2025-08-10
+category: "K-Culture & Palaces"
+---
+
+#### Discover the charm behind the hustle
+
+Every guidebook tells you to visit Gyeongbok Palace, but let me take you through the winding, art-filled
+alleys of Seochon, where the heart of Seoul's local culture beats quietly. The old hanok houses of Seochon
+line its alleys, and Tongin Market sells street food for old coins. Seochon's galleries hide in the alleys.
+
+🏷️ Tags: Seochon's Hidden Alleys, Seoul, Gyeongbok Palace, local culture, rediscovery
+"""
+
+SAIGON = """---
+title: "Saigon Night Markets: A Local's Guide to Eating After Dark"
+---
+
+### Saigon Night Markets: A Local's Guide to Eating After Dark
+
+Stalls of grilled seafood, banh xeo and sugarcane juice fill the market when the sun goes down.
+
+#SaigonNightMarkets #LocalTips #FamilyTravel #HiddenGems
+"""
+
+STREET_FOOD = """---
+title: "Seoul Street Food: Tteokbokki, Hotteok and the Stalls of Gwangjang Market"
+---
+
+Gwangjang market stalls sell tteokbokki and hotteok, bindaetteok and mayak gimbap.
+
+#SeoulStreetFood #Tteokbokki #Hotteok #Gwangjang
+"""
+
+@pytest.fixture
+def index(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "similarity.sqlite3"), threshold=0.6)
+    index.add_post("_posts/seochon.md", SEOCHON)
+    index.add_post("_posts/saigon.md", SAIGON)
+    index.add_post("_posts/street-food.md", STREET_FOOD)
+    return index
+
+def check(index, line):
+    return index.check_topic(*parse_keywords(line))
+
+@pytest.mark.parametrize("line, doc_id", [
+    ("Primary: Seochon's hidden alleys; Secondary: Seoul, Gyeongbok Palace, local culture", "_posts/seochon.md"),
+    ("Primary: Hidden alleys of Seochon", "_posts/seochon.md"),
+    ("Primary: Seoul street food; Secondary: tteokbokki, hotteok", "_posts/street-food.md"),
+])
+def test_topics_a_post_already_covers_are_duplicates(index, line, doc_id):
+    match = check(index, line)
+
+    assert match is not None and match.doc_id == doc_id
+
+@pytest.mark.parametrize("line", [
+    # Shares "hidden alleys" and "local secrets" with the Seochon post, but not its place.
+    "Primary: Hidden alleys of Hanoi; Secondary: Old Quarter, local secrets",
+    # Too short to say anything: every Seoul post would match.
+    "Primary: Seoul",
+    # Only the generic tags match (#LocalTips #FamilyTravel #HiddenGems).
+    "Primary: Jeju Island Beaches; Secondary: local tips, family travel, hidden gems",
+    "Primary: Seochon cafes; Secondary: Seoul",
+])
+def test_topics_sharing_only_generic_or_few_words_are_not_duplicates(index, line):
+    assert check(index, line) is None
+
+def test_possessives_match_the_plain_word():
+    assert _words("Seoul's night food") == _words("Seoul night food")
+    assert topic_shingles("Seochon's hidden alleys") == topic_shingles("Seochon hidden alleys")
+
+def test_queue_topics_are_checked_against_earlier_topics(index):
+    topics = [
+        ("1", "Busan seafood markets", ["Jagalchi"]),
+        ("2", "Busan seafood markets", ["Jagalchi", "raw fish"]),
+        ("3", "Busan beaches", ["Haeundae"]),
+    ]
+
+    assert [key for key, _ in index.dedupe_topics(topics)] == ["2"]
+
+def test_the_index_survives_a_reload(index):
+    reloaded = SimilarityIndex(index.path, threshold=0.6)
+
+    assert check(reloaded, "Primary: Hidden alleys of Seochon").doc_id == "_posts/seochon.md"
+    assert reloaded.stats()["posts"] == 3
@@ -0,0 +1,56 @@
+import os
+import shutil
+import sqlite3
+
+from openai_batch import BatchStore
+from similarity_index import SimilarityIndex
+from sqlite_store import main, same_rows
+
+POST = "### Busan Beaches\n#### Sand and sea\n\nHaeundae and Gwangalli beaches.\n\n#Busan #Beach"
+
+def snapshot(path, tmp_path):
+    copy = str(tmp_path / "committed.sqlite3")
+    shutil.copyfile(path, copy)
+    return copy
+
+def test_same_rows_ignores_the_page_layout(tmp_path):
+    store = BatchStore(str(tmp_path / "batches.sqlite3"))
+    store.add_batch("batch-1", "file-1", "in_progress", [])
+    committed = snapshot(store.path, tmp_path)
+
+    with store._transaction() as connection:
+        connection.execute("UPDATE batches SET status = 'in_progress'")
+    store.update_batch("batch-1", "in_progress", None, None)
+    assert same_rows(committed, store.path)
+    assert main(["compare", committed, store.path]) == 0
+
+    store.update_batch("batch-1", "completed", "output-1", None)
+    assert main(["compare", committed, store.path]) == 1
+
+def test_a_fresh_checkout_does_not_rewrite_the_similarity_index(tmp_path):
+    os.makedirs(tmp_path / "_posts")
+    post = tmp_path / "_posts" / "2024-01-05-busan-beaches.md"
+    post.write_text(POST, encoding="utf-8")
+    index = SimilarityIndex(str(tmp_path / "similarity.sqlite3"))
+    index.sync_posts(str(tmp_path / "_posts"))
+    committed = snapshot(index.path, tmp_path)
+
+    os.utime(post, (1, 1))
+    counts = SimilarityIndex(index.path).sync_posts(str(tmp_path / "_posts"))
+
+    assert counts == {"added": 0, "updated": 0, "removed": 0}
+    assert same_rows(committed, index.path)
+
+def test_checkpoint_folds_the_write_ahead_log_into_the_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = sqlite3.connect(path)  # still open, so its log is not folded in on close
+    writer.execute("PRAGMA journal_mode=WAL")
+    with writer:
+        writer.execute("CREATE TABLE entries (key TEXT)")
+        writer.execute("INSERT INTO entries VALUES ('answer')")
+    assert os.path.getsize(path + "-wal") > 0
+
+    assert main(["checkpoint", path]) == 0
+
+    assert os.path.getsize(path + "-wal") == 0
+    writer.close()
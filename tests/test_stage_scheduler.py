@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+from stage_scheduler import Stage, StageError, run_stages
+
+WAIT = 5  # seconds; only reached when the scheduler serializes what should overlap
+
+def test_independent_stages_run_in_parallel():
+    both_running = threading.Barrier(2, timeout=WAIT)
+
+    def stage(value):
+        both_running.wait()
+        return value
+
+    context, errors = run_stages([
+        Stage("a", lambda seed: stage(seed + 1), inputs=("seed",)),
+        Stage("b", lambda seed: stage(seed + 2), inputs=("seed",)),
+        Stage("total", lambda a, b: a + b, inputs=("a", "b")),
+    ], {"seed": 1})
+    assert errors == {}
+    assert context["total"] == 5
+
+def test_failed_required_stage_skips_its_dependents():
+    def fail():
+        raise StageError("Error: no article")
+
+    context, errors = run_stages([
+        Stage("article", fail),
+        Stage("category", lambda: "Food"),
+        Stage("publish", lambda article, category: "ok", inputs=("article", "category")),
+        Stage("announce", lambda publish: "ok", inputs=("publish",)),
+    ], {})
+    assert errors["article"] == "Error: no article"
+    assert errors["publish"].startswith("Skipped")
+    assert errors["announce"].startswith("Skipped")
+    assert context["category"] == "Food"
+    assert "publish" not in context
+
+def test_failed_optional_stage_passes_none_on():
+    def fail():
+        raise RuntimeError("no image")
+
+    context, errors = run_stages([
+        Stage("image", fail, required=False),
+        Stage("publish", lambda image: f"image={image}", inputs=("image",)),
+    ], {})
+    assert errors == {"image": "RuntimeError: no image"}
+    assert context["publish"] == "image=None"
+
+def test_emitted_output_starts_dependents_before_the_emitter_finishes():
+    consumer_done = threading.Event()
+
+    def article(emit):
+        emit("title", "A Title")
+        assert consumer_done.wait(WAIT), "the consumer did not start while the emitter was running"
+        return "body"
+
+    def image(title):
+        consumer_done.set()
+        return f"image for {title}"
+
+    context, errors = run_stages([
+        Stage("article", article, emits=("title",)),
+        Stage("image", image, inputs=("title",)),
+    ], {})
+    assert errors == {}
+    assert context["image"] == "image for A Title"
+
+def test_output_a_failed_emitter_never_sent_is_skipped():
+    def article(emit):
+        raise StageError("Error: stream dropped")
+
+    context, errors = run_stages([
+        Stage("article", article, emits=("title",)),
+        Stage("image", lambda title: title, inputs=("title",)),
+    ], {})
+    assert errors["image"].startswith("Skipped")
+    assert "title" not in context
+
+def test_output_an_emitter_never_sent_is_none_when_it_succeeds():
+    context, errors = run_stages([
+        Stage("article", lambda emit: "body", emits=("title",)),
+        Stage("image", lambda title: f"title={title}", inputs=("title",)),
+    ], {})
+    assert errors == {}
+    assert context["image"] == "title=None"
+
+def test_emitting_an_undeclared_output_fails_the_stage():
+    def article(emit):
+        emit("subtitle", "nope")
+
+    _, errors = run_stages([Stage("article", article, emits=("title",))], {})
+    assert "does not declare the output 'subtitle'" in errors["article"]
+
+def test_cycles_are_rejected_before_anything_runs():
+    ran = []
+    with pytest.raises(ValueError, match="cycle"):
+        run_stages([
+            Stage("a", lambda b: ran.append("a"), inputs=("b",)),
+            Stage("b", lambda a: ran.append("b"), inputs=("a",)),
+            Stage("c", lambda: ran.append("c")),
+        ], {})
+    assert ran == []
+
+def test_unknown_inputs_and_duplicate_outputs_are_rejected():
+    with pytest.raises(ValueError, match="unknown input"):
+        run_stages([Stage("a", lambda missing: 1, inputs=("missing",))], {})
+    with pytest.raises(ValueError, match="Duplicate"):
+        run_stages([Stage("a", lambda emit: 1, emits=("a",))], {})
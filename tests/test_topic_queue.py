@@ -0,0 +1,121 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import topic_queue
+from topic_queue import TopicQueue
+
+class FakeClock:
+    """Stands in for the time module inside topic_queue, so leases can expire on demand."""
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(topic_queue, "time", fake)
+    return fake
+
+def make_queue(tmp_path, lines, **kwargs) -> TopicQueue:
+    topics_file = tmp_path / "topics.txt"
+    topics_file.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+    queue = TopicQueue(str(tmp_path / "queue.sqlite3"), **kwargs)
+    queue.import_file(str(topics_file))
+    return queue
+
+def test_claim_hands_out_pending_topics_in_file_order(tmp_path, clock):
+    queue = make_queue(tmp_path, ["a", "b", "c"])
+    assert [topic.line for topic in queue.claim(2)] == ["a", "b"]
+    assert [topic.line for topic in queue.claim(5)] == ["c"]
+    assert queue.claim(1) == []
+
+def test_ack_finishes_a_topic_for_good(tmp_path, clock):
+    queue = make_queue(tmp_path, ["a", "b"])
+    topic = queue.claim(1)[0]
+    queue.ack(topic.id)
+    assert queue.counts() == {"done": 1, "pending": 1}
+
+    # A stale topics.txt that still lists the topic does not bring it back.
+    queue.import_file(str(tmp_path / "topics.txt"))
+    assert [topic.line for topic in queue.claim(5)] == ["b"]
+    queue.export_file(str(tmp_path / "topics.txt"))
+    assert (tmp_path / "topics.txt").read_text(encoding="utf-8") == "b\n"
+
+def test_nack_requeues_until_max_attempts(tmp_path, clock):
+    queue = make_queue(tmp_path, ["a", "b"], max_attempts=2)
+    topic = queue.claim(1)[0]
+    assert queue.nack(topic.id, "Error: first") == "pending"
+
+    # Back at its original position, ahead of "b", with the attempt counted.
+    retried = queue.claim(1)[0]
+    assert (retried.id, retried.line, retried.attempts) == (topic.id, "a", 1)
+    assert queue.nack(retried.id, "Error: second") == "failed"
+
+    assert [topic.line for topic in queue.claim(5)] == ["b"]
+    assert queue.failed() == [(topic.id, "a", 2, "Error: second")]
+    assert queue.requeue_failed() == 1
+    assert queue.pending()[0].attempts == 0
+
+def test_expired_lease_is_claimed_again(tmp_path, clock):
+    queue = make_queue(tmp_path, ["a"], lease_seconds=60)
+    topic = queue.claim(1, worker="w1")[0]
+
+    clock.now += 59
+    assert queue.claim(1, worker="w2") == []
+    clock.now += 2
+    reclaimed = queue.claim(1, worker="w2")
+    assert [t.id for t in reclaimed] == [topic.id]
+
+def test_extend_keeps_a_lease_alive(tmp_path, clock):
+    queue = make_queue(tmp_path, ["a"], lease_seconds=60)
+    topic = queue.claim(1)[0]
+    clock.now += 50
+    queue.extend(topic.id, 600)
+    clock.now += 100
+    assert queue.claim(1) == []
+
+def test_duplicates_are_never_claimed_or_reimported(tmp_path, clock):
+    queue = make_queue(tmp_path, ["a", "b"])
+    topic = queue.claim(1)[0]
+    queue.mark_duplicate(topic.id, "Duplicate: 90% similar")
+    queue.import_file(str(tmp_path / "topics.txt"))
+    assert [topic.line for topic in queue.claim(5)] == ["b"]
+    assert queue.counts()["duplicate"] == 1
+
+def test_import_prunes_pending_topics_removed_from_the_file(tmp_path, clock):
+    queue = make_queue(tmp_path, ["a", "b", "c"])
+    (tmp_path / "topics.txt").write_text("a\nc\nd\n", encoding="utf-8")
+    assert queue.import_file(str(tmp_path / "topics.txt")) == {"added": 1, "pruned": 1}
+    assert [topic.line for topic in queue.pending()] == ["a", "c", "d"]
+
+def test_claim_lines_takes_failed_but_not_live_topics(tmp_path, clock):
+    queue = make_queue(tmp_path, ["a", "b", "c"], max_attempts=1, lease_seconds=60)
+    failed, live = queue.claim(2)
+    queue.nack(failed.id, "Error: boom")
+    topics = queue.claim_lines(["a", "b", "c"])
+    assert [topic.line for topic in topics] == ["a", "c"]
+
+def test_concurrent_claims_never_share_a_topic(tmp_path):
+    lines = [f"topic {index}" for index in range(60)]
+    path = str(make_queue(tmp_path, lines).path)
+    workers = 8
+    start = threading.Barrier(workers)
+
+    def worker(number: int):
+        queue = TopicQueue(path)  # one connection per worker, as separate processes would have
+        start.wait()
+        claimed = []
+        while True:
+            batch = queue.claim(3, worker=f"w{number}")
+            if not batch:
+                return claimed
+            claimed.extend(topic.id for topic in batch)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(worker, range(workers)))
+    claimed = [topic_id for ids in results for topic_id in ids]
+    assert len(claimed) == len(set(claimed)) == len(lines)
@@ -1,18 +1,14 @@
-from openai import OpenAI, APIError
-from typing import List
-
-def generate_article(primary_keyword: str, secondary_keywords: List[str], api_key: str) -> str:
-    """
-    Generates a high-quality, SEO-optimized blog post in English based on primary and secondary keywords.
-    """
-    if not primary_keyword:
-        return "Error: Primary keyword was not provided."
-
-    try:
-        client = OpenAI(api_key=api_key)
-
-        # --- 시작: 여기가 교체된 새로운 시스템 프롬프트입니다 ---
-        system_prompt = f"""
+import os
+import re
+from openai import APIError
+from typing import Callable, Dict, List, Optional
+from llm_client import chat_completion, chat_completion_stream
+from article_parser import ArticleStreamParser
+from prompt_registry import PromptTemplate, register
+from run_checkpoint import topic_key
+
+# --- 시작: 여기가 교체된 새로운 시스템 프롬프트입니다 ---
+ARTICLE_SYSTEM_PROMPT = """
 You are 'The Homeland Insider,' a blog writer with a uniquely personal and authoritative voice. Your identity is central to your writing: you are from Seoul, your partner is from Saigon, and you now raise your family in Australia. Your blog's mission is to be the honest, insider guide that bridges these two cultures for curious travelers.
 
 Your tone is warm, confident, and deeply trustworthy—like a knowledgeable friend sharing their hometown secrets. You write to help people experience your homelands like a local, not just a tourist.
@@ -52,27 +48,74 @@ Your tone is warm, confident, and deeply trustworthy—like a knowledgeable frie
 
 * **Tags**: At the very end of the post, provide a single line of relevant keywords as hashtags (e.g., "#Keyword1 #Keyword2 #Keyword3").
 """
-        # --- 끝: 시스템 프롬프트 ---
-
-        user_prompt = f"Primary Keyword: {primary_keyword}\nSecondary Keywords: {', '.join(secondary_keywords)}"
+# --- 끝: 시스템 프롬프트 ---
+
+# Built once at import. The system prompt is the cached prefix; only the keywords vary.
+ARTICLE_PROMPT = register(PromptTemplate(
+    name="article",
+    version=1,
+    model="gpt-4-turbo",
+    system=ARTICLE_SYSTEM_PROMPT,
+    user="Primary Keyword: {primary_keyword}\nSecondary Keywords: {secondary_keywords}",
+    temperature=0.7,
+    max_completion_tokens=2500,
+))
+
+def article_request(primary_keyword: str, secondary_keywords: List[str]) -> Dict[str, object]:
+    """
+    The complete chat completion request for an article. generate_article and the
+    Batch API path both send exactly this, so their answers are interchangeable.
+    """
+    return ARTICLE_PROMPT.render(primary_keyword=primary_keyword, secondary_keywords=', '.join(secondary_keywords))
 
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2500,
-        )
+def draft_path_for(primary_keyword: str, topic_line: Optional[str] = None) -> str:
+    """
+    Local file that receives a streamed article while it is being generated. It is keyed
+    on the whole topic line, so topics sharing a primary keyword never share a draft.
+    """
+    slug = re.sub(r'[^a-z0-9\s-]', '', primary_keyword.lower()).strip()
+    slug = re.sub(r'\s+', '-', slug) or "article"
+    if topic_line:
+        slug = f"{slug}-{topic_key(topic_line)[:8]}"
+    return os.path.join(os.getenv("BLOG_STUDIO_DRAFTS_DIR", "drafts"), f"{slug}.md")
+
+def generate_article(primary_keyword: str, secondary_keywords: List[str], api_key: str, stream: bool = False, on_event: Optional[Callable[[str, str], None]] = None,
+                     topic_line: Optional[str] = None) -> str:
+    """
+    Generates a high-quality, SEO-optimized blog post in English based on primary and secondary keywords.
+    With stream=True the completion is consumed as it arrives: on_event receives the title,
+    subtitle, section headings and tag line as soon as they are complete, and the text is
+    written progressively to a draft file so a dropped connection keeps what was received.
+    """
+    if not primary_keyword:
+        return "Error: Primary keyword was not provided."
 
-        article = response.choices[0].message.content.strip()
+    request = article_request(primary_keyword, secondary_keywords)
+    draft_path = draft_path_for(primary_keyword, topic_line)
+    try:
+        if not stream:
+            article = chat_completion(api_key, **request, prompt=ARTICLE_PROMPT)
+            return article
+
+        os.makedirs(os.path.dirname(draft_path) or ".", exist_ok=True)
+        parser = ArticleStreamParser(on_event)
+        with open(draft_path, 'w', encoding='utf-8') as draft:
+            def on_delta(delta: str) -> None:
+                draft.write(delta)
+                draft.flush()
+                parser.feed(delta)
+
+            article = chat_completion_stream(api_key, **request, on_delta=on_delta, prompt=ARTICLE_PROMPT)
+        parser.close()
+        os.remove(draft_path)
         return article
 
     except APIError as e:
-        return f"Error: An OpenAI API error occurred while generating the article - {e}"
+        suffix = f" (partial draft kept at '{draft_path}')" if stream and os.path.exists(draft_path) else ""
+        return f"Error: An OpenAI API error occurred while generating the article - {e}{suffix}"
     except Exception as e:
-        return f"Error: An unexpected error occurred while generating the article - {e}"
+        suffix = f" (partial draft kept at '{draft_path}')" if stream and os.path.exists(draft_path) else ""
+        return f"Error: An unexpected error occurred while generating the article - {e}{suffix}"
 
 if __name__ == '__main__':
     # For standalone testing
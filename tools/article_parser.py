@@ -0,0 +1,99 @@
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+HEADING_RE = re.compile(r"^#{2,6}\s+(.*)$")
+TAG_LINE_RE = re.compile(r"^#[^\s#]")
+
+def parse_article(content: str) -> Dict[str, object]:
+    """
+    Splits a generated article into its parts in one pass: the first line is the title,
+    the second the subtitle, the last hashtag line (#Tag, not a ## heading) is the tag
+    line and everything in between is the body. H2-H6 headings after the subtitle are
+    collected as sections. Blank lines never count, as in ArticleStreamParser.
+    """
+    lines = content.strip().split('\n')
+
+    # Find the last hashtag line, which is the tag line
+    tag_line = ""
+    main_lines = lines
+    for i in range(len(lines) - 1, -1, -1):
+        if TAG_LINE_RE.match(lines[i].strip()):
+            tag_line = lines[i].strip()
+            # The content is everything before the tag line
+            main_lines = lines[:i]
+            break
+
+    main_content = "\n".join(main_lines).strip()
+    content_lines = main_content.split('\n')
+    title = content_lines[0].strip() if content_lines else ""
+    subtitle_and_body = "\n".join(content_lines[1:]).strip()
+    non_empty = [line.strip() for line in content_lines if line.strip()]
+    sections = [m.group(1).strip() for m in (HEADING_RE.match(line) for line in non_empty[2:]) if m]
+
+    return {
+        "title": title,
+        "subtitle_and_body": subtitle_and_body,
+        "sections": sections,
+        "tag_line": tag_line,
+        "tags": re.findall(r"#([^\s#]+)", tag_line),
+    }
+
+def clean_title(title: str) -> str:
+    """A title without the markdown heading markers or emphasis the model sometimes wraps it in."""
+    title = re.sub(r"^(?:#+\s*)+", "", title.strip())
+    title = re.sub(r"^(\*\*|__)(.*)\1$", r"\2", title)
+    return re.sub(r"\s+", " ", title).strip()
+
+def parse_post(text: str) -> Tuple[Dict[str, str], str]:
+    """Splits a rendered Jekyll post into a flat front matter dict and its markdown body."""
+    front_matter: Dict[str, str] = {}
+    body = text
+    if text.startswith("---"):
+        parts = text.split("---", 2)
+        if len(parts) == 3:
+            for line in parts[1].splitlines():
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    front_matter[key.strip()] = value.strip().strip('"')
+            body = parts[2]
+    return front_matter, body
+
+class ArticleStreamParser:
+    """
+    Incremental counterpart of parse_article for streamed completions. Feed it text
+    deltas; it calls on_event(name, value) as soon as a complete line reveals the
+    title, the subtitle, a section heading or a hashtag line, and ("done", text) on close.
+    """
+    def __init__(self, on_event: Optional[Callable[[str, str], None]] = None):
+        self.on_event = on_event or (lambda name, value: None)
+        self.text = ""
+        self._pending = ""
+        self._content_lines: List[str] = []
+
+    def feed(self, delta: str) -> None:
+        self.text += delta
+        self._pending += delta
+        while '\n' in self._pending:
+            line, self._pending = self._pending.split('\n', 1)
+            self._handle_line(line)
+
+    def close(self) -> str:
+        if self._pending:
+            self._handle_line(self._pending)
+            self._pending = ""
+        self.on_event("done", self.text)
+        return self.text
+
+    def _handle_line(self, line: str) -> None:
+        line = line.strip()
+        if not line:
+            return
+        self._content_lines.append(line)
+        if len(self._content_lines) == 1:
+            self.on_event("title", line)
+        elif len(self._content_lines) == 2:
+            self.on_event("subtitle", line)
+        elif HEADING_RE.match(line):
+            self.on_event("section", HEADING_RE.match(line).group(1).strip())
+        elif TAG_LINE_RE.match(line):
+            self.on_event("tags", line)
@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List, Optional
+from fake_services import FakeServer, GitHubHandler, start_fake_services
+from instrumentation import percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_TOPICS = [
+    "Seoul Street Food", "Saigon Night Markets", "Sapa Rice Terraces", "Jeju Island Beaches",
+    "Hongdae Nightlife", "Seoul Subway Budget Tips", "Bukchon Hanok Village", "Halong Bay Cruise",
+    "Busan Seafood Markets", "Dalat Coffee Culture", "Gyeongbokgung Palace", "Phu Quoc Snorkeling",
+]
+
+def bench_topics(count: int) -> List[str]:
+    """Distinct topic lines in the topics.txt format."""
+    lines = []
+    for index in range(count):
+        name = BENCH_TOPICS[index % len(BENCH_TOPICS)]
+        suffix = f" {index // len(BENCH_TOPICS) + 1}" if index >= len(BENCH_TOPICS) else ""
+        lines.append(f"Primary: {name}{suffix}; Secondary: local tips, family travel, hidden gems")
+    return lines
+
+def run_once(batch: int, concurrency: int, services: Dict, extra_args: List[str]) -> Dict:
+    """
+    Runs agent_studio.py in a scratch directory against the fake services and returns
+    its run record plus wall time and the child's peak RSS.
+    """
+    workdir = tempfile.mkdtemp(prefix="blog-bench-")
+    try:
+        with open(os.path.join(workdir, "topics.txt"), 'w', encoding='utf-8') as f:
+            f.writelines(f"{line}\n" for line in bench_topics(batch))
+
+        env = dict(os.environ)
+        env.update({
+            "OPENAI_API_KEY": "bench-key",
+            "OPENAI_BASE_URL": f"{services['openai'].url}/v1",
+            "PIXABAY_API_KEY": "bench-key",
+            "PIXABAY_API_URL": f"{services['pixabay'].url}/api/",
+            "GITHUB_TOKEN": "bench-token",
+            "GITHUB_API_URL": services["github"].url,
+            "GITHUB_REPO_NAME": "bench/blog",
+            "LLM_CACHE_BYPASS": "1",
+            "CATEGORY_CONFIDENCE_THRESHOLD": "1.01",  # always exercise the category call
+        })
+        command = [sys.executable, os.path.join(REPO_ROOT, "agent_studio.py"), "run",
+                   "--batch", str(batch), "--concurrency", str(concurrency), *extra_args]
+        started = time.perf_counter()
+        process = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = process.stdout.read().decode("utf-8", "replace")
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        wall = time.perf_counter() - started
+
+        log_path = os.path.join(workdir, "logs", "runs.jsonl")
+        if not os.path.exists(log_path):
+            raise RuntimeError(f"The run did not write a run record:\n{output}")
+        with open(log_path, 'r', encoding='utf-8') as f:
+            record = json.loads(f.read().splitlines()[-1])
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak_rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        return {"record": record, "wall": wall, "peak_rss_mb": peak_rss_mb,
+                "exit_code": process.returncode, "output": output}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def summarize(batch: int, concurrency: int, result: Dict) -> Dict:
+    record = result["record"]
+    ok_posts = sum(1 for topic in record["topics"] if topic["ok"])
+    stages: Dict[str, List[float]] = {}
+    for stage in record["stages"]:
+        stages.setdefault(stage["stage"], []).append(stage["seconds"])
+    return {
+        "batch": batch,
+        "concurrency": concurrency,
+        "ok_posts": ok_posts,
+        "wall_seconds": round(result["wall"], 3),
+        "posts_per_minute": round(ok_posts / result["wall"] * 60, 2) if result["wall"] else 0.0,
+        "peak_rss_mb": round(result["peak_rss_mb"], 1),
+        "stages": {name: {"p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+                   for name, values in sorted(stages.items())},
+        "services": record["services"],
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point, also reached through `agent_studio.py bench`."""
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline against local stand-ins for OpenAI, Pixabay and GitHub.")
+    parser.add_argument("--batches", default="1,4,8", help="Comma-separated batch sizes to run.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--openai-latency", type=float, default=0.5)
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="Delay between streamed chunks.")
+    parser.add_argument("--pixabay-latency", type=float, default=0.1)
+    parser.add_argument("--github-latency", type=float, default=0.05)
+    parser.add_argument("--stream", action="store_true", help="Benchmark the streaming article path.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    services = start_fake_services(args.openai_latency, args.chunk_delay, args.pixabay_latency, args.github_latency)
+    extra_args = ["--stream"] if args.stream else []
+    summaries = []
+    try:
+        for batch in [int(value) for value in args.batches.split(",") if value.strip()]:
+            # Every batch size publishes into an empty repository, so runs are comparable.
+            services["github"].stop()
+            services["github"] = FakeServer(GitHubHandler, latency=args.github_latency).start()
+            result = run_once(batch, args.concurrency, services, extra_args)
+            summary = summarize(batch, args.concurrency, result)
+            summaries.append(summary)
+            if summary["ok_posts"] < batch:
+                print(result["output"])
+            print(f"batch={batch:<4} concurrency={args.concurrency:<3} ok={summary['ok_posts']:<4} "
+                  f"wall={summary['wall_seconds']:>7.2f}s  posts/min={summary['posts_per_minute']:>7.2f}  "
+                  f"peak RSS={summary['peak_rss_mb']:>6.1f} MB")
+            for name, values in summary["stages"].items():
+                print(f"    {name:<16} p50={values['p50']:.3f}s  p95={values['p95']:.3f}s")
+    finally:
+        for server in services.values():
+            server.stop()
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(summaries, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -1,56 +1,66 @@
 import os
-from openai import OpenAI, APIError
+from typing import Dict, Optional
+from category_classifier import CATEGORIES, classify_category
+from prompt_registry import PromptTemplate, register
 
-def assign_category(topic: str, api_key: str) -> str:
+# Built once at import. The category list lives in the static system prompt; the
+# answer is a single category name (at most 7 tokens), hence the small budget.
+CATEGORY_PROMPT = register(PromptTemplate(
+    name="category",
+    version=1,
+    model="gpt-4-turbo",
+    system="""당신은 블로그 콘텐츠를 정확하게 분류하는 카테고리 전문가입니다.
+사용자의 블로그 주제를 보고, 아래에 정의된 6개의 카테고리 중 가장 적합한 카테고리 *하나만* 골라야 합니다.
+다른 설명 없이, 오직 카테고리 이름만 정확하게 반환해야 합니다.
+
+[카테고리 목록]
+""" + "\n".join(f"- {category}" for category in CATEGORIES),
+    user="블로그 주제: '{topic}'",
+    temperature=0,
+    max_completion_tokens=16,
+))
+
+def category_request(topic: str) -> Dict[str, object]:
+    """
+    The complete chat completion request for a category. assign_category and the
+    Batch API path both send exactly this, so their answers are interchangeable.
+    """
+    return CATEGORY_PROMPT.render(topic=topic)
+
+def local_category(topic: str) -> Optional[str]:
+    """The local classifier's category if it clears CATEGORY_CONFIDENCE_THRESHOLD (default 0.85), else None."""
+    category, confidence = classify_category(topic)
+    return category if confidence >= float(os.getenv("CATEGORY_CONFIDENCE_THRESHOLD", "0.85")) else None
+
+def match_category(assigned_category: str) -> str:
+    """Maps the model's answer onto one of the defined categories."""
+    if assigned_category in CATEGORIES:
+        return assigned_category
+    for cat in CATEGORIES:
+        if cat.split(' ')[0].lower() in assigned_category.lower():
+            return cat
+    return "Uncategorized"
+
+def assign_category(topic: str, api_key: str, use_local: bool = True) -> str:
     """
     주어진 주제(topic)를 분석하여, 정의된 6개의 카테고리 중 가장 적합한 카테고리 하나를 결정합니다.
+    로컬 분류기의 신뢰도가 CATEGORY_CONFIDENCE_THRESHOLD(기본 0.85) 이상이면 OpenAI 호출을 생략합니다.
     """
     if not topic or "오류:" in topic:
         return "분류할 유효한 주제가 없습니다."
 
-    categories = [
-        "K-Culture & Palaces",
-        "Street Food & Night Markets",
-        "Mountains & Rice Terraces",
-        "Beaches, Bays & Islands",
-        "City Vibes & Night-life",
-        "Budget Hacks & Transport"
-    ]
+    if use_local:
+        category = local_category(topic)
+        if category:
+            return category
 
+    # The OpenAI client is only loaded when the local classifier is not confident enough.
+    from openai import APIError
+    from llm_client import chat_completion
     try:
-        client = OpenAI(api_key=api_key)
-        system_prompt = """
-        당신은 블로그 콘텐츠를 정확하게 분류하는 카테고리 전문가입니다.
-        사용자의 블로그 주제를 보고, 아래에 정의된 6개의 카테고리 중 가장 적합한 카테고리 *하나만* 골라야 합니다.
-        다른 설명 없이, 오직 카테고리 이름만 정확하게 반환해야 합니다.
-
-        [카테고리 목록]
-        - K-Culture & Palaces
-        - Street Food & Night Markets
-        - Mountains & Rice Terraces
-        - Beaches, Bays & Islands
-        - City Vibes & Night-life
-        - Budget Hacks & Transport
-        """
-        user_prompt = f"블로그 주제: '{topic}'"
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0,
-            max_tokens=50,
-        )
-        assigned_category = response.choices[0].message.content.strip()
-        if assigned_category in categories:
-            return assigned_category
-        else:
-            for cat in categories:
-                if cat.split(' ')[0].lower() in assigned_category.lower():
-                    return cat
-            return "Uncategorized"
+        assigned_category = chat_completion(api_key, **category_request(topic), prompt=CATEGORY_PROMPT)
+        return match_category(assigned_category)
     except APIError as e:
         return f"오류: 카테고리 분류 중 OpenAI API 오류 발생 - {e}"
     except Exception as e:
-        return f"오류: 카테고리 분류 중 예상치 못한 오류 발생 - {e}"
\ No newline at end of file
+        return f"오류: 카테고리 분류 중 예상치 못한 오류 발생 - {e}"
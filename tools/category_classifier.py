@@ -0,0 +1,145 @@
+import os
+import re
+import glob
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from article_parser import parse_post
+
+CATEGORIES = [
+    "K-Culture & Palaces",
+    "Street Food & Night Markets",
+    "Mountains & Rice Terraces",
+    "Beaches, Bays & Islands",
+    "City Vibes & Night-life",
+    "Budget Hacks & Transport"
+]
+
+# Seed vocabulary per category. It is treated as one extra training document per
+# category so the classifier works before there are many published posts.
+CATEGORY_SEEDS: Dict[str, List[str]] = {
+    "K-Culture & Palaces": [
+        "palace", "palaces", "gyeongbok", "gyeongbokgung", "changdeok", "changdeokgung", "deoksugung",
+        "hanok", "hanbok", "temple", "temples", "shrine", "jongmyo", "bukchon", "seochon", "insadong",
+        "museum", "gallery", "heritage", "dynasty", "joseon", "kpop", "k-pop", "kdrama", "k-drama",
+        "culture", "tradition", "traditional", "history", "historic", "tea", "ceremony", "imperial", "citadel",
+    ],
+    "Street Food & Night Markets": [
+        "food", "street", "market", "markets", "night", "eat", "eats", "eating", "pho", "banh", "mi",
+        "tteokbokki", "hotteok", "kimbap", "bbq", "barbecue", "noodles", "soup", "coffee", "cafe", "cafes",
+        "dish", "dishes", "snack", "snacks", "vendor", "vendors", "gwangjang", "myeongdong", "restaurant",
+        "restaurants", "dining", "taste", "flavors", "broth", "seafood", "egg",
+    ],
+    "Mountains & Rice Terraces": [
+        "mountain", "mountains", "hike", "hiking", "trek", "trekking", "trail", "trails", "peak", "summit",
+        "rice", "terraces", "terrace", "sapa", "bukhansan", "seoraksan", "hallasan", "jirisan", "valley",
+        "waterfall", "forest", "highlands", "ha", "giang", "dalat", "national", "park", "sunrise", "ridge",
+    ],
+    "Beaches, Bays & Islands": [
+        "beach", "beaches", "bay", "bays", "island", "islands", "halong", "ha", "long", "jeju", "phu",
+        "quoc", "nha", "trang", "busan", "haeundae", "coast", "coastal", "sea", "ocean", "snorkel",
+        "snorkeling", "diving", "surf", "cruise", "kayak", "sand", "resort", "con", "dao", "mui", "ne",
+    ],
+    "City Vibes & Night-life": [
+        "city", "nightlife", "night-life", "bar", "bars", "rooftop", "club", "clubs", "gangnam", "hongdae",
+        "itaewon", "district", "neighborhood", "neighbourhood", "shopping", "mall", "skyline", "downtown",
+        "bui", "vien", "walking", "live", "music", "pub", "drinks", "cocktail", "vibes", "urban", "saigon",
+    ],
+    "Budget Hacks & Transport": [
+        "budget", "cheap", "save", "saving", "money", "cost", "costs", "price", "prices", "hack", "hacks",
+        "transport", "transportation", "subway", "metro", "bus", "train", "ktx", "taxi", "grab", "airport",
+        "card", "t-money", "tmoney", "sim", "visa", "exchange", "currency", "pass", "ticket", "tickets",
+        "fare", "fares", "tips", "guide", "motorbike", "scooter",
+    ],
+}
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "at", "to", "for", "with", "by", "from", "is", "are",
+    "was", "were", "be", "it", "its", "this", "that", "these", "those", "you", "your", "my", "our", "we",
+    "i", "me", "as", "but", "not", "so", "if", "into", "about", "up", "out", "can", "will", "just", "all",
+    "primary", "secondary", "s",
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases text and splits it into word tokens, dropping markdown and stopwords."""
+    words = re.findall(r"[a-z0-9][a-z0-9'-]*", text.lower())
+    return [w.strip("'-") for w in words if w.strip("'-") and w.strip("'-") not in STOPWORDS]
+
+def read_post(path: str) -> Tuple[Dict[str, str], str]:
+    """Splits a Jekyll post into a flat front matter dict and its markdown body."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_post(f.read())
+
+def load_labeled_posts(posts_dir: str = "_posts") -> List[Tuple[str, str, str]]:
+    """Returns (path, category, text) for every post whose front matter has a known category."""
+    labeled = []
+    for path in sorted(glob.glob(os.path.join(posts_dir, "*.md"))):
+        front_matter, body = read_post(path)
+        category = front_matter.get("category", "")
+        if category in CATEGORIES:
+            labeled.append((path, category, f"{front_matter.get('title', '')}\n{body}"))
+    return labeled
+
+class CategoryClassifier:
+    """
+    A multinomial naive Bayes classifier over word counts. Training is a single pass
+    over the documents and a prediction is a handful of dictionary lookups.
+    """
+    def __init__(self, alpha: float = 0.5):
+        self.alpha = alpha
+        self.word_counts: Dict[str, Counter] = {category: Counter() for category in CATEGORIES}
+        self.doc_counts: Counter = Counter()
+        self.vocabulary: set = set()
+
+    def add_document(self, category: str, tokens: List[str], weight: int = 1) -> None:
+        for token in tokens:
+            self.word_counts[category][token] += weight
+        self.vocabulary.update(tokens)
+        self.doc_counts[category] += 1
+
+    def probabilities(self, text: str) -> Dict[str, float]:
+        """Posterior probability of every category for the given text."""
+        tokens = [token for token in tokenize(text) if token in self.vocabulary]
+        total_docs = sum(self.doc_counts.values()) or 1
+        vocabulary_size = len(self.vocabulary) or 1
+        scores = {}
+        for category in CATEGORIES:
+            counts = self.word_counts[category]
+            denominator = sum(counts.values()) + self.alpha * vocabulary_size
+            score = math.log((self.doc_counts[category] + 1) / (total_docs + len(CATEGORIES)))
+            for token in tokens:
+                score += math.log((counts[token] + self.alpha) / denominator)
+            scores[category] = score
+        best = max(scores.values())
+        exp_scores = {category: math.exp(score - best) for category, score in scores.items()}
+        normalizer = sum(exp_scores.values())
+        return {category: value / normalizer for category, value in exp_scores.items()}
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Returns the most likely category and its posterior probability."""
+        probabilities = self.probabilities(text)
+        category = max(probabilities, key=probabilities.get)
+        return category, probabilities[category]
+
+def build_classifier(posts_dir: str = "_posts", exclude: Optional[str] = None) -> CategoryClassifier:
+    """Trains a classifier on the seed vocabulary plus the existing posts (optionally leaving one out)."""
+    classifier = CategoryClassifier()
+    for category, seeds in CATEGORY_SEEDS.items():
+        # Seeds are weighted up so a single long post does not drown them out.
+        classifier.add_document(category, seeds, weight=3)
+    for path, category, text in load_labeled_posts(posts_dir):
+        if path != exclude:
+            classifier.add_document(category, tokenize(text))
+    return classifier
+
+_classifier: Optional[CategoryClassifier] = None
+_classifier_lock = threading.Lock()
+
+def classify_category(topic: str) -> Tuple[str, float]:
+    """Classifies a topic with the shared classifier, building it on first use."""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = build_classifier()
+    return _classifier.classify(topic)
@@ -0,0 +1,57 @@
+import os
+import argparse
+from category_classifier import build_classifier, load_labeled_posts
+from category_assigner import assign_category
+
+def evaluate(posts_dir: str, threshold: float, labels: str, api_key: str = None) -> None:
+    """
+    Leave-one-out evaluation of the local classifier on the existing posts. Each post is
+    classified from its title (what the pipeline sees at run time) by a classifier trained
+    on the seeds and every other post, and compared with the reference label.
+    """
+    posts = load_labeled_posts(posts_dir)
+    if not posts:
+        print(f"No labeled posts found in '{posts_dir}'.")
+        return
+
+    total = correct = confident = confident_correct = 0
+    for path, front_matter_category, text in posts:
+        title = text.split('\n', 1)[0].lstrip('#').strip()
+        if labels == "llm":
+            reference = assign_category(title, api_key=api_key, use_local=False)
+        else:
+            reference = front_matter_category
+
+        predicted, confidence = build_classifier(posts_dir, exclude=path).classify(title)
+        is_correct = predicted == reference
+        total += 1
+        correct += is_correct
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += is_correct
+
+        mark = "OK " if is_correct else "BAD"
+        print(f"[{mark}] {confidence:.2f} {predicted:<28} ref={reference:<28} {os.path.basename(path)}")
+
+    print("--- Local Classifier Evaluation ---")
+    print(f"Reference labels: {labels}")
+    print(f"Accuracy (all posts): {correct}/{total} = {correct / total:.1%}")
+    if confident:
+        print(f"Answered locally at threshold {threshold}: {confident}/{total} = {confident / total:.1%}")
+        print(f"Accuracy when answered locally: {confident_correct}/{confident} = {confident_correct / confident:.1%}")
+    else:
+        print(f"No post reached the threshold {threshold}; every call would go to the LLM.")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Evaluate the local category classifier against existing posts.")
+    parser.add_argument("--posts-dir", default="_posts")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("CATEGORY_CONFIDENCE_THRESHOLD", "0.85")))
+    parser.add_argument("--labels", choices=["llm", "frontmatter"], default="llm",
+                        help="Compare against fresh LLM labels (needs OPENAI_API_KEY) or the category already in the front matter.")
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if args.labels == "llm" and not api_key:
+        print("OPENAI_API_KEY is not set. Falling back to front matter labels.")
+        args.labels = "frontmatter"
+    evaluate(args.posts_dir, args.threshold, args.labels, api_key)
@@ -0,0 +1,410 @@
+import io
+import base64
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import urlparse, parse_qs, unquote
+
+try:
+    from PIL import Image
+except ImportError:  # Synthetic images need Pillow; the fake Pixabay refuses to start without it.
+    Image = None
+
+class FakeServer:
+    """Runs a ThreadingHTTPServer on a free localhost port in a background thread."""
+    def __init__(self, handler_class, **settings):
+        handler = type(handler_class.__name__, (handler_class,), {"settings": settings, "state": {}, "lock": threading.Lock()})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.handler = handler
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def start(self) -> "FakeServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    settings: Dict = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _send_json(self, data, status: int = 200, headers: Dict[str, str] = None) -> None:
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _delay(self) -> None:
+        latency = self.settings.get("latency", 0.0)
+        jitter = self.settings.get("jitter", 0.0)
+        if latency or jitter:
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+
+# --- OpenAI-compatible chat completions ---
+
+def synthetic_article(topic: str, paragraphs: int = 6) -> str:
+    """A deterministic article in the shape generate_article produces: title, subtitle, H2 sections, tags."""
+    words = [word for word in re.findall(r"[A-Za-z]+", topic)] or ["Travel"]
+    lines = [f"### {topic.title()}: An Insider's Guide", f"#### What {words[0]} taught me about slowing down", ""]
+    filler = ("I still remember the first time I came here with my family, when the streets were quieter "
+              "and the vendors knew every regular by name. ") * 3
+    for index in range(paragraphs):
+        lines += [f"## Section {index + 1}: {words[index % len(words)].title()} Like a Local 🌿", "", filler.strip(), ""]
+    lines.append(" ".join(f"#{word.title()}" for word in words[:5]))
+    return "\n".join(lines)
+
+class OpenAIHandler(_JsonHandler):
+    """
+    POST /v1/chat/completions. Answers category prompts with a fixed category and
+    everything else with a synthetic article, either as one JSON body or as SSE chunks.
+    Also the Batch API: POST /v1/files, POST /v1/batches, GET /v1/batches/<id> and
+    GET /v1/files/<id>/content; a batch completes `batch_delay` seconds after creation.
+    Settings: latency (seconds before the first byte), chunk_delay (seconds between stream chunks).
+    """
+    def _completion(self, request: Dict) -> Tuple[str, Dict]:
+        messages = request.get("messages", [])
+        user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        topic_match = re.search(r"Primary Keyword:\s*(.*)", user)
+        if topic_match:
+            content = synthetic_article(topic_match.group(1).strip(), self.settings.get("paragraphs", 6))
+        else:
+            content = "City Vibes & Night-life"
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        completion_tokens = len(content) // 4
+        return content, {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}
+
+    def _completion_json(self, request: Dict, content: str, usage: Dict) -> Dict:
+        return {
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model", "gpt-4-turbo"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": usage,
+        }
+
+    def _batch_json(self, batch: Dict) -> Dict:
+        with self.lock:
+            if batch["status"] == "in_progress" and time.time() >= batch["created_at"] + self.settings.get("batch_delay", 0.0):
+                lines = []
+                for raw_line in self.state["files"][batch["input_file_id"]].decode("utf-8").splitlines():
+                    item = json.loads(raw_line)
+                    content, usage = self._completion(item["body"])
+                    lines.append(json.dumps({"id": f"batch_req_{len(lines)}", "custom_id": item["custom_id"], "error": None,
+                                             "response": {"status_code": 200, "request_id": "req-bench",
+                                                          "body": self._completion_json(item["body"], content, usage)}}))
+                output_id = f"file-{len(self.state['files']) + 1}"
+                self.state["files"][output_id] = ("\n".join(lines) + "\n").encode("utf-8")
+                batch.update(status="completed", output_file_id=output_id, completed_at=int(time.time()),
+                             request_counts={"total": len(lines), "completed": len(lines), "failed": 0})
+            return dict(batch)
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip("/")
+        match = re.fullmatch(r"/v1/batches/([\w-]+)", path)
+        if match and match.group(1) in self.state.get("batches", {}):
+            return self._send_json(self._batch_json(self.state["batches"][match.group(1)]))
+        match = re.fullmatch(r"/v1/files/([\w-]+)/content", path)
+        if match and match.group(1) in self.state.get("files", {}):
+            payload = self.state["files"][match.group(1)]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self._send_json({"error": {"message": "not found"}}, 404)
+
+    def _upload(self) -> None:
+        """Stores the single file part of a multipart upload."""
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        message = BytesParser().parsebytes(f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode() + raw)
+        payload = next(part.get_payload(decode=True) for part in message.get_payload() if part.get_filename())
+        with self.lock:
+            files = self.state.setdefault("files", {})
+            file_id = f"file-{len(files) + 1}"
+            files[file_id] = payload
+        self._send_json({"id": file_id, "object": "file", "bytes": len(payload), "created_at": int(time.time()),
+                         "filename": "batch.jsonl", "purpose": "batch", "status": "processed"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip("/")
+        if path == "/v1/files":
+            return self._upload()
+        if path == "/v1/batches":
+            request = self._body()
+            with self.lock:
+                batches = self.state.setdefault("batches", {})
+                batch_id = f"batch_{len(batches) + 1}"
+                batches[batch_id] = {
+                    "id": batch_id, "object": "batch", "endpoint": request["endpoint"], "status": "in_progress",
+                    "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+                    "created_at": int(time.time()), "metadata": request.get("metadata"),
+                    "output_file_id": None, "error_file_id": None,
+                }
+            return self._send_json(self._batch_json(batches[batch_id]))
+        if not path.endswith("/chat/completions"):
+            return self._send_json({"error": {"message": "not found"}}, 404)
+        request = self._body()
+        content, usage = self._completion(request)
+        headers = {"x-ratelimit-remaining-requests": "9999", "x-ratelimit-reset-requests": "1s"}
+        self._delay()
+
+        if not request.get("stream"):
+            return self._send_json(self._completion_json(request, content, usage), headers=headers)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+
+        def send_event(data) -> None:
+            payload = f"data: {json.dumps(data) if not isinstance(data, str) else data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+            self.wfile.flush()
+
+        base = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": request.get("model", "gpt-4-turbo")}
+        pieces = re.findall(r"\S+\s*", content)
+        for start in range(0, len(pieces), 8):
+            send_event({**base, "choices": [{"index": 0, "finish_reason": None,
+                                              "delta": {"content": "".join(pieces[start:start + 8])}}]})
+            time.sleep(self.settings.get("chunk_delay", 0.0))
+        send_event({**base, "choices": [{"index": 0, "finish_reason": "stop", "delta": {}}]})
+        if (request.get("stream_options") or {}).get("include_usage"):
+            send_event({**base, "choices": [], "usage": usage})
+        send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+# --- Pixabay search and image CDN ---
+
+_image_cache: Dict[Tuple[int, int, int], bytes] = {}
+_image_lock = threading.Lock()
+
+def synthetic_jpeg(seed: int, width: int, height: int) -> bytes:
+    """A noisy gradient JPEG, so recompression does real work. Cached per seed and size."""
+    key = (seed, width, height)
+    with _image_lock:
+        if key not in _image_cache:
+            rng = random.Random(seed)
+            base = Image.linear_gradient("L").resize((width, height))
+            noise = Image.effect_noise((width, height), 40 + seed % 30)
+            image = Image.merge("RGB", (base, noise, base.rotate(90 + rng.randint(0, 180)).resize((width, height))))
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=95)
+            _image_cache[key] = buffer.getvalue()
+        return _image_cache[key]
+
+class PixabayHandler(_JsonHandler):
+    """
+    GET /api/?q=...&page=...&per_page=... returns hits whose largeImageURL points at
+    GET /images/<id>.jpg on the same server. Every third image is a square crop, so the
+    ranking has something to prefer. Settings: latency, image_count (distinct images), width, height.
+    """
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path.rstrip("/") == "/api":
+            self._delay()
+            params = parse_qs(parsed.query)
+            query = params.get("q", [""])[0]
+            page, per_page = int(params.get("page", ["1"])[0]), int(params.get("per_page", ["20"])[0])
+            seed = int(hashlib.sha256(query.encode("utf-8")).hexdigest(), 16)
+            count = self.settings.get("image_count", 50)
+            width, height = self.settings.get("width", 1920), self.settings.get("height", 1280)
+            total = count
+            hits = []
+            for offset in range((page - 1) * per_page, min(page * per_page, total)):
+                image_id = (seed + offset * 7919) % count
+                hits.append({
+                    "id": image_id, "likes": (seed >> offset) % 500,
+                    "imageWidth": width, "imageHeight": height if image_id % 3 else width,
+                    "largeImageURL": f"http://{self.headers.get('Host')}/images/{image_id}.jpg",
+                    "tags": query.lower(),
+                })
+            return self._send_json({"total": total, "totalHits": total, "hits": hits},
+                                   headers={"X-RateLimit-Limit": "100", "X-RateLimit-Remaining": "99", "X-RateLimit-Reset": "60"})
+
+        match = re.fullmatch(r"/images/(\d+)\.jpg", parsed.path)
+        if match:
+            self._delay()
+            payload = synthetic_jpeg(int(match.group(1)), self.settings.get("width", 1920), self.settings.get("height", 1280))
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self._send_json({"error": "not found"}, 404)
+
+# --- GitHub REST / Git Data ---
+
+class GitHubHandler(_JsonHandler):
+    """
+    The subset of the GitHub API used by publish_posts and the backfill: repository
+    metadata, refs, commits, trees and blobs for one repository kept in memory. Trees are stored flat
+    (full path -> blob sha); directory listings are derived from the path prefixes.
+    Settings: latency, repo (owner/name).
+    """
+    def _repo_state(self) -> Dict:
+        with self.lock:
+            if not self.state:
+                root = self._sha("tree", {})
+                self.state.update({
+                    "blobs": {}, "trees": {root: {}},
+                    "commits": {}, "ref": None, "calls": 0,
+                })
+                commit = self._sha("commit", root)
+                self.state["commits"][commit] = {"tree": root, "parents": [], "message": "initial"}
+                self.state["ref"] = commit
+            self.state["calls"] += 1
+            return self.state
+
+    @staticmethod
+    def _sha(kind: str, payload) -> str:
+        return hashlib.sha1(f"{kind}:{json.dumps(payload, sort_keys=True)}:{time.time_ns()}".encode()).hexdigest()
+
+    def _base(self) -> str:
+        return f"http://{self.headers.get('Host')}/repos/{self.settings.get('repo', 'bench/blog')}"
+
+    def _headers(self) -> Dict[str, str]:
+        return {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4999",
+                "X-RateLimit-Reset": str(int(time.time()) + 3600)}
+
+    def _tree_json(self, sha: str, entries: Dict[str, str]) -> Dict:
+        return {"sha": sha, "url": f"{self._base()}/git/trees/{sha}", "truncated": False,
+                "tree": [{"path": path, "mode": "040000" if kind == "tree" else "100644", "type": kind,
+                          "sha": child_sha, "url": f"{self._base()}/git/{kind}s/{child_sha}"}
+                         for path, (kind, child_sha) in sorted(entries.items())]}
+
+    def _listing(self, tree_sha: str, prefix: str) -> Dict[str, Tuple[str, str]]:
+        """Immediate children of a directory inside a flat tree."""
+        if prefix and not prefix.endswith("/"):
+            prefix += "/"  # the request path lost its trailing slash
+        entries = {}
+        for path, blob_sha in self.state["trees"][tree_sha].items():
+            if not path.startswith(prefix):
+                continue
+            head, _, rest = path[len(prefix):].partition("/")
+            entries[head] = ("tree", f"{tree_sha}~{prefix}{head}/") if rest else ("blob", blob_sha)
+        return entries
+
+    def _commit_json(self, sha: str) -> Dict:
+        commit = self.state["commits"][sha]
+        return {"sha": sha, "url": f"{self._base()}/git/commits/{sha}", "message": commit["message"],
+                "tree": {"sha": commit["tree"], "url": f"{self._base()}/git/trees/{commit['tree']}"},
+                "parents": [{"sha": parent, "url": f"{self._base()}/git/commits/{parent}"} for parent in commit["parents"]]}
+
+    def _ref_json(self) -> Dict:
+        return {"ref": "refs/heads/main", "url": f"{self._base()}/git/refs/heads/main",
+                "object": {"sha": self.state["ref"], "type": "commit", "url": f"{self._base()}/git/commits/{self.state['ref']}"}}
+
+    def do_GET(self):
+        state = self._repo_state()
+        self._delay()
+        path = unquote(urlparse(self.path).path).rstrip("/")
+        repo = self.settings.get("repo", "bench/blog")
+        with self.lock:
+            if path == f"/repos/{repo}":
+                name = repo.split("/")[1]
+                return self._send_json({"id": 1, "name": name, "full_name": repo, "default_branch": "main",
+                                        "url": self._base(), "html_url": f"https://github.com/{repo}"}, headers=self._headers())
+            if re.fullmatch(rf"/repos/{repo}/git/refs?/heads/main", path):
+                return self._send_json(self._ref_json(), headers=self._headers())
+            match = re.fullmatch(rf"/repos/{repo}/git/commits/(\w+)", path)
+            if match and match.group(1) in state["commits"]:
+                return self._send_json(self._commit_json(match.group(1)), headers=self._headers())
+            match = re.fullmatch(rf"/repos/{repo}/git/trees/([\w~/.-]+)", path)
+            if match:
+                tree_sha, _, prefix = match.group(1).partition("~")
+                if tree_sha in state["trees"]:
+                    return self._send_json(self._tree_json(match.group(1), self._listing(tree_sha, prefix)), headers=self._headers())
+            match = re.fullmatch(rf"/repos/{repo}/git/blobs/(\w+)", path)
+            if match and match.group(1) in state["blobs"]:
+                content = state["blobs"][match.group(1)]
+                return self._send_json({"sha": match.group(1), "url": f"{self._base()}/git/blobs/{match.group(1)}",
+                                        "encoding": "base64", "content": content,
+                                        "size": len(base64.b64decode(content))}, headers=self._headers())
+        self._send_json({"message": "Not Found"}, 404)
+
+    def do_POST(self):
+        state = self._repo_state()
+        body = self._body()
+        self._delay()
+        path = unquote(urlparse(self.path).path).rstrip("/")
+        repo = self.settings.get("repo", "bench/blog")
+        with self.lock:
+            if path == f"/repos/{repo}/git/blobs":
+                content = body.get("content", "")
+                sha = hashlib.sha1(content.encode("utf-8")).hexdigest()
+                state["blobs"][sha] = content if body.get("encoding") == "base64" else base64.b64encode(content.encode("utf-8")).decode("ascii")
+                return self._send_json({"sha": sha, "url": f"{self._base()}/git/blobs/{sha}"}, 201, self._headers())
+            if path == f"/repos/{repo}/git/trees":
+                base = body.get("base_tree")
+                entries = dict(state["trees"].get(base, {}))
+                for element in body.get("tree", []):
+                    if "content" in element:
+                        blob_sha = hashlib.sha1(element["content"].encode("utf-8")).hexdigest()
+                        state["blobs"][blob_sha] = base64.b64encode(element["content"].encode("utf-8")).decode("ascii")
+                    else:
+                        blob_sha = element["sha"]
+                    entries[element["path"]] = blob_sha
+                sha = self._sha("tree", entries)
+                state["trees"][sha] = entries
+                return self._send_json(self._tree_json(sha, self._listing(sha, "")), 201, self._headers())
+            if path == f"/repos/{repo}/git/commits":
+                sha = self._sha("commit", body)
+                state["commits"][sha] = {"tree": body["tree"], "parents": body.get("parents", []), "message": body.get("message", "")}
+                return self._send_json(self._commit_json(sha), 201, self._headers())
+        self._send_json({"message": "Not Found"}, 404)
+
+    def do_PATCH(self):
+        state = self._repo_state()
+        body = self._body()
+        self._delay()
+        path = unquote(urlparse(self.path).path).rstrip("/")
+        repo = self.settings.get("repo", "bench/blog")
+        with self.lock:
+            if re.fullmatch(rf"/repos/{repo}/git/refs?/heads/main", path):
+                if body.get("sha") not in state["commits"]:
+                    return self._send_json({"message": "Object does not exist"}, 422)
+                state["ref"] = body["sha"]
+                return self._send_json(self._ref_json(), headers=self._headers())
+        self._send_json({"message": "Not Found"}, 404)
+
+def start_fake_services(openai_latency: float = 0.5, chunk_delay: float = 0.01, pixabay_latency: float = 0.1,
+                        github_latency: float = 0.05, repo: str = "bench/blog", batch_delay: float = 0.0) -> Dict[str, FakeServer]:
+    """Starts the three stand-ins and returns them keyed by service name."""
+    if Image is None:
+        raise RuntimeError("The fake Pixabay server needs Pillow to generate images.")
+    return {
+        "openai": FakeServer(OpenAIHandler, latency=openai_latency, chunk_delay=chunk_delay, batch_delay=batch_delay).start(),
+        "pixabay": FakeServer(PixabayHandler, latency=pixabay_latency).start(),
+        "github": FakeServer(GitHubHandler, latency=github_latency, repo=repo).start(),
+    }
@@ -1,121 +1,292 @@
 import os
-import re
+import base64
+import hashlib
+import threading
 from datetime import datetime
-from github import Github, GithubException
+from typing import Dict, List, Optional
+from http_client import get_github_client, throttle, throttle_write, update_github_limits
+from instrumentation import recorder
+from article_parser import clean_title, parse_article
+from image_creator import image_variants
+from similarity_index import index_published_post
+from post_manifest import PostManifest, get_manifest, site_data_dir
 
-from github import Github, GithubException
+def front_matter_line(key: str, value: str) -> str:
+    """One front matter line; every value but the date is quoted."""
+    return f"{key}: {value}" if key == "date" else f'{key}: "{value}"'
 
-def publish_to_github(title: str, full_article_content: str, category: str, image_local_path: str = None, github_token: str = None, repo_name: str = None) -> str:
+def render_front_matter(fields: Dict[str, str]) -> str:
+    """The YAML front matter block of a post."""
+    return "\n".join(["---"] + [front_matter_line(key, value) for key, value in fields.items()] + ["---"])
+
+def image_front_matter(image_repo_path: str, variants: List[Dict[str, object]]) -> Dict[str, str]:
+    """featured_image plus the JPEG and WebP srcsets of its variants (as listed by image_variants)."""
+    fields = {"featured_image": f"/{image_repo_path}"} # Add leading slash for absolute path
+    srcsets = {"image/jpeg": [], "image/webp": []}
+    for variant in variants:
+        srcsets[variant["type"]].append(f"/images/{os.path.basename(variant['path'])} {variant['width']}w")
+    if srcsets["image/jpeg"]:
+        fields["featured_image_srcset"] = ", ".join(srcsets["image/jpeg"])
+    if srcsets["image/webp"]:
+        fields["featured_image_webp_srcset"] = ", ".join(srcsets["image/webp"])
+    return fields
+
+def build_post(title: str, full_article_content: str, category: str, image_local_path: str = None) -> Dict[str, object]:
     """
-    Publishes the final article according to the new, simplified format.
+    Renders the final markdown file for an article according to the simplified format.
     It extracts tags from the end of the content and handles optional images.
+    Nothing is sent to GitHub here; the returned dict is what `publish_posts` commits.
     """
-    if not all([github_token, repo_name]):
-        return "Error: GITHUB_TOKEN or GITHUB_REPO_NAME is not set."
-    if "Error:" in full_article_content:
-        return "Error: Invalid article content provided. Please check the generation step."
+    article = parse_article(full_article_content)
+    subtitle_and_body = article["subtitle_and_body"]
+    tag_line = article["tag_line"]
+    title = clean_title(title)
 
-    # --- Start of Content & Tag Extraction ---
-    lines = full_article_content.strip().split('\n')
-    
-    # Find the last line that starts with #, which is the tag line
-    tag_line = ""
-    for i in range(len(lines) - 1, -1, -1):
-        if lines[i].strip().startswith("#"):
-            tag_line = lines[i].strip()
-            # The content is everything before the tag line
-            main_content = "\n".join(lines[:i]).strip()
-            break
-    else: # If no tag line is found
-        main_content = full_article_content.strip()
-
-    # The first line of the main content is the title, second is subtitle. The rest is the body.
-    content_lines = main_content.split('\n')
-    subtitle_and_body = "\n".join(content_lines[1:]).strip()
-    # --- End of Content & Tag Extraction ---
-
-    # --- Start of Image Handling ---
-    featured_image_path = ""
+    # The main image plus its responsive variants, as (local path, repo path) pairs
+    image_files = []
+    variants = []
     if image_local_path and os.path.exists(image_local_path):
-        try:
-            g = Github(github_token)
-            repo = g.get_repo(repo_name)
-            
-            image_filename = os.path.basename(image_local_path)
-            image_repo_path = f"images/{image_filename}"
-
-            with open(image_local_path, 'rb') as f:
-                image_content = f.read()
-            
-            try:
-                repo.get_contents(image_repo_path)
-            except GithubException as e:
-                if e.status == 404:
-                    repo.create_file(path=image_repo_path, message=f"feat: Add image {image_filename}", content=image_content)
-                    print(f"Image '{image_repo_path}' uploaded.")
-                else:
-                    raise e
-            
-            featured_image_path = f"/{image_repo_path}" # Add leading slash for absolute path
-
-        except Exception as e:
-            print(f"Warning: Image processing failed: {e}. Proceeding without an image.")
-    # --- End of Image Handling ---
+        image_files.append((image_local_path, f"images/{os.path.basename(image_local_path)}"))
+        variants = image_variants(image_local_path)
+        for variant in variants:
+            image_files.append((variant["path"], f"images/{os.path.basename(variant['path'])}"))
 
-    try:
-        g = Github(github_token)
-        repo = g.get_repo(repo_name)
+    now = datetime.now()
+    date_for_frontmatter = now.strftime("%Y-%m-%d")
+    time_for_filename = now.strftime("%Y-%m-%d-%H%M%S")
+    # Unique against every known post and every post being built in this run
+    post_permalink_slug = get_manifest().reserve_slug(title)
+
+    fields = {
+        "title": title,
+        "date": date_for_frontmatter,
+        "category": category,
+        "permalink": f"/{post_permalink_slug}/",
+    }
+    if image_files:
+        fields.update(image_front_matter(image_files[0][1], variants))
+    frontmatter = render_front_matter(fields)
 
-        now = datetime.now()
-        date_for_frontmatter = now.strftime("%Y-%m-%d")
-        time_for_filename = now.strftime("%Y-%m-%d-%H%M%S")
-        post_permalink_slug = re.sub(r'[^a-z0-9\s-]', '', title.lower()).strip().replace(' ', '-')
-        if not post_permalink_slug:post_permalink_slug = "new-post"
-        
-        frontmatter_parts = [
-            "---",
-            f'title: "{title}"',
-            f"date: {date_for_frontmatter}",
-            f'category: "{category}"',
-            f'permalink: "/{post_permalink_slug}/"'
-        ]
-        if featured_image_path:
-            frontmatter_parts.append(f'featured_image: "{featured_image_path}"')
-        frontmatter_parts.append("---")
-        frontmatter = "\n".join(frontmatter_parts)
-
-        # Combine for the final markdown file
-        full_markdown_content = f"""{frontmatter}
+    # Combine for the final markdown file
+    full_markdown_content = f"""{frontmatter}
 
 {subtitle_and_body}
 
 {tag_line}"""
-        post_filename_base = re.sub(r'[^a-z0-9\s-]', '', title.lower()).strip().replace(' ', '-')
-        if not post_filename_base:
-            post_filename_base = "new-post"
-        post_filename = f"{time_for_filename}-{post_filename_base}.md"
-        
-        post_repo_path = f"_posts/{post_filename}"
-
-        commit_result = repo.create_file(
-            path=post_repo_path,
-            message=f"feat: Add post '{title}'",
-            content=full_markdown_content.encode('utf-8'),
-        )
-        created_file = commit_result['content']
-        
-        return f"Success: Post was published. URL: {created_file.html_url}"
+
+    return {
+        "title": title,
+        "slug": post_permalink_slug,
+        "path": f"_posts/{time_for_filename}-{post_permalink_slug}.md",
+        "content": full_markdown_content,
+        "image_files": image_files,
+    }
+
+def _list_directory(repo, root_tree, directory: str) -> Dict[str, str]:
+    """Returns file name -> blob SHA for a top-level directory of the given tree (one API call)."""
+    for element in root_tree.tree:
+        if element.path == directory and element.type == "tree":
+            throttle("github")
+            return {child.path: child.sha for child in repo.get_git_tree(element.sha).tree}
+    return {}
+
+class StagedCommit:
+    """
+    Files staged for one commit through the Git Data API: text goes inline into the
+    tree, binary content becomes a blob as soon as it is staged (identical content is
+    uploaded once), and commit() creates the tree and the commit and moves the branch.
+    Every write passes throttle_write("github").
+    """
+    def __init__(self, repo):
+        from github import InputGitTreeElement
+
+        self._element = InputGitTreeElement
+        self.repo = repo
+        self.elements = []
+        self.blob_shas: Dict[str, str] = {}  # content sha256 -> blob uploaded for this commit
+
+    def add_text(self, path: str, content: str) -> None:
+        self.elements.append(self._element(path, "100644", "blob", content=content))
+
+    def add_blob(self, path: str, raw: bytes) -> str:
+        """Uploads the content (unless an identical blob already was) and returns its SHA."""
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest not in self.blob_shas:
+            recorder.count("github", bytes_uploaded=len(raw))
+            throttle_write("github")
+            self.blob_shas[digest] = self.repo.create_git_blob(base64.b64encode(raw).decode("ascii"), "base64").sha
+        self.elements.append(self._element(path, "100644", "blob", sha=self.blob_shas[digest]))
+        return self.blob_shas[digest]
+
+    def commit(self, ref, base_commit, message: str):
+        """Commits everything staged on top of base_commit and points ref at it."""
+        throttle_write("github")
+        tree = self.repo.create_git_tree(self.elements, base_tree=base_commit.tree)
+        throttle_write("github")
+        commit = self.repo.create_git_commit(message, tree, [base_commit])
+        throttle_write("github")
+        ref.edit(commit.sha)
+        return commit
+
+_seed_lock = threading.Lock()
+
+def _seed_manifest(repo, base_commit, repo_name: str) -> None:
+    """
+    Records the posts and images of a repository the manifest has never seen. Each post
+    is read once, one blob at a time, so the site indexes and the similarity index cover
+    the posts that were published before the manifest existed.
+    """
+    throttle("github")
+    root_tree = repo.get_git_tree(base_commit.tree.sha)
+    post_files = _list_directory(repo, root_tree, "_posts")
+
+    def read_post(name: str) -> str:
+        throttle("github")
+        content = base64.b64decode(repo.get_git_blob(post_files[name]).content).decode("utf-8")
+        index_published_post(f"_posts/{name}", content)
+        return content
+
+    manifest = get_manifest()
+    manifest.seed_from_listing(repo_name, post_files, _list_directory(repo, root_tree, "images"), read_post)
+    # Saved right away: it describes the repository, not this run's posts.
+    manifest.save()
+
+def prepare_manifest(github_token: str, repo_name: str) -> None:
+    """
+    Seeds the manifest from the repository before any post is built, so the slugs
+    build_post reserves already avoid the posts that exist there. Free once seeded.
+    """
+    if not all([github_token, repo_name]) or repo_name in get_manifest().seeded_repos:
+        return
+    with _seed_lock:
+        if repo_name in get_manifest().seeded_repos:
+            return
+        g = get_github_client(github_token)
+        throttle("github")
+        repo = g.get_repo(repo_name)
+        throttle("github")
+        ref = repo.get_git_ref(f"heads/{repo.default_branch}")
+        throttle("github")
+        _seed_manifest(repo, repo.get_git_commit(ref.object.sha), repo_name)
+
+def publish_posts(posts: List[Dict[str, object]], github_token: str = None, repo_name: str = None) -> List[str]:
+    """
+    Publishes many rendered posts and their images as ONE commit through the Git Data API:
+    text files go inline into a single tree, images become blobs, and the branch ref is
+    moved once. The API cost is a fixed handful of calls plus one per distinct new image
+    file (the main image is a copy of its largest variant and shares its blob), and the
+    repository never holds a post without its image.
+    Returns one result string per post, in order.
+    """
+    if not all([github_token, repo_name]):
+        return ["Error: GITHUB_TOKEN or GITHUB_REPO_NAME is not set."] * len(posts)
+    if not posts:
+        return []
+    from github import GithubException
+
+    results: List[Optional[str]] = [None] * len(posts)
+    try:
+        g = get_github_client(github_token)
+        throttle("github")
+        repo = g.get_repo(repo_name)
+        update_github_limits(g)
+        branch = repo.default_branch
+        throttle("github")
+        ref = repo.get_git_ref(f"heads/{branch}")
+        throttle("github")
+        base_commit = repo.get_git_commit(ref.object.sha)
+        manifest = get_manifest()
+        if repo_name not in manifest.seeded_repos:
+            # Callers normally ran prepare_manifest before building the posts.
+            with _seed_lock:
+                if repo_name not in manifest.seeded_repos:
+                    _seed_manifest(repo, base_commit, repo_name)
+
+        staged = StagedCommit(repo)
+        staged_paths = set()
+        published = []
+        for index, post in enumerate(posts):
+            post_repo_path = post["path"]
+            if manifest.has_path(post_repo_path) or manifest.has_slug(post.get("slug")) or post_repo_path in staged_paths:
+                results[index] = f"Error: A post at '{post_repo_path}' or with the slug '{post.get('slug')}' already exists."
+                continue
+
+            # Images are named by content hash, so an existing name means identical content.
+            for image_local_path, image_repo_path in post.get("image_files", []):
+                if image_repo_path in staged_paths:
+                    continue
+                if image_repo_path in manifest.images:
+                    print(f"Image '{image_repo_path}' already exists. Reusing it.")
+                    continue
+                with open(image_local_path, 'rb') as f:
+                    staged.add_blob(image_repo_path, f.read())
+                staged_paths.add(image_repo_path)
+
+            staged.add_text(post_repo_path, post["content"])
+            staged_paths.add(post_repo_path)
+            published.append(index)
+
+        if not published:
+            return results
+
+        # The site indexes are regenerated from the manifest and land in the same commit.
+        for index in published:
+            manifest.add(PostManifest.entry_from_post(posts[index]["path"], posts[index]["content"], posts[index].get("slug")))
+        for name, content in manifest.site_files().items():
+            staged.add_text(f"{site_data_dir()}/{name}", content)
+
+        titles = [posts[index]["title"] for index in published]
+        if len(titles) == 1:
+            message = f"feat: Add post '{titles[0]}'"
+        else:
+            message = f"feat: Add {len(titles)} posts\n\n" + "\n".join(f"- {title}" for title in titles)
+
+        staged.commit(ref, base_commit, message)
+        update_github_limits(g)
+        manifest.save()
+
+        for index in published:
+            url = f"{repo.html_url}/blob/{branch}/{posts[index]['path']}"
+            results[index] = f"Success: Post was published. URL: {url}"
+            index_published_post(posts[index]["path"], posts[index]["content"])
+        return results
 
     except GithubException as e:
-        if e.status == 422:
-             return f"Error: A file at '{post_repo_path}' already exists."
-        return f"Error: A GitHub API error occurred (Status: {e.status}) - {e.data}"
+        error = f"Error: A GitHub API error occurred (Status: {e.status}) - {e.data}"
     except Exception as e:
-        return f"Error: An unexpected error occurred during publishing - {e}"
-    finally:
-        if image_local_path and os.path.exists(image_local_path):
+        error = f"Error: An unexpected error occurred during publishing - {e}"
+    get_manifest().reload()  # nothing was committed, so forget the entries added above
+    return [result or error for result in results]
+
+def cleanup_post_files(posts: List[Dict[str, object]]) -> None:
+    """Removes the temporary local image files referenced by rendered posts."""
+    for post in posts:
+        for image_local_path, _ in post.get("image_files", []):
+            if not os.path.exists(image_local_path):
+                continue
             try:
                 os.remove(image_local_path)
                 print(f"Cleaned up temporary image file: '{image_local_path}'")
             except OSError as e:
-                print(f"Error cleaning up temp image file: {e}")
\ No newline at end of file
+                print(f"Error cleaning up temp image file: {e}")
+
+def publish_to_github(title: str, full_article_content: str, category: str, image_local_path: str = None, github_token: str = None, repo_name: str = None) -> str:
+    """
+    Publishes the final article according to the new, simplified format.
+    It extracts tags from the end of the content and handles optional images.
+    """
+    if not all([github_token, repo_name]):
+        return "Error: GITHUB_TOKEN or GITHUB_REPO_NAME is not set."
+    if "Error:" in full_article_content:
+        return "Error: Invalid article content provided. Please check the generation step."
+
+    try:
+        prepare_manifest(github_token, repo_name)
+    except Exception as e:
+        return f"Error: Could not list the existing posts of '{repo_name}' - {e}"
+    post = build_post(title, full_article_content, category, image_local_path)
+    result = publish_posts([post], github_token, repo_name)[0]
+    # After a failure the image is kept, so a retry can publish it without downloading it again.
+    if result.startswith("Success"):
+        cleanup_post_files([post])
+    return result
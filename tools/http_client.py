@@ -0,0 +1,278 @@
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from instrumentation import recorder
+
+# Default request budgets per service as (requests per second, burst size).
+# They are only starting points: every response's rate-limit headers adjust them.
+SERVICE_LIMITS = {
+    "openai": (5.0, 10),
+    "pixabay": (100 / 60, 10),    # Pixabay allows 100 requests per 60 seconds
+    "pixabay-cdn": (20.0, 20),
+    "github": (4900 / 3600, 100),  # GitHub allows 5000 authenticated requests per hour
+    # GitHub's secondary limits on content-creating requests (blobs, trees, commits, ref
+    # updates): 80 per minute and 500 per hour. A burst of 40 plus 460 per hour stays
+    # under both in any window and still commits a batch of several posts at once.
+    # Passed in addition to "github" by throttle_write().
+    "github-write": (460 / 3600, 40),
+}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+CONNECT_TIMEOUT = _env_float("HTTP_CONNECT_TIMEOUT", 10)
+READ_TIMEOUT = _env_float("HTTP_READ_TIMEOUT", 60)
+OPENAI_TIMEOUT = _env_float("OPENAI_TIMEOUT", 180)
+MAX_RETRIES = int(_env_float("HTTP_MAX_RETRIES", 4))
+BACKOFF_BASE = _env_float("HTTP_BACKOFF_BASE", 0.5)
+BACKOFF_MAX = _env_float("HTTP_BACKOFF_MAX", 30)
+POOL_SIZE = int(_env_float("HTTP_POOL_SIZE", 16))
+
+class TokenBucket:
+    """
+    A thread-safe token bucket. acquire() blocks until a request may be sent.
+    The refill rate follows the server's own accounting: remaining/reset headers set the
+    rate to what is left in the window, and Retry-After pauses the bucket entirely.
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.default_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate if self.rate > 0 else 1.0)
+            time.sleep(min(max(wait, 0.01), BACKOFF_MAX))
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def adapt(self, remaining: Optional[float], reset_seconds: Optional[float]) -> None:
+        """Matches the refill rate to the quota left in the current window."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if remaining is None:
+                return
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset_seconds:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + reset_seconds)
+            elif reset_seconds and reset_seconds > 0:
+                # Spread what is left evenly, but never run faster than the default budget.
+                self.rate = max(min(remaining / reset_seconds, self.default_rate), 0.01)
+            else:
+                self.rate = self.default_rate
+
+_buckets: Dict[str, TokenBucket] = {}
+_sessions: Dict[str, requests.Session] = {}
+_registry_lock = threading.Lock()
+
+def get_bucket(service: str) -> TokenBucket:
+    with _registry_lock:
+        if service not in _buckets:
+            rate, capacity = SERVICE_LIMITS.get(service, (10.0, 10))
+            _buckets[service] = TokenBucket(rate, capacity)
+        return _buckets[service]
+
+def throttle(service: str) -> None:
+    """Blocks until the service's rate limiter allows one more request, and counts the call."""
+    get_bucket(service).acquire()
+    recorder.count(service, calls=1)
+
+def throttle_write(service: str) -> None:
+    """throttle() for a request that creates content, which also passes the service's write limiter."""
+    get_bucket(f"{service}-write").acquire()
+    throttle(service)
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parses '12', '1.5', '6m0s', '250ms' style durations into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total, number = 0.0, ""
+    index = 0
+    while index < len(value):
+        char = value[index]
+        if char.isdigit() or char == ".":
+            number += char
+        elif value.startswith("ms", index):
+            total += float(number or 0) / 1000
+            number = ""
+            index += 1
+        elif char in "hms":
+            total += float(number or 0) * {"h": 3600, "m": 60, "s": 1}[char]
+            number = ""
+        else:
+            return None
+        index += 1
+    return total if not number else None
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """Reads Retry-After as either a number of seconds or an HTTP date."""
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    seconds = _parse_duration(value)
+    if seconds is not None:
+        return seconds
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+def update_limits(service: str, headers: Mapping[str, str]) -> None:
+    """
+    Adapts the service's bucket to the rate-limit headers of a response. Understands the
+    X-RateLimit-Remaining/Reset pair used by GitHub (epoch reset) and Pixabay (seconds),
+    OpenAI's x-ratelimit-remaining-requests/x-ratelimit-reset-requests, and Retry-After.
+    """
+    lowered = {key.lower(): value for key, value in headers.items()}
+    bucket = get_bucket(service)
+
+    retry_after = retry_after_seconds(lowered)
+    if retry_after is not None:
+        bucket.pause(retry_after)
+
+    remaining = lowered.get("x-ratelimit-remaining") or lowered.get("x-ratelimit-remaining-requests")
+    reset = lowered.get("x-ratelimit-reset") or lowered.get("x-ratelimit-reset-requests")
+    if remaining is None:
+        return
+    try:
+        remaining_value = float(remaining)
+    except ValueError:
+        return
+    reset_seconds = _parse_duration(reset) if reset else None
+    if reset_seconds is not None and reset_seconds > 10 ** 9:
+        reset_seconds = max(reset_seconds - time.time(), 0)  # an epoch timestamp
+    bucket.adapt(remaining_value, reset_seconds)
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def get_session(service: str) -> requests.Session:
+    """Returns the keep-alive session shared by every call to the given service."""
+    with _registry_lock:
+        if service not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[service] = session
+        return _sessions[service]
+
+def request(service: str, method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Sends a request through the service's pooled session and rate limiter, retrying
+    connection errors, 429 and 5xx responses with jittered exponential backoff.
+    The final response is returned as-is; callers still call raise_for_status().
+    """
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    session = get_session(service)
+    attempt = 0
+    while True:
+        throttle(service)
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= MAX_RETRIES:
+                raise
+            recorder.count(service, retries=1)
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+            continue
+
+        update_limits(service, response.headers)
+        if response.status_code not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+            if not kwargs.get("stream"):
+                recorder.count(service, bytes=len(response.content))
+            return response
+        recorder.count(service, retries=1)
+        delay = retry_after_seconds(response.headers)
+        response.close()
+        time.sleep(delay if delay is not None else backoff_delay(attempt))
+        attempt += 1
+
+_openai_clients: Dict[str, object] = {}
+_github_clients: Dict[str, object] = {}
+
+def get_openai_client(api_key: str):
+    """
+    Returns a shared OpenAI client for the key. Its keep-alive connection pool is reused
+    across calls, every attempt passes the "openai" rate limiter, and responses feed it
+    their headers. The SDK's own retry loop handles 429/5xx with backoff and Retry-After.
+    """
+    from openai import OpenAI, DefaultHttpxClient
+
+    with _registry_lock:
+        if api_key not in _openai_clients:
+            http_client = DefaultHttpxClient(
+                event_hooks={
+                    "request": [lambda request: throttle("openai")],
+                    "response": [lambda response: update_limits("openai", response.headers)],
+                },
+            )
+            _openai_clients[api_key] = OpenAI(
+                api_key=api_key,
+                http_client=http_client,
+                timeout=OPENAI_TIMEOUT,
+                max_retries=MAX_RETRIES,
+            )
+        return _openai_clients[api_key]
+
+def get_github_client(token: str):
+    """
+    Returns a shared PyGithub client for the token with a pooled session, timeouts and
+    PyGithub's GithubRetry, which backs off exponentially on 5xx responses and waits out
+    primary/secondary rate limits using Retry-After and X-RateLimit-Reset.
+    PyGithub's own fixed delays between requests and writes are turned off: callers pace
+    through throttle("github") and throttle_write("github") instead.
+    GITHUB_API_URL overrides the API root (GitHub Enterprise or a local stand-in).
+    """
+    from github import Auth, Github, GithubRetry
+
+    with _registry_lock:
+        if token not in _github_clients:
+            retry = GithubRetry(total=MAX_RETRIES, backoff_factor=BACKOFF_BASE)
+            _github_clients[token] = Github(
+                auth=Auth.Token(token),
+                base_url=os.getenv("GITHUB_API_URL", "https://api.github.com"),
+                timeout=int(READ_TIMEOUT),
+                retry=retry,
+                pool_size=POOL_SIZE,
+                seconds_between_requests=0,
+                seconds_between_writes=0,
+            )
+        return _github_clients[token]
+
+def update_github_limits(github_client) -> None:
+    """Feeds PyGithub's last seen rate-limit headers into the "github" limiter."""
+    remaining, limit = github_client.rate_limiting
+    if limit >= 0:
+        get_bucket("github").adapt(remaining, max(github_client.rate_limiting_resettime - time.time(), 0))
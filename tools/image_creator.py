@@ -1,62 +1,287 @@
 import os
 import re
+import glob
+import json
+import math
+import time
+import shutil
+import sqlite3
+import hashlib
+import tempfile
 import requests
-from datetime import datetime
+from http_client import request
+from instrumentation import recorder
+from response_cache import ResponseCache, make_key
+from sqlite_store import SQLiteStore
+from post_manifest import get_manifest
+from category_classifier import tokenize
+from typing import Dict, Iterator, List, Tuple
 
-def create_image(article_content: str, topic: str) -> str:
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it the original file is kept as-is.
+    Image = None
+
+# Responsive widths written for every image. The main file is capped at the largest one.
+IMAGE_WIDTHS = (480, 960, 1600)
+JPEG_QUALITY = 82
+WEBP_QUALITY = 78
+# libwebp effort, 0 (fast) to 6 (smallest). 6 takes about three times as long as 4 for
+# files only ~2% smaller. Override with IMAGE_WEBP_METHOD.
+WEBP_METHOD = int(os.getenv("IMAGE_WEBP_METHOD", "4"))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Search parameters that are the same for every query (and part of the cache key)
+SEARCH_PARAMS = {
+    "image_type": "photo",
+    "orientation": "horizontal",  # Prefer landscape images for blog covers
+    "safesearch": "true",
+    "per_page": 20,  # Enough candidates that similar topics still find an unused image
+}
+MAX_SEARCH_PAGES = 3
+MAX_DOWNLOADS = 3  # downloads that may turn out to be an already published image
+# Local ranking of search hits; every component is scaled to 0..1. Relevance is only
+# known once the article title is (streaming runs); without a title it is 0 for every hit.
+RANKING_WEIGHTS = {"resolution": 0.3, "aspect": 0.2, "likes": 0.3, "relevance": 0.2}
+TARGET_ASPECT = 3 / 2
+# largeImageURL, the file that is downloaded, is scaled to at most 1280 px on its longer
+# side, so resolution is scored on that size and not on the original's imageWidth/Height.
+LARGE_IMAGE_MAX_SIDE = 1280
+TARGET_PIXELS = LARGE_IMAGE_MAX_SIDE * LARGE_IMAGE_MAX_SIDE / TARGET_ASPECT
+
+# Pixabay asks API users to cache search results for 24 hours. Override with
+# PIXABAY_CACHE_TTL_HOURS and PIXABAY_CACHE_MAX_MB.
+search_cache = ResponseCache(
+    "pixabay-search",
+    ttl_seconds=int(float(os.getenv("PIXABAY_CACHE_TTL_HOURS", "24")) * 3600),
+    max_bytes=int(float(os.getenv("PIXABAY_CACHE_MAX_MB", "10")) * 1024 * 1024),
+)
+
+def image_output_dir() -> str:
+    """Directory for processed images. Override with BLOG_STUDIO_IMAGE_DIR."""
+    return os.getenv("BLOG_STUDIO_IMAGE_DIR", "generated_images")
+
+def download_image(image_url: str, directory: str) -> Tuple[str, str]:
+    """
+    Streams an image to a temporary file in chunks while hashing it, so the whole file
+    is never held in memory. Returns (temporary_path, sha256_hex).
+    """
+    digest = hashlib.sha256()
+    handle, temp_path = tempfile.mkstemp(suffix=".download", dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as handler, request("pixabay-cdn", "GET", image_url, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if chunk:
+                    digest.update(chunk)
+                    handler.write(chunk)
+                    recorder.count("pixabay-cdn", bytes=len(chunk))
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return temp_path, digest.hexdigest()
+
+def process_image(source_path: str, content_hash: str, directory: str) -> str:
+    """
+    Writes the main image and its responsive JPEG/WebP variants, named by content hash.
+    If the main file already exists the image was processed before and nothing is redone.
+    Returns the path of the main image.
+    """
+    base = content_hash[:16]
+    main_path = os.path.join(directory, f"{base}.jpg")
+    if os.path.exists(main_path):
+        return main_path
+
+    if Image is None:
+        shutil.copyfile(source_path, main_path)
+        return main_path
+
+    with Image.open(source_path) as original:
+        image = original.convert("RGB")
+    # Widths larger than the source collapse into one variant at the source width.
+    for target_width in sorted({min(width, image.width) for width in IMAGE_WIDTHS}):
+        height = round(image.height * target_width / image.width)
+        variant = image if target_width == image.width else image.resize((target_width, height), Image.LANCZOS)
+        variant.save(os.path.join(directory, f"{base}-{target_width}w.jpg"), "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        variant.save(os.path.join(directory, f"{base}-{target_width}w.webp"), "WEBP", quality=WEBP_QUALITY, method=WEBP_METHOD)
+
+    largest = min(IMAGE_WIDTHS[-1], image.width)
+    shutil.copyfile(os.path.join(directory, f"{base}-{largest}w.jpg"), main_path)
+    return main_path
+
+def image_variants(main_path: str) -> List[Dict[str, object]]:
+    """Lists the responsive variants written next to a main image, smallest first."""
+    base, _ = os.path.splitext(main_path)
+    variants = []
+    for path in glob.glob(f"{glob.escape(base)}-*w.*"):
+        match = re.search(r"-(\d+)w\.(jpg|webp)$", path)
+        if match:
+            variants.append({
+                "path": path,
+                "width": int(match.group(1)),
+                "type": "image/webp" if match.group(2) == "webp" else "image/jpeg",
+            })
+    return sorted(variants, key=lambda v: (v["type"], v["width"]))
+
+def image_ledger_path() -> str:
+    """SQLite file recording the Pixabay images posts have taken. Override with IMAGE_LEDGER_PATH."""
+    return os.getenv("IMAGE_LEDGER_PATH", os.path.join("data", "image_ledger.sqlite3"))
+
+class ImageLedger(SQLiteStore):
+    """
+    The Pixabay images already taken by a post, published or still in flight, so no
+    image is used twice. claim() takes the write lock up front, so concurrent pipelines
+    (threads or processes) can never claim the same image.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or image_ledger_path()
+
+    def _create_schema(self, connection: sqlite3.Connection) -> None:
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                pixabay_id INTEGER PRIMARY KEY,
+                topic TEXT,
+                content_hash TEXT,
+                claimed_at REAL NOT NULL
+            )""")
+
+    def used_ids(self, pixabay_ids: List[int]) -> set:
+        with self._transaction() as connection:
+            return {row[0] for row in connection.execute(
+                f"SELECT pixabay_id FROM images WHERE pixabay_id IN ({','.join('?' * len(pixabay_ids))})", pixabay_ids
+            )} if pixabay_ids else set()
+
+    def claim(self, pixabay_id: int, topic: str) -> bool:
+        """Takes an image for a topic (its queue line). False if another post already has it."""
+        with self._transaction() as connection:
+            return connection.execute(
+                "INSERT OR IGNORE INTO images (pixabay_id, topic, claimed_at) VALUES (?, ?, ?)",
+                (pixabay_id, topic, time.time()),
+            ).rowcount == 1
+
+    def release(self, pixabay_id: int) -> None:
+        """Gives back an image whose download failed."""
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM images WHERE pixabay_id = ? AND content_hash IS NULL", (pixabay_id,))
+
+    def release_topic(self, topic: str) -> int:
+        """Gives back every image a topic took, once it will never be published. Returns how many."""
+        with self._transaction() as connection:
+            return connection.execute("DELETE FROM images WHERE topic = ?", (topic,)).rowcount
+
+    def set_hash(self, pixabay_id: int, content_hash: str) -> None:
+        with self._transaction() as connection:
+            connection.execute("UPDATE images SET content_hash = ? WHERE pixabay_id = ?", (content_hash, pixabay_id))
+
+def normalize_query(topic: str) -> str:
+    """The search query for a topic: lowercase words, deduplicated and sorted, so word order and case share a cache entry."""
+    words = sorted(set(re.findall(r"\w+", topic.lower())))
+    return " ".join(words)[:100]  # Pixabay limits q to 100 characters
+
+def search_images(query: str, api_key: str, page: int = 1) -> Dict[str, object]:
+    """One page of Pixabay hits for a normalized query, from the search cache when possible."""
+    key = make_key("pixabay.search", query, page, SEARCH_PARAMS)
+    cached = search_cache.get(key)
+    if cached is not None:
+        recorder.count("pixabay", cache_hits=1)
+        return json.loads(cached)
+
+    url = os.getenv("PIXABAY_API_URL", "https://pixabay.com/api/")
+    response = request("pixabay", "GET", url, params={"key": api_key, "q": query, "page": page, **SEARCH_PARAMS})
+    response.raise_for_status()  # Raise an exception for bad status codes
+    data = response.json()
+    # Only what the ranking and the download need is kept, which keeps entries small.
+    result = {
+        "totalHits": data.get("totalHits", 0),
+        "hits": [{field: hit.get(field) for field in ("id", "likes", "imageWidth", "imageHeight", "largeImageURL", "tags")}
+                 for hit in data.get("hits", [])],
+    }
+    search_cache.set(key, json.dumps(result))
+    return result
+
+def rank_hits(hits: List[Dict], used_ids: set, title: str = "") -> List[Dict]:
     """
-    Searches for a relevant, high-quality image from Pixabay based on the topic,
-    downloads it, and saves it to a local path.
+    Unused hits with a download URL, best first. Resolution is that of the downloaded
+    largeImageURL and scores full marks for a full-size 3:2 one, aspect ratio peaks at
+    TARGET_ASPECT and falls to zero at twice or half of it, likes are log-scaled against
+    the most liked candidate, and relevance is the share of a hit's tag words found in
+    the title.
+    """
+    title_words = set(tokenize(title))
+    candidates = [hit for hit in hits if hit.get("largeImageURL") and hit.get("id") not in used_ids]
+    max_likes = max((hit.get("likes") or 0 for hit in candidates), default=0)
+
+    def score(hit: Dict) -> float:
+        width, height = hit.get("imageWidth") or 0, hit.get("imageHeight") or 0
+        scale = min(1.0, LARGE_IMAGE_MAX_SIDE / max(width, height)) if width and height else 0.0
+        resolution = min(1.0, (width * scale) * (height * scale) / TARGET_PIXELS)
+        aspect = max(0.0, 1 - abs(math.log(width / height / TARGET_ASPECT)) / math.log(2)) if width and height else 0.0
+        likes = math.log1p(hit.get("likes") or 0) / math.log1p(max_likes) if max_likes else 0.0
+        tag_words = set(tokenize(hit.get("tags") or ""))
+        relevance = len(tag_words & title_words) / len(tag_words) if tag_words and title_words else 0.0
+        return (RANKING_WEIGHTS["resolution"] * resolution + RANKING_WEIGHTS["aspect"] * aspect
+                + RANKING_WEIGHTS["likes"] * likes + RANKING_WEIGHTS["relevance"] * relevance)
+
+    return sorted(candidates, key=score, reverse=True)
+
+def claimed_candidates(query: str, api_key: str, ledger: ImageLedger, topic: str, title: str = "") -> Iterator[Dict]:
+    """
+    Yields the best unused hits in order, each one claimed in the ledger first. Further
+    result pages are only searched once every hit on the earlier ones is taken.
+    """
+    for page in range(1, MAX_SEARCH_PAGES + 1):
+        result = search_images(query, api_key, page)
+        hits = result["hits"]
+        for hit in rank_hits(hits, ledger.used_ids([hit["id"] for hit in hits]), title):
+            if ledger.claim(hit["id"], topic):
+                yield hit
+        if not hits or page * SEARCH_PARAMS["per_page"] >= result["totalHits"]:
+            return
+
+def create_image(article_content: str, topic: str, title: str = "", owner: str = None) -> str:
+    """
+    Picks the best unused Pixabay image for the topic, streams it to disk, and saves
+    resized JPEG/WebP variants named by content hash. Searches are cached and ranked
+    locally, so a warm cache needs only the download. The search is on the topic alone;
+    a title, when known, only re-ranks the hits, so it never costs a cache miss.
+    The image is claimed in the ledger for `owner` (the queue line, default the topic),
+    which ImageLedger.release_topic() frees if the post is never published.
+    Returns the path of the main image; see image_variants() for the rest.
     """
     pixabay_api_key = os.getenv("PIXABAY_API_KEY")
     if not pixabay_api_key:
         return "Error: PIXABAY_API_KEY is not set."
 
     # Use the primary keyword (topic) as the search query
-    search_query = topic
-    
-    # Pixabay API URL
-    url = "https://pixabay.com/api/"
-    params = {
-        "key": pixabay_api_key,
-        "q": search_query,
-        "image_type": "photo",
-        "orientation": "horizontal",  # Prefer landscape images for blog covers
-        "safesearch": "true",
-        "per_page": 10  # Get a few options to choose from
-    }
+    search_query = normalize_query(topic)
+    if not search_query:
+        return "Error: The topic has no words to search Pixabay for."
 
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        data = response.json()
-
-        if not data["hits"]:
-            return f"Error: No images found on Pixabay for '{search_query}'."
-
-        # Select the best image (e.g., the one with the most likes or downloads)
-        best_image = max(data["hits"], key=lambda x: x.get("likes", 0))
-        image_url = best_image.get("largeImageURL")
-
-        if not image_url:
-            return "Error: Could not retrieve image URL from Pixabay."
-
-        # Generate a unique filename based on the topic
-        file_name_base = re.sub(r'[^a-z0-9\s-]', '', topic.lower()).strip()
-        file_name_base = re.sub(r'\s+', '-', file_name_base)
-        if not file_name_base:
-            file_name_base = "blog-post"
-        
-        timestamp = datetime.now().strftime("%H%M%S")
-        file_name = f"{file_name_base}-{timestamp}.jpg"
-        image_path = file_name
-
-        # Download and save the image
-        img_data = requests.get(image_url).content
-        with open(image_path, 'wb') as handler:
-            handler.write(img_data)
-
-        return image_path
+        ledger = ImageLedger()
+        directory = image_output_dir()
+        os.makedirs(directory, exist_ok=True)
+        published_downloads = 0
+        for hit in claimed_candidates(search_query, pixabay_api_key, ledger, owner or topic, title):
+            # Stream the download, then resize and recompress it
+            try:
+                temp_path, content_hash = download_image(hit["largeImageURL"], directory)
+            except Exception:
+                ledger.release(hit["id"])
+                raise
+            ledger.set_hash(hit["id"], content_hash[:16])
+            try:
+                # Posts from before the ledger are only known by their image files.
+                if f"images/{content_hash[:16]}.jpg" in get_manifest().images:
+                    published_downloads += 1
+                    if published_downloads >= MAX_DOWNLOADS:
+                        break
+                    continue
+                return process_image(temp_path, content_hash, directory)
+            finally:
+                os.remove(temp_path)
+
+        return f"Error: No unused images found on Pixabay for '{search_query}'."
 
     except requests.exceptions.RequestException as e:
         return f"Error: Failed to connect to Pixabay API - {e}"
@@ -0,0 +1,199 @@
+import os
+import sys
+import math
+import json
+import time
+import uuid
+import argparse
+import threading
+import functools
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+def run_log_path() -> str:
+    """JSON-lines file that receives one record per run. Override with BLOG_STUDIO_RUN_LOG."""
+    return os.getenv("BLOG_STUDIO_RUN_LOG", os.path.join("logs", "runs.jsonl"))
+
+class RunRecorder:
+    """
+    Collects what one process run did: per-stage timings per topic, and per-service
+    counters such as API calls, bytes downloaded and prompt/completion tokens.
+    All methods are thread-safe so concurrent pipelines can share one recorder.
+    """
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.stages: List[Dict[str, Any]] = []
+        self.topics: List[Dict[str, Any]] = []
+        self.services: Dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def count(self, service: str, **amounts: float) -> None:
+        """Adds to the counters of a service, e.g. count("openai", calls=1, prompt_tokens=812)."""
+        with self._lock:
+            self.services[service].update({key: value for key, value in amounts.items() if value})
+
+    def record_usage(self, service: str, usage: Any) -> None:
+        """Records the token usage object returned with an OpenAI response."""
+        if usage is None:
+            return
+        # cached_tokens: the part of the prompt served from the provider's prompt cache
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.count(
+            service,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            cached_prompt_tokens=getattr(details, "cached_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        )
+
+    def record_stage(self, stage: str, seconds: float, ok: bool, topic: Optional[str] = None) -> None:
+        with self._lock:
+            self.stages.append({"topic": topic, "stage": stage, "seconds": round(seconds, 4), "ok": ok})
+
+    def record_topic(self, topic: str, result: str, seconds: float) -> None:
+        with self._lock:
+            self.topics.append({
+                "topic": topic,
+                "ok": "Error:" not in result,
+                "seconds": round(seconds, 4),
+                "result": result[:500],
+            })
+
+    @contextmanager
+    def stage_timer(self, stage: str, topic: Optional[str] = None):
+        """Times the enclosed block as one stage; an exception marks it as failed."""
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record_stage(stage, time.perf_counter() - started, ok, topic)
+
+    def timed(self, stage: str, topic: Optional[str] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Decorator form of stage_timer."""
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage_timer(stage, topic):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def to_record(self, **extra: Any) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+                "duration_seconds": round(time.time() - self.started_at, 4),
+                "topics": list(self.topics),
+                "stages": list(self.stages),
+                "services": {service: dict(counter) for service, counter in self.services.items()},
+                **extra,
+            }
+
+    def append_to_log(self, path: str = None, **extra: Any) -> str:
+        """Appends this run as one JSON line and returns the log path."""
+        path = path or run_log_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.to_record(**extra), ensure_ascii=False) + "\n")
+        return path
+
+# One recorder per process; the tools report into it.
+recorder = RunRecorder()
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread at a fixed interval and writes them in the
+    folded "frame;frame;frame count" format read by flamegraph.pl and speedscope.
+    Unlike cProfile it also sees the worker threads that run the pipelines.
+    """
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self, path: str) -> str:
+        self._stop.set()
+        self._thread.join()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def report(path: str = None, last: Optional[int] = None) -> None:
+    """Prints p50/p95 per stage and per-service totals aggregated across logged runs."""
+    path = path or run_log_path()
+    if not os.path.exists(path):
+        print(f"No run log at '{path}'.")
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    if last:
+        runs = runs[-last:]
+    if not runs:
+        print("The run log is empty.")
+        return
+
+    durations: Dict[str, List[float]] = defaultdict(list)
+    failures: Counter = Counter()
+    services: Dict[str, Counter] = defaultdict(Counter)
+    posts = ok_posts = 0
+    for run in runs:
+        for stage in run.get("stages", []):
+            durations[stage["stage"]].append(stage["seconds"])
+            failures[stage["stage"]] += not stage["ok"]
+        for topic in run.get("topics", []):
+            durations["(topic total)"].append(topic["seconds"])
+            posts += 1
+            ok_posts += topic["ok"]
+        for service, counters in run.get("services", {}).items():
+            services[service].update(counters)
+
+    print(f"--- Run Report: {len(runs)} run(s), {posts} topic(s), {ok_posts} succeeded ---")
+    print(f"{'stage':<18}{'count':>7}{'p50 s':>10}{'p95 s':>10}{'max s':>10}{'failed':>8}")
+    for stage, values in sorted(durations.items()):
+        print(f"{stage:<18}{len(values):>7}{percentile(values, 0.5):>10.2f}{percentile(values, 0.95):>10.2f}{max(values):>10.2f}{failures[stage]:>8}")
+    print("--- Services ---")
+    for service, counters in sorted(services.items()):
+        print(f"{service}: " + ", ".join(f"{key}={value:g}" for key, value in sorted(counters.items())))
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point, also reached through `agent_studio.py report`."""
+    parser = argparse.ArgumentParser(description="Aggregate the JSON-lines run log.")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--log", default=None)
+    parser.add_argument("--last", type=int, default=None, help="Only include the most recent N runs.")
+    args = parser.parse_args(argv)
+    report(args.log, args.last)
+
+if __name__ == '__main__':
+    main()
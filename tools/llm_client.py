@@ -0,0 +1,103 @@
+import os
+from typing import Callable, Dict, List, Optional
+from response_cache import ResponseCache, make_key
+from http_client import get_openai_client
+from instrumentation import recorder
+from prompt_registry import PromptTemplate
+
+# Shared by generate_article and assign_category. Override limits with
+# LLM_CACHE_TTL_DAYS and LLM_CACHE_MAX_MB; bypass reads with LLM_CACHE_BYPASS=1.
+llm_cache = ResponseCache(
+    "openai-chat",
+    ttl_seconds=int(float(os.getenv("LLM_CACHE_TTL_DAYS", "30")) * 24 * 3600),
+    max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "50")) * 1024 * 1024),
+)
+
+# Answers obtained elsewhere (the Batch API) for requests the pipeline is about to send
+_preloaded: Dict[str, str] = {}
+
+def chat_cache_key(model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+    """Cache key for a chat completion: model, full prompt and sampling parameters."""
+    return make_key("chat.completions", model, messages, temperature, max_tokens)
+
+def preload_response(request: Dict[str, object], content: str) -> None:
+    """
+    Makes chat_completion answer this exact request with `content` instead of calling
+    the API, regardless of LLM_CACHE_BYPASS. The answer is also written to the cache.
+    """
+    key = chat_cache_key(**request)
+    _preloaded[key] = content
+    llm_cache.set(key, content)
+
+def _cached_response(key: str):
+    if key in _preloaded:
+        recorder.count("openai", preloaded=1)
+        return _preloaded[key]
+    cached = llm_cache.get(key)
+    if cached is not None:
+        recorder.count("openai", cache_hits=1)
+    return cached
+
+def chat_completion(api_key: str, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+                    prompt: Optional[PromptTemplate] = None) -> str:
+    """
+    Returns the stripped message content of a chat completion, served from the on-disk
+    cache when the exact same request was answered before. API errors are raised as-is.
+    When the request was rendered from a prompt template, its token usage is logged under it.
+    """
+    key = chat_cache_key(model, messages, temperature, max_tokens)
+    cached = _cached_response(key)
+    if cached is not None:
+        return cached
+
+    client = get_openai_client(api_key)
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+    recorder.record_usage("openai", response.usage)
+    if prompt:
+        prompt.record(messages, response.usage)
+    content = response.choices[0].message.content.strip()
+    llm_cache.set(key, content)
+    return content
+
+def chat_completion_stream(api_key: str, model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int, on_delta: Callable[[str], None],
+                           prompt: Optional[PromptTemplate] = None) -> str:
+    """
+    Streaming variant of chat_completion: on_delta receives each text fragment as it
+    arrives (a cache hit is replayed as one fragment). The full text is cached only
+    after the stream completes, so a dropped connection never caches a partial answer.
+    """
+    key = chat_cache_key(model, messages, temperature, max_tokens)
+    cached = _cached_response(key)
+    if cached is not None:
+        on_delta(cached)
+        return cached
+
+    client = get_openai_client(api_key)
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    parts = []
+    for chunk in stream:
+        # With include_usage the last chunk carries the token counts and no choices.
+        recorder.record_usage("openai", getattr(chunk, "usage", None))
+        if prompt:
+            prompt.record(messages, getattr(chunk, "usage", None))
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            on_delta(delta)
+    content = "".join(parts).strip()
+    llm_cache.set(key, content)
+    return content
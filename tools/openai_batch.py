@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import sqlite3
+import tempfile
+from typing import Dict, List, Optional, Tuple
+from sqlite_store import SQLiteStore
+from topic_queue import Topic, parse_keywords
+from instrumentation import recorder
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+def batch_db_path() -> str:
+    """SQLite file holding submitted batches and their requests. Override with OPENAI_BATCH_DB."""
+    return os.getenv("OPENAI_BATCH_DB", os.path.join("data", "openai_batches.sqlite3"))
+
+def batch_lease_seconds() -> int:
+    """How long topics in a batch stay claimed: the 24h completion window plus slack."""
+    return int(os.getenv("OPENAI_BATCH_LEASE_SECONDS", str(26 * 3600)))
+
+def build_batch_items(topics: List[Topic]) -> List[Dict[str, object]]:
+    """
+    The requests the pipeline would send for each topic, built by the same functions
+    generate_article and assign_category use. Topics the local classifier can already
+    categorise only need their article.
+    """
+    from article_generator import article_request
+    from category_assigner import category_request, local_category
+
+    items = []
+    for topic in topics:
+        primary_keyword, secondary_keywords = parse_keywords(topic.line)
+        items.append({"custom_id": f"topic-{topic.id}-article", "topic": topic, "kind": "article",
+                      "request": article_request(primary_keyword, secondary_keywords)})
+        if local_category(primary_keyword) is None:
+            items.append({"custom_id": f"topic-{topic.id}-category", "topic": topic, "kind": "category",
+                          "request": category_request(primary_keyword)})
+    return items
+
+def _response_content(line: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """(content, error) of one line of a batch output or error file."""
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    if line.get("error") or response.get("status_code", 200) >= 400:
+        error = line.get("error") or body.get("error") or {"status_code": response.get("status_code")}
+        return None, json.dumps(error, ensure_ascii=False)
+    usage = body.get("usage") or {}
+    recorder.count("openai-batch", prompt_tokens=usage.get("prompt_tokens", 0),
+                   completion_tokens=usage.get("completion_tokens", 0))
+    choices = body.get("choices") or []
+    message = (choices[0].get("message") or {}) if choices else {}
+    # A refusal or a tool call has no text: only this request fails, not the whole download.
+    if not (message.get("content") or "").strip():
+        reason = message.get("refusal") or (choices[0].get("finish_reason") if choices else None)
+        return None, f"empty response ({reason})" if reason else "empty response"
+    # chat_completion strips its answers too, so both paths hand over identical text
+    return message["content"].strip(), None
+
+class BatchStore(SQLiteStore):
+    """
+    Persistent state of Batch API jobs: one row per submitted batch and one per request
+    in it, with the topic it belongs to and, once downloaded, its answer. Everything a
+    later cron run needs to pick up where the submitting run stopped.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or batch_db_path()
+
+    def _create_schema(self, connection: sqlite3.Connection) -> None:
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS batches (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                input_file_id TEXT NOT NULL,
+                output_file_id TEXT,
+                error_file_id TEXT,
+                downloaded INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )""")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                batch_id TEXT NOT NULL,
+                custom_id TEXT NOT NULL,
+                topic_id INTEGER NOT NULL,
+                topic_line TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                request TEXT NOT NULL,
+                content TEXT,
+                error TEXT,
+                settled INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (batch_id, custom_id)
+            )""")
+
+    def add_batch(self, batch_id: str, input_file_id: str, status: str, items: List[Dict[str, object]]) -> None:
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO batches (id, status, input_file_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (batch_id, status, input_file_id, now, now),
+            )
+            for item in items:
+                topic = item["topic"]
+                connection.execute(
+                    "INSERT INTO items (batch_id, custom_id, topic_id, topic_line, attempts, kind, request) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (batch_id, item["custom_id"], topic.id, topic.line, topic.attempts, item["kind"], json.dumps(item["request"], ensure_ascii=False)),
+                )
+
+    def exists(self) -> bool:
+        """False until the first batch is submitted, so polling costs nothing before then."""
+        return os.path.exists(self.path)
+
+    def open_batches(self) -> List[str]:
+        """Batches that still need polling or downloading."""
+        with self._transaction() as connection:
+            return [row[0] for row in connection.execute("SELECT id FROM batches WHERE downloaded = 0 ORDER BY created_at")]
+
+    def update_batch(self, batch_id: str, status: str, output_file_id: Optional[str], error_file_id: Optional[str]) -> None:
+        # A poll that finds the batch unchanged writes nothing, so the committed file stays the same.
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE batches SET status = ?, output_file_id = ?, error_file_id = ?, updated_at = ? WHERE id = ?"
+                " AND (status IS NOT ? OR output_file_id IS NOT ? OR error_file_id IS NOT ?)",
+                (status, output_file_id, error_file_id, time.time(), batch_id, status, output_file_id, error_file_id),
+            )
+
+    def store_results(self, batch_id: str, results: Dict[str, Tuple[Optional[str], Optional[str]]]) -> None:
+        """Saves the downloaded answers and marks the batch as fully downloaded."""
+        with self._transaction() as connection:
+            for custom_id, (content, error) in results.items():
+                connection.execute(
+                    "UPDATE items SET content = ?, error = ? WHERE batch_id = ? AND custom_id = ?",
+                    (content, error, batch_id, custom_id),
+                )
+            connection.execute("UPDATE batches SET downloaded = 1, updated_at = ? WHERE id = ?", (time.time(), batch_id))
+
+    def in_flight_topic_ids(self) -> List[int]:
+        with self._transaction() as connection:
+            return [row[0] for row in connection.execute(
+                "SELECT DISTINCT items.topic_id FROM items JOIN batches ON batches.id = items.batch_id WHERE batches.downloaded = 0"
+            )]
+
+    def finished_topics(self) -> Tuple[List[Tuple[Topic, List[Tuple[Dict, str]]]], List[Tuple[Topic, str]]]:
+        """
+        Unsettled topics of downloaded batches, split into those with every answer
+        ((topic, [(request, content), ...])) and those that failed ((topic, error)).
+        """
+        grouped: Dict[Tuple[str, int], Dict] = {}
+        with self._transaction() as connection:
+            rows = connection.execute("""
+                SELECT items.batch_id, items.topic_id, items.topic_line, items.attempts, items.request,
+                       items.content, items.error, batches.status
+                FROM items JOIN batches ON batches.id = items.batch_id
+                WHERE batches.downloaded = 1 AND items.settled = 0
+                ORDER BY items.topic_id""").fetchall()
+        for batch_id, topic_id, line, attempts, request, content, error, status in rows:
+            group = grouped.setdefault((batch_id, topic_id), {"topic": Topic(topic_id, line, attempts), "answers": [], "errors": []})
+            if content is not None:
+                group["answers"].append((json.loads(request), content))
+            else:
+                group["errors"].append(error or f"no answer (batch {status})")
+        ready, failed = [], []
+        for group in grouped.values():
+            if group["errors"]:
+                failed.append((group["topic"], f"Error: The OpenAI batch did not answer every request - {group['errors'][0]}"))
+            else:
+                ready.append((group["topic"], group["answers"]))
+        return ready, failed
+
+    def mark_settled(self, topic_ids: List[int]) -> None:
+        with self._transaction() as connection:
+            connection.executemany(
+                "UPDATE items SET settled = 1 WHERE topic_id = ? AND settled = 0 AND batch_id IN (SELECT id FROM batches WHERE downloaded = 1)",
+                [(topic_id,) for topic_id in topic_ids],
+            )
+
+    def summary(self) -> List[tuple]:
+        with self._transaction() as connection:
+            return connection.execute("""
+                SELECT batches.id, batches.status, batches.downloaded, COUNT(items.custom_id),
+                       SUM(items.content IS NOT NULL), SUM(items.settled)
+                FROM batches LEFT JOIN items ON items.batch_id = batches.id
+                GROUP BY batches.id ORDER BY batches.created_at""").fetchall()
+
+def submit_batch(api_key: str, topics: List[Topic], store: BatchStore = None) -> str:
+    """Writes the topics' requests to a JSONL file, uploads it and starts a batch. Returns the batch id."""
+    from http_client import get_openai_client
+
+    store = store or BatchStore()
+    items = build_batch_items(topics)
+    client = get_openai_client(api_key)
+    with tempfile.NamedTemporaryFile('w', suffix=".jsonl", encoding='utf-8', delete=False) as f:
+        for item in items:
+            f.write(json.dumps({"custom_id": item["custom_id"], "method": "POST", "url": BATCH_ENDPOINT,
+                                "body": item["request"]}, ensure_ascii=False) + "\n")
+        jsonl_path = f.name
+    try:
+        with open(jsonl_path, 'rb') as f:
+            input_file = client.files.create(file=f, purpose="batch")
+    finally:
+        os.remove(jsonl_path)
+    batch = client.batches.create(input_file_id=input_file.id, endpoint=BATCH_ENDPOINT, completion_window="24h",
+                                  metadata={"source": "blog-studio"})
+    store.add_batch(batch.id, input_file.id, batch.status, items)
+    recorder.count("openai-batch", submitted_requests=len(items))
+    return batch.id
+
+def _download(client, file_id: Optional[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    if not file_id:
+        return {}
+    results = {}
+    for raw_line in client.files.content(file_id).text.splitlines():
+        if raw_line.strip():
+            line = json.loads(raw_line)
+            results[line["custom_id"]] = _response_content(line)
+    return results
+
+def poll_batches(api_key: str, store: BatchStore = None) -> List[Tuple[str, str]]:
+    """
+    Refreshes every open batch and downloads the output and error files of those that
+    reached a final status. Returns (batch id, status) for each batch polled.
+    """
+    from http_client import get_openai_client
+
+    store = store or BatchStore()
+    client = get_openai_client(api_key)
+    polled = []
+    for batch_id in store.open_batches():
+        batch = client.batches.retrieve(batch_id)
+        store.update_batch(batch_id, batch.status, batch.output_file_id, batch.error_file_id)
+        if batch.status in FINAL_STATUSES:
+            # An expired or cancelled batch can still have answered part of its requests.
+            results = _download(client, batch.error_file_id)
+            results.update(_download(client, batch.output_file_id))
+            store.store_results(batch_id, results)
+        polled.append((batch_id, batch.status))
+    return polled
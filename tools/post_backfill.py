@@ -0,0 +1,375 @@
+import os
+import re
+import abc
+import glob
+import base64
+import hashlib
+import argparse
+import tempfile
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from article_parser import clean_title, parse_post
+from post_manifest import POST_PREFIX_RE, PostManifest, get_manifest, site_data_dir
+
+FRONT_MATTER_LINE_RE = re.compile(r"^([A-Za-z_][\w-]*):(?:\s+(.*))?$")
+
+# name -> (description, function). A transform edits post["front_matter"] / post["body"]
+# in place; the target gives it access to the repository's other files (images).
+TRANSFORMS: Dict[str, Tuple[str, Callable[[Dict, "BackfillTarget"], None]]] = {}
+
+def transform(name: str, description: str):
+    """Registers a backfill transform. They run in registration order."""
+    def decorator(func):
+        TRANSFORMS[name] = (description, func)
+        return func
+    return decorator
+
+def _insert_after(fields: Dict[str, str], after: str, key: str, value: str) -> Dict[str, str]:
+    """A copy of the front matter with `key` placed after `after` (or at the end)."""
+    result = {}
+    for existing_key, existing_value in fields.items():
+        if existing_key != key:
+            result[existing_key] = existing_value
+        if existing_key == after:
+            result[key] = value
+    result.setdefault(key, value)
+    return result
+
+@transform("normalize-title", "Strip heading markers and emphasis the model left in titles.")
+def normalize_title(post: Dict, target: "BackfillTarget") -> None:
+    title = post["front_matter"].get("title")
+    if title is not None:
+        post["front_matter"]["title"] = clean_title(title)
+
+@transform("add-permalink", "Give posts without one the /<slug>/ permalink new posts get.")
+def add_permalink(post: Dict, target: "BackfillTarget") -> None:
+    if not post["front_matter"].get("permalink"):
+        slug = POST_PREFIX_RE.sub("", os.path.basename(post["path"]))[:-len(".md")]
+        post["front_matter"] = _insert_after(post["front_matter"], "category", "permalink", f"/{slug}/")
+
+@transform("image-variants", "Point featured images at resized JPEG/WebP variants, creating them if needed.")
+def add_image_variants(post: Dict, target: "BackfillTarget") -> None:
+    from github_publisher import image_front_matter
+    from image_creator import image_variants, process_image
+
+    fields = post["front_matter"]
+    image_repo_path = fields.get("featured_image", "").lstrip("/")
+    if not image_repo_path or fields.get("featured_image_srcset") or not target.has_file(image_repo_path):
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        raw_image = target.read_file(image_repo_path)
+        source_path = os.path.join(directory, "source")
+        with open(source_path, 'wb') as f:
+            f.write(raw_image)
+        main_path = process_image(source_path, hashlib.sha256(raw_image).hexdigest(), directory)
+        variants = image_variants(main_path)
+        if not variants:  # Pillow is not installed
+            return
+        for path in [main_path] + [variant["path"] for variant in variants]:
+            repo_path = f"images/{os.path.basename(path)}"
+            if not target.has_file(repo_path):
+                with open(path, 'rb') as f:
+                    target.write(repo_path, f.read())
+        new_fields = image_front_matter(f"images/{os.path.basename(main_path)}", variants)
+    previous_key = "featured_image"
+    for key in ("featured_image_srcset", "featured_image_webp_srcset"):
+        if key in new_fields:
+            fields = _insert_after(fields, previous_key, key, new_fields[key])
+            previous_key = key
+    fields["featured_image"] = new_fields["featured_image"]
+    post["front_matter"] = fields
+
+class BackfillTarget(abc.ABC):
+    """Where the posts live: iterates them one at a time and stages changed files."""
+    @abc.abstractmethod
+    def post_paths(self) -> List[str]:
+        ...
+
+    def read_text(self, path: str) -> str:
+        return self.read_file(path).decode("utf-8")
+
+    @abc.abstractmethod
+    def read_file(self, path: str) -> bytes:
+        ...
+
+    @abc.abstractmethod
+    def has_file(self, path: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def write(self, path: str, content) -> None:
+        ...
+
+    @abc.abstractmethod
+    def finish(self, message: str) -> str:
+        """Commits (or reports) everything staged by write() and describes the result."""
+
+    @abc.abstractmethod
+    def prepare_manifest(self) -> PostManifest:
+        """The manifest describing this target's posts, complete before any post is changed."""
+
+class LocalTarget(BackfillTarget):
+    """A checkout of the blog on disk; changed files are rewritten in place."""
+    def __init__(self, root: str = "."):
+        self.root = root
+
+    def post_paths(self) -> List[str]:
+        return [f"_posts/{os.path.basename(path)}" for path in sorted(glob.glob(os.path.join(self.root, "_posts", "*.md")))]
+
+    def read_file(self, path: str) -> bytes:
+        with open(os.path.join(self.root, path), 'rb') as f:
+            return f.read()
+
+    def has_file(self, path: str) -> bool:
+        return os.path.exists(os.path.join(self.root, path))
+
+    def write(self, path: str, content) -> None:
+        full_path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        temp_path = f"{full_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(content.encode("utf-8") if isinstance(content, str) else content)
+        os.replace(temp_path, full_path)
+
+    def finish(self, message: str) -> str:
+        return f"Files rewritten under '{os.path.abspath(self.root)}'; review and commit them."
+
+    def prepare_manifest(self) -> PostManifest:
+        # A checkout's own manifest, built from its files for this run only: the global
+        # manifest describes the published blog and must not take in another copy's posts.
+        self._manifest_dir = tempfile.TemporaryDirectory()
+        manifest = PostManifest(os.path.join(self._manifest_dir.name, "post_manifest.json"))
+        manifest.sync(os.path.join(self.root, "_posts"))
+        return manifest
+
+class GitHubTarget(BackfillTarget):
+    """
+    The blog repository through the Git Data API. Posts are fetched one blob at a time
+    and every changed file becomes a blob as soon as it is staged (a StagedCommit, as
+    publish_posts uses), so only paths and blob SHAs are held until the single commit
+    at the end.
+    """
+    def __init__(self, github_token: str, repo_name: str):
+        from github_publisher import StagedCommit
+        from http_client import get_github_client, throttle
+
+        self._throttle = throttle
+        self.github_token = github_token
+        self.repo_name = repo_name
+        g = get_github_client(github_token)
+        throttle("github")
+        self.repo = g.get_repo(repo_name)
+        self.branch = self.repo.default_branch
+        throttle("github")
+        self.ref = self.repo.get_git_ref(f"heads/{self.branch}")
+        throttle("github")
+        self.base_commit = self.repo.get_git_commit(self.ref.object.sha)
+        throttle("github")
+        root_tree = self.repo.get_git_tree(self.base_commit.tree.sha)
+        self.files: Dict[str, str] = {}
+        for directory in ("_posts", "images"):
+            for element in root_tree.tree:
+                if element.path == directory and element.type == "tree":
+                    throttle("github")
+                    for child in self.repo.get_git_tree(element.sha).tree:
+                        self.files[f"{directory}/{child.path}"] = child.sha
+        self.staged = StagedCommit(self.repo)
+
+    def post_paths(self) -> List[str]:
+        return sorted(path for path in self.files if path.startswith("_posts/") and path.endswith(".md"))
+
+    def read_file(self, path: str) -> bytes:
+        self._throttle("github")
+        return base64.b64decode(self.repo.get_git_blob(self.files[path]).content)
+
+    def has_file(self, path: str) -> bool:
+        return path in self.files
+
+    def write(self, path: str, content) -> None:
+        self.files[path] = self.staged.add_blob(path, content.encode("utf-8") if isinstance(content, str) else content)
+
+    def finish(self, message: str) -> str:
+        commit = self.staged.commit(self.ref, self.base_commit, message)
+        return f"Committed {commit.sha[:7]} to {self.repo.full_name}@{self.branch}."
+
+    def prepare_manifest(self) -> PostManifest:
+        from github_publisher import prepare_manifest
+
+        prepare_manifest(self.github_token, self.repo_name)
+        return get_manifest()
+
+class DryRunTarget(BackfillTarget):
+    """Reads through to another target but only records what would be written."""
+    def __init__(self, target: BackfillTarget):
+        self.target = target
+        self.written: set = set()
+
+    def post_paths(self) -> List[str]:
+        return self.target.post_paths()
+
+    def read_file(self, path: str) -> bytes:
+        return self.target.read_file(path)
+
+    def has_file(self, path: str) -> bool:
+        return path in self.written or self.target.has_file(path)
+
+    def write(self, path: str, content) -> None:
+        self.written.add(path)
+
+    def finish(self, message: str) -> str:
+        return f"Dry run: {len(self.written)} file(s) would be written."
+
+    def prepare_manifest(self) -> PostManifest:
+        return self.target.prepare_manifest()
+
+def iter_posts(target: BackfillTarget) -> Iterator[Dict]:
+    """Yields one parsed post at a time: path, original text, front matter and body."""
+    for path in target.post_paths():
+        text = target.read_text(path)
+        front_matter, body = parse_post(text)
+        yield {"path": path, "text": text, "front_matter": front_matter, "body": body}
+
+def front_matter_lines(text: str) -> Optional[List[str]]:
+    """
+    The lines of a post's front matter block, or None unless every line is a one-line
+    `key: value` pair (or blank, or a comment) with a unique key - the only shape the
+    flat dict from parse_post describes completely. Lists, block scalars and values
+    continued on the next line are not.
+    """
+    parts = text.split("---", 2)
+    if len(parts) != 3 or parts[0] or not parts[1].startswith("\n") or not parts[1].endswith("\n"):
+        return None
+    lines = parts[1][1:-1].split("\n") if parts[1] != "\n" else []
+    keys = set()
+    for line in lines:
+        if not line.strip() or line.startswith("#"):
+            continue
+        match = FRONT_MATTER_LINE_RE.match(line.rstrip())
+        if not match or match.group(1) in keys:
+            return None
+        value = (match.group(2) or "").strip()
+        if value and (value[0] in "|>" or value.count('"') % 2 or (value[0] in "[{" and value[-1] not in "]}")):
+            return None
+        keys.add(match.group(1))
+    return lines
+
+def _line_key(line: str) -> Optional[str]:
+    match = FRONT_MATTER_LINE_RE.match(line.rstrip())
+    return match.group(1) if match and not line.startswith("#") else None
+
+def edit_front_matter(lines: List[str], original: Dict[str, str], fields: Dict[str, str]) -> List[str]:
+    """
+    The front matter lines with only what the transforms changed rewritten: changed
+    values are re-rendered the way publish_to_github renders them, new keys go after
+    the key that precedes them in `fields`, and removed keys are dropped. Every other
+    line, including its quoting, is kept as it was.
+    """
+    from github_publisher import front_matter_line
+
+    result = []
+    for line in lines:
+        key = _line_key(line)
+        if key is None:
+            result.append(line)
+        elif key in fields:
+            result.append(line if fields[key] == original.get(key) else front_matter_line(key, fields[key]))
+    previous = None
+    for key, value in fields.items():
+        if key not in original:
+            keys = [_line_key(line) for line in result]
+            position = keys.index(previous) + 1 if previous in keys else (0 if previous is None else len(result))
+            result.insert(position, front_matter_line(key, value))
+        previous = key
+    return result
+
+def backfill(target: BackfillTarget, transforms: List[str], dry_run: bool = False, manifest: PostManifest = None) -> List[str]:
+    """
+    Streams every post through the transforms and stages the ones that changed. Only
+    the front matter lines a transform touched are rewritten; posts whose front matter
+    is not flat `key: value` lines are skipped and left for a manual edit. Unchanged
+    posts are never rewritten. The manifest (target.prepare_manifest() by default)
+    follows the changed posts and takes in any post it did not know, so the site
+    indexes written with them cover the whole target.
+    Returns the changed post paths; nothing is written with dry_run.
+    """
+    manifest = manifest or target.prepare_manifest()
+    if dry_run:
+        target = DryRunTarget(target)
+    changed = []
+    for post in iter_posts(target):
+        known_slug = manifest.slug_for_path(post["path"])
+        if known_slug is None or manifest.posts[known_slug].get("stub"):
+            manifest.add(PostManifest.entry_from_post(post["path"], post["text"], known_slug))
+        lines = front_matter_lines(post["text"])
+        if lines is None:
+            print(f"Skipped '{post['path']}': its front matter is not one-line key: value pairs; edit it by hand.")
+            continue
+        original = (dict(post["front_matter"]), post["body"])
+        applied = []
+        for name in transforms:
+            before = (dict(post["front_matter"]), post["body"])
+            TRANSFORMS[name][1](post, target)
+            if (post["front_matter"], post["body"]) != before:
+                applied.append(name)
+        if (post["front_matter"], post["body"]) == original:
+            continue
+        new_lines = edit_front_matter(lines, original[0], post["front_matter"])
+        content = "\n".join(["---"] + new_lines + ["---"]) + post["body"]
+        changed.append(post["path"])
+        print(f"{'Would change' if dry_run else 'Changed'} '{post['path']}': {', '.join(applied)}")
+        target.write(post["path"], content)
+        if not dry_run:
+            manifest.add(PostManifest.entry_from_post(post["path"], content, manifest.slug_for_path(post["path"])))
+    if changed and not dry_run:
+        for name, content in manifest.site_files().items():
+            target.write(f"{site_data_dir()}/{name}", content)
+    return changed
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point, also reached through `agent_studio.py backfill`."""
+    parser = argparse.ArgumentParser(description="Apply transforms to every existing post and commit the changed ones at once.")
+    parser.add_argument("--transform", action="append", choices=list(TRANSFORMS),
+                        help="Transform to apply (repeatable; default: all, in the listed order).")
+    parser.add_argument("--list", action="store_true", help="List the registered transforms.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which posts would change.")
+    parser.add_argument("--local", metavar="DIR", help="Rewrite a local checkout instead of committing to GITHUB_REPO_NAME.")
+    parser.add_argument("--message", default=None, help="Commit message.")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (description, _) in TRANSFORMS.items():
+            print(f"{name:<18}{description}")
+        return 0
+    transforms = [name for name in TRANSFORMS if name in (args.transform or TRANSFORMS)]
+
+    if args.local:
+        target = LocalTarget(args.local)
+    else:
+        github_token = os.getenv("GITHUB_TOKEN")
+        repo_name = os.getenv("GITHUB_REPO_NAME")
+        if not all([github_token, repo_name]):
+            print("Error: GITHUB_TOKEN or GITHUB_REPO_NAME is not set (or use --local).")
+            return 1
+        target = GitHubTarget(github_token, repo_name)
+
+    try:
+        manifest = target.prepare_manifest()
+    except Exception as e:
+        print(f"Error: Could not read the existing posts - {e}")
+        return 1
+    try:
+        changed = backfill(target, transforms, args.dry_run, manifest)
+        if not changed or args.dry_run:
+            print(f"{len(changed)} post(s) {'would change' if args.dry_run else 'changed'}.")
+            return 0
+        message = args.message or f"chore: Backfill {len(changed)} post(s) ({', '.join(transforms)})"
+        print(target.finish(message))
+    except Exception as e:
+        manifest.reload()  # nothing was committed, so forget the updated entries
+        print(f"Error: The backfill failed - {e}")
+        return 1
+    manifest.save()
+    print(f"{len(changed)} post(s) changed.")
+    return 0
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+import os
+import re
+import json
+import glob
+import hashlib
+import argparse
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+from article_parser import parse_article, parse_post
+
+RELATED_COUNT = 4
+SITE_FILES = ("post_categories", "post_tags", "related_posts")
+POST_PREFIX_RE = re.compile(r"^\d{4}-\d{2}-\d{2}-(?:\d{6}-)?")
+
+def manifest_path() -> str:
+    """JSON file holding the post manifest. Override with POST_MANIFEST_PATH."""
+    return os.getenv("POST_MANIFEST_PATH", os.path.join("data", "post_manifest.json"))
+
+def site_data_dir() -> str:
+    """Directory of the Jekyll site that receives the index JSON. Override with SITE_DATA_DIR."""
+    return os.getenv("SITE_DATA_DIR", "_data")
+
+def slugify(title: str) -> str:
+    """The permalink slug of a title (the rule every published post has used)."""
+    return re.sub(r'[^a-z0-9\s-]', '', title.lower()).strip().replace(' ', '-') or "new-post"
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def _related_score(post: Dict, other: Dict) -> int:
+    """Two points per shared tag, one for the same category."""
+    shared_tags = len(set(post.get("tags", [])) & set(other.get("tags", [])))
+    return 2 * shared_tags + (post.get("category") == other.get("category"))
+
+class PostManifest:
+    """
+    Everything the publisher needs to know about the posts already in the blog, kept
+    in one JSON file keyed by slug: path, title, date, category, tags, image and hashes.
+    It is updated incrementally as posts are published, so slug collision checks and
+    unique slugs are dictionary lookups instead of repository listings, and the site
+    indexes are rendered from it without re-reading any post.
+    Related posts are maintained incrementally too: adding a post scores it against
+    the others once and updates their top-RELATED_COUNT lists in place.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or manifest_path()
+        self._lock = threading.RLock()
+        self._reserved: set = set()
+        self.reload()
+
+    def reload(self) -> None:
+        """Re-reads the file, dropping unsaved changes."""
+        with self._lock:
+            data = {}
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            self.posts: Dict[str, Dict] = data.get("posts", {})
+            self.images: set = set(data.get("images", []))
+            self.related: Dict[str, List[List]] = data.get("related", {})
+            self.seeded_repos: set = set(data.get("seeded_repos", []))
+            self._paths = {post["path"]: slug for slug, post in self.posts.items()}
+
+    def save(self) -> None:
+        """Writes the manifest atomically."""
+        with self._lock:
+            data = {
+                "version": 1,
+                "seeded_repos": sorted(self.seeded_repos),
+                "posts": dict(sorted(self.posts.items())),
+                "images": sorted(self.images),
+                "related": dict(sorted(self.related.items())),
+            }
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(temp_path, self.path)
+
+    # --- slugs ---
+
+    def has_slug(self, slug: str) -> bool:
+        return slug in self.posts
+
+    def has_path(self, path: str) -> bool:
+        return path in self._paths
+
+    def slug_for_path(self, path: str) -> Optional[str]:
+        return self._paths.get(path)
+
+    def reserve_slug(self, title: str) -> str:
+        """
+        Returns a slug for the title that no published or in-flight post uses
+        (adding -2, -3, ... when needed) and reserves it for this process.
+        """
+        base = slugify(title)
+        with self._lock:
+            slug, suffix = base, 2
+            while slug in self.posts or slug in self._reserved:
+                slug, suffix = f"{base}-{suffix}", suffix + 1
+            self._reserved.add(slug)
+            return slug
+
+    # --- entries ---
+
+    def add(self, entry: Dict) -> None:
+        """Adds or replaces one post entry and updates the related-post lists."""
+        slug = entry["slug"]
+        with self._lock:
+            previous = self.posts.get(slug)
+            if previous:
+                self._paths.pop(previous["path"], None)
+            self.posts[slug] = entry
+            self._paths[entry["path"]] = slug
+            self._reserved.discard(slug)
+            if entry.get("image"):
+                self.images.add(entry["image"])
+            self.images.update(entry.get("image_files", []))
+            self._update_related(slug, replaced=previous is not None)
+
+    def _ranked(self, scored: List[List]) -> List[List]:
+        """The top RELATED_COUNT [score, slug] items: highest score, then newest, then by slug."""
+        scored.sort(key=lambda item: item[1])
+        scored.sort(key=lambda item: self.posts[item[1]].get("date", ""), reverse=True)
+        scored.sort(key=lambda item: -item[0])
+        return scored[:RELATED_COUNT]
+
+    def _top_related(self, slug: str) -> List[List]:
+        post = self.posts[slug]
+        scored = [[_related_score(post, other), other_slug] for other_slug, other in self.posts.items()
+                  if other_slug != slug and not other.get("stub")]
+        return self._ranked([item for item in scored if item[0] > 0])
+
+    def _update_related(self, slug: str, replaced: bool) -> None:
+        if self.posts[slug].get("stub"):
+            return
+        self.related[slug] = self._top_related(slug)
+        post = self.posts[slug]
+        for other_slug, current in self.related.items():
+            if other_slug == slug:
+                continue
+            if replaced and any(item[1] == slug for item in current):
+                self.related[other_slug] = self._top_related(other_slug)
+                continue
+            score = _related_score(self.posts[other_slug], post)
+            if score > 0 and (len(current) < RELATED_COUNT or score >= current[-1][0]):
+                # Ranked exactly as _top_related ranks, so ties go to the newer post either way.
+                self.related[other_slug] = self._ranked(current + [[score, slug]])
+
+    @staticmethod
+    def entry_from_post(path: str, content: str, slug: Optional[str] = None) -> Dict:
+        """Builds a manifest entry from a rendered post (front matter plus body)."""
+        front_matter, body = parse_post(content)
+        article = parse_article(body)
+        if not slug:
+            permalink = front_matter.get("permalink", "").strip("/")
+            slug = permalink or POST_PREFIX_RE.sub("", os.path.basename(path))[:-len(".md")]
+        image = front_matter.get("featured_image", "").lstrip("/")
+        srcsets = f"{front_matter.get('featured_image_srcset', '')} {front_matter.get('featured_image_webp_srcset', '')}"
+        return {
+            "slug": slug,
+            "path": path,
+            "title": front_matter.get("title", ""),
+            "date": front_matter.get("date", ""),
+            "category": front_matter.get("category", ""),
+            "tags": article["tags"],
+            "image": image,
+            "image_hash": os.path.splitext(os.path.basename(image))[0] if image else "",
+            "image_files": ([image] if image else []) + re.findall(r"/?(images/[^\s,]+)", srcsets),
+            "content_hash": content_hash(content),
+        }
+
+    def seed_from_listing(self, repo_name: str, post_files: Iterable[str], image_files: Iterable[str],
+                          read_post: Optional[Callable[[str], str]] = None) -> None:
+        """
+        Records what a repository listing shows when the manifest has never seen the repo.
+        With read_post (file name -> post text) every post gets a full entry, so it is in
+        the site indexes and related posts at once. Without it, posts known only by file
+        name become stubs: they count for slug collisions but are left out of the site
+        indexes until `sync` reads their content.
+        """
+        with self._lock:
+            for name in post_files:
+                if not name.endswith(".md"):
+                    continue
+                path = f"_posts/{name}"
+                slug = POST_PREFIX_RE.sub("", name)[:-len(".md")]
+                if path in self._paths or slug in self.posts:
+                    continue
+                if read_post is not None:
+                    self.add(self.entry_from_post(path, read_post(name)))
+                else:
+                    self.posts[slug] = {"slug": slug, "path": path, "date": name[:10], "stub": True}
+                    self._paths[path] = slug
+            self.images.update(f"images/{name}" for name in image_files)
+            self.seeded_repos.add(repo_name)
+
+    def sync(self, posts_dir: str = "_posts") -> Dict[str, int]:
+        """Indexes local post files whose content the manifest does not have yet."""
+        counts = {"added": 0, "updated": 0, "unchanged": 0}
+        with self._lock:
+            hashes = {post.get("content_hash"): slug for slug, post in self.posts.items()}
+            for file_path in sorted(glob.glob(os.path.join(posts_dir, "*.md"))):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                if content_hash(content) in hashes:
+                    counts["unchanged"] += 1
+                    continue
+                path = f"_posts/{os.path.basename(file_path)}"
+                known_slug = self.slug_for_path(path)
+                entry = self.entry_from_post(path, content, known_slug)
+                counts["updated" if known_slug or entry["slug"] in self.posts else "added"] += 1
+                self.add(entry)
+        return counts
+
+    # --- site indexes ---
+
+    def _summary(self, slug: str) -> Dict:
+        post = self.posts[slug]
+        return {"title": post["title"], "url": f"/{slug}/", "date": post["date"],
+                "category": post["category"], "image": f"/{post['image']}" if post.get("image") else ""}
+
+    def site_files(self) -> Dict[str, str]:
+        """
+        Renders the Jekyll data files as {file name: JSON}: posts per category and per
+        tag (newest first) and the related posts of every post, keyed by its URL so a
+        layout can use site.data.related_posts[page.url].
+        """
+        with self._lock:
+            slugs = sorted((slug for slug, post in self.posts.items() if not post.get("stub")),
+                           key=lambda slug: self.posts[slug]["date"], reverse=True)
+            categories: Dict[str, List[Dict]] = {}
+            tags: Dict[str, List[Dict]] = {}
+            for slug in slugs:
+                post = self.posts[slug]
+                categories.setdefault(post["category"], []).append(self._summary(slug))
+                for tag in post.get("tags", []):
+                    tags.setdefault(tag, []).append(self._summary(slug))
+            related = {f"/{slug}/": [self._summary(other) for _, other in self.related.get(slug, [])
+                                     if other in self.posts] for slug in slugs}
+            files = {"post_categories": categories, "post_tags": dict(sorted(tags.items())), "related_posts": related}
+            return {f"{name}.json": json.dumps(files[name], ensure_ascii=False, indent=1) for name in SITE_FILES}
+
+    def write_site_files(self, directory: str = None) -> List[str]:
+        directory = directory or site_data_dir()
+        os.makedirs(directory, exist_ok=True)
+        written = []
+        for name, content in self.site_files().items():
+            path = os.path.join(directory, name)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            written.append(path)
+        return written
+
+_manifest: Optional[PostManifest] = None
+_manifest_lock = threading.Lock()
+
+def get_manifest() -> PostManifest:
+    """The process-wide manifest at the default path."""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = PostManifest()
+        return _manifest
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point, also reached through `agent_studio.py manifest`."""
+    parser = argparse.ArgumentParser(description="Maintain the local post manifest and the site indexes built from it.")
+    parser.add_argument("command", choices=["sync", "site", "check", "status"])
+    parser.add_argument("title", nargs="?", help="Title for `check`.")
+    parser.add_argument("--posts", default="_posts")
+    parser.add_argument("--out", default=None, help="Directory for `site` (default: SITE_DATA_DIR or _data).")
+    args = parser.parse_args(argv)
+
+    manifest = get_manifest()
+    if args.command == "sync":
+        counts = manifest.sync(args.posts)
+        manifest.save()
+        print(f"Manifest: {counts['added']} added, {counts['updated']} updated, {counts['unchanged']} unchanged.")
+    elif args.command == "site":
+        for path in manifest.write_site_files(args.out):
+            print(f"Wrote '{path}'.")
+    elif args.command == "check":
+        if not args.title:
+            parser.error("check needs a title")
+        slug = slugify(args.title)
+        state = "taken" if manifest.has_slug(slug) else "free"
+        print(f"'{slug}' is {state}; a new post would get '{manifest.reserve_slug(args.title)}'.")
+    else:
+        stubs = sum(1 for post in manifest.posts.values() if post.get("stub"))
+        print(f"{len(manifest.posts)} post(s) ({stubs} stub(s)), {len(manifest.images)} image file(s).")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import os
+import math
+import argparse
+import threading
+from typing import Dict, List, Optional, Tuple
+from response_cache import cache_dir
+from instrumentation import recorder
+
+try:
+    import tiktoken
+except ImportError:  # Without tiktoken, token counts are estimated from the UTF-8 length.
+    tiktoken = None
+
+# (context window, output limit) per model, in tokens
+MODEL_LIMITS: Dict[str, Tuple[int, int]] = {
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-4o": (128000, 16384),
+    "gpt-4o-mini": (128000, 16384),
+}
+DEFAULT_LIMITS = (8192, 4096)
+# What the chat format adds around each message and before the reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMER_TOKENS = 3
+
+_encodings: Dict[str, object] = {}
+_encodings_lock = threading.Lock()
+
+def _encoding(model: str):
+    """The tiktoken encoding of a model, or None when tiktoken or its BPE file is unavailable."""
+    if tiktoken is None:
+        return None
+    with _encodings_lock:
+        if model not in _encodings:
+            # The BPE file is downloaded once and kept next to the other caches.
+            os.environ.setdefault("TIKTOKEN_CACHE_DIR", os.path.join(cache_dir(), "tiktoken"))
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                _encodings[model] = None
+        return _encodings[model]
+
+def count_tokens(text: str, model: str) -> int:
+    """Tokens of `text` for the model: exact with tiktoken, otherwise about 4 UTF-8 bytes per token."""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text.encode("utf-8")) / 4)
+
+class PromptTemplate:
+    """
+    A chat prompt built once. The system message is static and byte-identical for every
+    request, so it forms the shared prefix that provider-side prompt caching matches on;
+    everything that varies goes into the user message after it. The system message is
+    counted once, so a request only counts its short user part.
+    max_tokens is set per request: the template's completion budget, capped by the
+    model's output limit and whatever the prompt leaves of the context window.
+    """
+    def __init__(self, name: str, version: int, model: str, system: str, user: str, temperature: float,
+                 max_completion_tokens: int):
+        self.name = name
+        self.version = version
+        self.label = f"{name}@v{version}"
+        self.model = model
+        self.system = system
+        self.user = user
+        self.temperature = temperature
+        self.max_completion_tokens = max_completion_tokens
+        self._system_tokens: Optional[int] = None
+
+    @property
+    def system_tokens(self) -> int:
+        if self._system_tokens is None:
+            self._system_tokens = count_tokens(self.system, self.model)
+        return self._system_tokens
+
+    def prompt_tokens(self, user_prompt: str) -> int:
+        return self.system_tokens + count_tokens(user_prompt, self.model) + 2 * MESSAGE_OVERHEAD_TOKENS + REPLY_PRIMER_TOKENS
+
+    def max_tokens(self, prompt_tokens: int) -> int:
+        context_window, output_limit = MODEL_LIMITS.get(self.model, DEFAULT_LIMITS)
+        remaining = context_window - prompt_tokens
+        if remaining <= 0:
+            raise ValueError(f"The prompt '{self.label}' needs {prompt_tokens} tokens, more than the {context_window}-token context of {self.model}.")
+        return min(self.max_completion_tokens, output_limit, remaining)
+
+    def render(self, **fields: str) -> Dict[str, object]:
+        """The complete chat completion request for these fields."""
+        user_prompt = self.user.format(**fields)
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.system},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens(self.prompt_tokens(user_prompt)),
+        }
+
+    def record(self, messages: List[Dict[str, str]], usage) -> None:
+        """
+        Logs one API call under the template's label, e.g. `prompt:article@v1`, next to
+        the local estimate, so cost and latency can be compared between versions.
+        """
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        recorder.count(
+            f"prompt:{self.label}",
+            calls=1,
+            estimated_prompt_tokens=self.prompt_tokens(messages[-1]["content"]),
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            cached_prompt_tokens=getattr(details, "cached_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+        )
+
+_templates: Dict[str, PromptTemplate] = {}
+
+def register(template: PromptTemplate) -> PromptTemplate:
+    """Adds a template to the registry (keyed by name) and returns it."""
+    _templates[template.name] = template
+    return template
+
+def get_template(name: str) -> PromptTemplate:
+    return _templates[name]
+
+def registered_templates() -> List[PromptTemplate]:
+    return list(_templates.values())
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point, also reached through `agent_studio.py prompts`."""
+    parser = argparse.ArgumentParser(description="List the registered prompt templates and their token budgets.")
+    parser.parse_args(argv)
+
+    # The templates are registered by the tools that send them, with the imported
+    # module (not __main__ when this file is run directly).
+    import article_generator, category_assigner  # noqa: F401
+    from prompt_registry import registered_templates as templates
+    counter = "tiktoken" if any(_encoding(template.model) for template in templates()) else "estimate (tiktoken unavailable)"
+    print(f"{'template':<20}{'model':<14}{'system tokens':>14}{'max_tokens':>12}")
+    for template in templates():
+        print(f"{template.label:<20}{template.model:<14}{template.system_tokens:>14}{template.max_completion_tokens:>12}")
+    print(f"Token counts: {counter}.")
+
+if __name__ == '__main__':
+    main()
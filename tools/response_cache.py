@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+from sqlite_store import SQLiteStore
+
+def cache_dir() -> str:
+    """Directory holding on-disk caches. Override with BLOG_STUDIO_CACHE_DIR."""
+    return os.getenv("BLOG_STUDIO_CACHE_DIR", ".cache")
+
+def cache_bypassed() -> bool:
+    """True when cached answers must not be read (forced regeneration). Set LLM_CACHE_BYPASS=1."""
+    return os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+def make_key(*parts: Any) -> str:
+    """Content-addressed key: a SHA-256 over the JSON encoding of all parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache(SQLiteStore):
+    """
+    A small SQLite key/value cache for remote API responses, shared by every tool.
+    Entries expire after `ttl_seconds`; when the namespace grows past `max_bytes` the
+    least recently used entries are evicted. Hit and miss counts are kept both for the
+    current process and persistently in the database.
+    """
+    def __init__(self, namespace: str, path: str = None, ttl_seconds: int = 30 * 24 * 3600, max_bytes: int = 50 * 1024 * 1024):
+        self.namespace = namespace
+        self.path = path or os.path.join(cache_dir(), "responses.sqlite3")
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _create_schema(self, connection: sqlite3.Connection) -> None:
+        if self._initialized:
+            return
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )""")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS stats (
+                namespace TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0
+            )""")
+        self._initialized = True
+
+    def _count(self, connection: sqlite3.Connection, column: str) -> None:
+        connection.execute("INSERT OR IGNORE INTO stats (namespace) VALUES (?)", (self.namespace,))
+        connection.execute(f"UPDATE stats SET {column} = {column} + 1 WHERE namespace = ?", (self.namespace,))
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached value, or None when missing, expired or bypassed."""
+        if cache_bypassed():
+            return None
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT value, created_at FROM entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row and now - row[1] <= self.ttl_seconds:
+                connection.execute(
+                    "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key),
+                )
+                self._count(connection, "hits")
+                self.hits += 1
+                return row[0]
+            self._count(connection, "misses")
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Stores a value and evicts expired and least recently used entries."""
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict(connection, now)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        connection.execute(
+            "DELETE FROM entries WHERE namespace = ? AND created_at < ?",
+            (self.namespace, now - self.ttl_seconds),
+        )
+        total = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = connection.execute(
+            "SELECT key, size FROM entries WHERE namespace = ? ORDER BY accessed_at ASC", (self.namespace,)
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            connection.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counts for this process and for the lifetime of the cache file."""
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT hits, misses FROM stats WHERE namespace = ?", (self.namespace,)
+            ).fetchone() or (0, 0)
+            entries, size = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": row[0],
+            "total_misses": row[1],
+            "entries": entries,
+            "bytes": size,
+        }
+
+if __name__ == '__main__':
+    # Prints the lifetime statistics of every namespace in the cache file
+    path = os.path.join(cache_dir(), "responses.sqlite3")
+    if not os.path.exists(path):
+        print(f"No cache file at '{path}'.")
+    else:
+        with sqlite3.connect(path) as connection:
+            for namespace, hits, misses in connection.execute("SELECT namespace, hits, misses FROM stats ORDER BY namespace"):
+                total = hits + misses
+                rate = hits / total * 100 if total else 0.0
+                print(f"{namespace}: {hits} hits, {misses} misses ({rate:.1f}% hit rate)")
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from typing import Dict, List, Optional
+from response_cache import cache_dir
+
+# Stage name -> file holding its output. The image file itself lives in images/.
+STAGE_FILES = {"article": "article.md", "category": "category.txt", "image": "image.txt", "publish": "publish.txt"}
+
+def checkpoint_root() -> str:
+    """Directory holding one run directory per unfinished topic. Override with RUN_CHECKPOINT_DIR."""
+    return os.getenv("RUN_CHECKPOINT_DIR", os.path.join(cache_dir(), "runs"))
+
+def topic_key(topic_line: str) -> str:
+    return hashlib.sha256(topic_line.encode("utf-8")).hexdigest()[:16]
+
+class RunCheckpoint:
+    """
+    The saved stage outputs of one topic, one file per completed stage in the topic's
+    run directory. A file is written atomically and only after its stage succeeded, so
+    a retry can seed the outputs into the pipeline and run only the missing stages.
+    The downloaded image and its variants are moved into the directory as well, and the
+    whole directory is removed once the topic has been published and acked.
+    """
+    def __init__(self, topic_line: str, root: str = None):
+        self.topic_line = topic_line
+        self.path = os.path.join(root or checkpoint_root(), topic_key(topic_line))
+        # Stages finish on parallel threads; topic.json is read, updated and rewritten.
+        self._lock = threading.Lock()
+
+    def _write(self, name: str, text: str) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        temp_path = os.path.join(self.path, f".{name}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, os.path.join(self.path, name))
+
+    def _read(self, name: str) -> Optional[str]:
+        path = os.path.join(self.path, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def info(self) -> Dict:
+        """topic.json: the topic line, when the run directory was created and the last error."""
+        text = self._read("topic.json")
+        return json.loads(text) if text else {}
+
+    def _update_info(self, **fields) -> None:
+        info = self.info() or {"topic": self.topic_line, "created_at": time.time()}
+        info.update(fields, updated_at=time.time())
+        self._write("topic.json", json.dumps(info, ensure_ascii=False, indent=1))
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, "topic.json"))
+
+    def save(self, stage: str, value: str) -> str:
+        """Stores a stage output and returns it; for the image stage, its new path."""
+        if stage == "image":
+            value = self._keep_image(value)
+        with self._lock:
+            self._update_info()
+            self._write(STAGE_FILES[stage], os.path.basename(value) if stage == "image" else value)
+        return value
+
+    def _keep_image(self, image_path: str) -> str:
+        """Moves the main image and its responsive variants into the run directory."""
+        from image_creator import image_variants
+
+        image_dir = os.path.join(self.path, "images")
+        os.makedirs(image_dir, exist_ok=True)
+        for path in [image_path] + [variant["path"] for variant in image_variants(image_path)]:
+            shutil.move(path, os.path.join(image_dir, os.path.basename(path)))
+        return os.path.join(image_dir, os.path.basename(image_path))
+
+    def load(self) -> Dict[str, str]:
+        """The outputs of the stages that completed, by stage name."""
+        outputs = {}
+        for stage, name in STAGE_FILES.items():
+            value = self._read(name)
+            if value is None:
+                continue
+            if stage == "image":
+                value = os.path.join(self.path, "images", value)
+                if not os.path.exists(value):
+                    continue
+            outputs[stage] = value
+        return outputs
+
+    def record_failure(self, error: str) -> None:
+        with self._lock:
+            if self.exists():
+                self._update_info(last_error=error[:2000])
+
+    def remove(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+def list_checkpoints(root: str = None) -> List[RunCheckpoint]:
+    """Every run directory under the root, oldest first."""
+    root = root or checkpoint_root()
+    checkpoints = []
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            info_path = os.path.join(root, name, "topic.json")
+            if os.path.exists(info_path):
+                with open(info_path, 'r', encoding='utf-8') as f:
+                    info = json.load(f)
+                checkpoints.append((info.get("created_at", 0), RunCheckpoint(info["topic"], root)))
+    return [checkpoint for _, checkpoint in sorted(checkpoints, key=lambda item: item[0])]
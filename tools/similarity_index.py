@@ -0,0 +1,334 @@
+import os
+import re
+import math
+import glob
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+from article_parser import parse_article, parse_post
+from category_classifier import tokenize
+from sqlite_store import SQLiteStore
+from topic_queue import TopicQueue, parse_keywords
+
+BODY_TERMS = 15         # the most frequent body words stand in for the body text
+KEY_WEIGHT = 0.8        # share of the score that comes from the primary keyword vs the title
+MIN_KEY_SHINGLES = 3    # a topic with fewer primary-keyword shingles ("Seoul") never matches
+
+class Match(NamedTuple):
+    doc_id: str
+    title: str
+    score: float
+
+class Shingles(NamedTuple):
+    """A document's key shingles (a topic's primary keyword, a post's title) and the rest."""
+    key: FrozenSet[str]
+    context: FrozenSet[str]
+
+def index_path() -> str:
+    """SQLite file backing the similarity index. Override with SIMILARITY_INDEX_PATH."""
+    return os.getenv("SIMILARITY_INDEX_PATH", os.path.join("data", "similarity_index.sqlite3"))
+
+def duplicate_threshold() -> float:
+    """Similarity at or above which a topic counts as a duplicate. Override with DUPLICATE_THRESHOLD."""
+    return float(os.getenv("DUPLICATE_THRESHOLD", "0.6"))
+
+# --- Shingles ---
+
+def _stem(token: str) -> str:
+    """A deliberately crude plural stemmer, enough to match 'alleys' with 'alley'."""
+    return token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+
+def _words(text: str) -> List[str]:
+    # Split CamelCase hashtags (#SeoulTravel) before tokenizing, and drop possessives
+    # so "Seoul's" is "seoul" rather than a stemmed "seoul'".
+    tokens = tokenize(re.sub(r"(?<=[a-z])(?=[A-Z])", " ", text))
+    return [_stem(re.sub(r"'s?$", "", token)) for token in tokens]
+
+def _phrase_shingles(text: str) -> Set[str]:
+    """Words plus adjacent word pairs, so word order inside a title still counts."""
+    words = _words(text)
+    return set(words) | {f"{first} {second}" for first, second in zip(words, words[1:])}
+
+def topic_shingles(primary_keyword: str, secondary_keywords: Iterable[str] = ()) -> Shingles:
+    context = set()
+    for keyword in secondary_keywords:
+        context.update(_words(keyword))
+    return Shingles(frozenset(_phrase_shingles(primary_keyword)), frozenset(context))
+
+def post_shingles(title: str, tags: Iterable[str] = (), body: str = "") -> Shingles:
+    context = set()
+    for tag in tags:
+        context.update(_words(tag))
+    body_words = Counter(word for word in _words(body) if len(word) > 3)
+    context.update(word for word, _ in body_words.most_common(BODY_TERMS))
+    return Shingles(frozenset(_phrase_shingles(title)), frozenset(context))
+
+class ShingleIndex:
+    """
+    In-memory inverted index from shingle to documents. A query scores only the
+    documents that share a shingle with it, by how much of the topic each one covers
+    with every shingle weighted by its IDF, so a rare place name outweighs "local",
+    "tips" or "hidden" that half the blog uses:
+
+        KEY_WEIGHT * covered(topic key by doc key) + (1 - KEY_WEIGHT) * covered(topic context by doc)
+
+    The key part is the primary keyword against a title; secondary keywords and tags
+    alone can never reach the default threshold.
+    """
+    def __init__(self):
+        self.docs: Dict[str, Tuple[str, Shingles]] = {}
+        self.postings: Dict[str, Set[str]] = {}
+
+    def add(self, doc_id: str, title: str, shingles: Shingles) -> None:
+        self.remove(doc_id)
+        self.docs[doc_id] = (title, shingles)
+        for shingle in shingles.key | shingles.context:
+            self.postings.setdefault(shingle, set()).add(doc_id)
+
+    def remove(self, doc_id: str) -> None:
+        if doc_id not in self.docs:
+            return
+        _, shingles = self.docs.pop(doc_id)
+        for shingle in shingles.key | shingles.context:
+            doc_ids = self.postings.get(shingle)
+            if doc_ids is not None:
+                doc_ids.discard(doc_id)
+                if not doc_ids:
+                    del self.postings[shingle]
+
+    def idf(self, shingle: str) -> float:
+        """Smoothed inverse document frequency; a shingle no document has weighs the most."""
+        return math.log((len(self.docs) + 1) / (len(self.postings.get(shingle, ())) + 1)) + 1
+
+    def query(self, shingles: Shingles, threshold: float = 0.0,
+              idf: Optional[Callable[[str], float]] = None) -> List[Match]:
+        """Documents scoring at or above the threshold, best first. `idf` defaults to this index's."""
+        if len(shingles.key) < MIN_KEY_SHINGLES:
+            return []
+        idf = idf or self.idf
+        weights = {shingle: idf(shingle) for shingle in shingles.key | shingles.context}
+
+        def covered(wanted: FrozenSet[str], present: FrozenSet[str]) -> float:
+            total = sum(weights[shingle] for shingle in wanted)
+            return sum(weights[shingle] for shingle in wanted & present) / total if total else 0.0
+
+        candidates = {doc_id for shingle in weights for doc_id in self.postings.get(shingle, ())}
+        matches = []
+        for doc_id in candidates:
+            title, other = self.docs[doc_id]
+            key_score = covered(shingles.key, other.key)
+            context_score = covered(shingles.context, other.key | other.context) if shingles.context else key_score
+            score = KEY_WEIGHT * key_score + (1 - KEY_WEIGHT) * context_score
+            if score >= threshold:
+                matches.append(Match(doc_id, title, score))
+        return sorted(matches, key=lambda match: -match.score)
+
+# --- Persistent index of published posts ---
+
+class SimilarityIndex(SQLiteStore):
+    """
+    The shingle sets of every published post, persisted in SQLite and held in an
+    inverted index in memory. sync_posts() indexes _posts/*.md incrementally (only files
+    whose content changed are re-shingled), add_post() records a post as it is published,
+    and check_topic() answers in well under a millisecond once the index is loaded.
+    """
+    def __init__(self, path: str = None, threshold: float = None):
+        self.path = path or index_path()
+        self.threshold = duplicate_threshold() if threshold is None else threshold
+        self.index: Optional[ShingleIndex] = None
+        self._lock = threading.RLock()
+
+    def _create_schema(self, connection: sqlite3.Connection) -> None:
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(posts)")}
+        if columns and "key_shingles" not in columns:
+            # An index from an older scoring scheme: derived data, rebuilt by the next sync.
+            connection.execute("DROP TABLE posts")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS posts (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                key_shingles TEXT NOT NULL,
+                context_shingles TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                mtime REAL,
+                updated_at REAL NOT NULL
+            )""")
+
+    def load(self) -> ShingleIndex:
+        """Reads every stored shingle set into the inverted index (once per process)."""
+        with self._lock:
+            if self.index is None:
+                index = ShingleIndex()
+                with self._transaction() as connection:
+                    for doc_id, title, key, context in connection.execute(
+                            "SELECT id, title, key_shingles, context_shingles FROM posts"):
+                        index.add(doc_id, title, Shingles(frozenset(key.split("\n")) - {""},
+                                                          frozenset(context.split("\n")) - {""}))
+                self.index = index
+            return self.index
+
+    def _store(self, connection, doc_id: str, title: str, shingles: Shingles, content_hash: str, mtime: Optional[float]) -> None:
+        connection.execute(
+            "INSERT OR REPLACE INTO posts (id, title, key_shingles, context_shingles, content_hash, mtime, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (doc_id, title, "\n".join(sorted(shingles.key)), "\n".join(sorted(shingles.context)),
+             content_hash, mtime, time.time()),
+        )
+        self.index.add(doc_id, title, shingles)
+
+    @staticmethod
+    def _post_parts(content: str) -> Tuple[str, Shingles]:
+        front_matter, body = parse_post(content)
+        article = parse_article(body)
+        title = front_matter.get("title") or article["title"]
+        return title, post_shingles(title, article["tags"], body)
+
+    def add_post(self, doc_id: str, content: str, mtime: Optional[float] = None) -> None:
+        """Indexes (or re-indexes) one rendered post under its repository path."""
+        title, shingles = self._post_parts(content)
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        self.load()  # before the write transaction, which would block load's own connection
+        with self._lock, self._transaction() as connection:
+            self._store(connection, doc_id, title, shingles, content_hash, mtime)
+
+    def sync_posts(self, posts_dir: str = "_posts") -> Dict[str, int]:
+        """
+        Brings the index up to date with the local posts. Unchanged files are skipped by
+        mtime, then by content hash (a fresh checkout touches every mtime, which is not
+        written back, so a CI run leaves the committed file alone). Posts that were indexed
+        from a local file which no longer exists are dropped; posts recorded at publish
+        time without a local copy are kept.
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        paths = {f"{posts_dir.rstrip('/')}/{os.path.basename(path)}": path
+                 for path in glob.glob(os.path.join(posts_dir, "*.md"))}
+        self.load()
+        with self._lock, self._transaction() as connection:
+            known = {row[0]: (row[1], row[2]) for row in connection.execute("SELECT id, content_hash, mtime FROM posts")}
+            for doc_id, path in paths.items():
+                mtime = os.path.getmtime(path)
+                if doc_id in known and known[doc_id][1] == mtime:
+                    continue
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                if doc_id in known and known[doc_id][0] == content_hash:
+                    continue
+                title, shingles = self._post_parts(content)
+                self._store(connection, doc_id, title, shingles, content_hash, mtime)
+                counts["updated" if doc_id in known else "added"] += 1
+            for doc_id, (_, mtime) in known.items():
+                if mtime is not None and doc_id.startswith(f"{posts_dir.rstrip('/')}/") and doc_id not in paths:
+                    connection.execute("DELETE FROM posts WHERE id = ?", (doc_id,))
+                    self.index.remove(doc_id)
+                    counts["removed"] += 1
+        return counts
+
+    def similar_posts(self, primary_keyword: str, secondary_keywords: Iterable[str] = ()) -> List[Match]:
+        """Published posts at or above the threshold for a topic, most similar first."""
+        return self.load().query(topic_shingles(primary_keyword, secondary_keywords), self.threshold)
+
+    def check_topic(self, primary_keyword: str, secondary_keywords: Iterable[str] = ()) -> Optional[Match]:
+        """The most similar published post if the topic is a near duplicate, else None."""
+        matches = self.similar_posts(primary_keyword, secondary_keywords)
+        return matches[0] if matches else None
+
+    def dedupe_topics(self, topics: List[Tuple[str, str, List[str]]]) -> List[Tuple[str, Match]]:
+        """
+        One pass over (key, primary, secondary) topics in queue order. A topic is a
+        duplicate if it matches a published post or a topic kept earlier in the pass.
+        Returns (key, match) for every duplicate.
+        """
+        posts = self.load()
+        kept = ShingleIndex()
+        duplicates = []
+        for key, primary_keyword, secondary_keywords in topics:
+            shingles = topic_shingles(primary_keyword, secondary_keywords)
+            # Earlier topics are weighted by how common their words are in the blog, too.
+            matches = posts.query(shingles, self.threshold) + kept.query(shingles, self.threshold, posts.idf)
+            if matches:
+                duplicates.append((key, max(matches, key=lambda match: match.score)))
+            else:
+                kept.add(f"queue:{key}", primary_keyword, shingles)
+        return duplicates
+
+    def stats(self) -> Dict[str, int]:
+        index = self.load()
+        return {"posts": len(index.docs), "shingles": len(index.postings)}
+
+_index: Optional[SimilarityIndex] = None
+_index_lock = threading.Lock()
+
+def get_index() -> SimilarityIndex:
+    """The process-wide index at the default path."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex()
+        return _index
+
+def index_published_post(repo_path: str, content: str) -> None:
+    """Called after a successful publish; an index failure never fails the publish."""
+    try:
+        get_index().add_post(repo_path, content)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: Could not add '{repo_path}' to the similarity index - {e}")
+
+def dedupe_queue(dry_run: bool = False) -> List[Tuple[str, Match]]:
+    """
+    Marks every pending queue topic that duplicates a post or an earlier topic, and
+    releases any images an earlier attempt at it claimed.
+    """
+    from image_creator import ImageLedger
+
+    queue = TopicQueue()
+    pending = queue.pending()
+    topics = [(topic.id, *parse_keywords(topic.line)) for topic in pending]
+    duplicates = get_index().dedupe_topics(topics)
+    lines = {topic.id: topic.line for topic in pending}
+    for topic_id, match in duplicates:
+        if not dry_run:
+            queue.mark_duplicate(topic_id, f"Duplicate: {match.score:.0%} similar to '{match.title}' ({match.doc_id})")
+            ImageLedger().release_topic(lines[topic_id])
+    return [(lines[topic_id], match) for topic_id, match in duplicates]
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point, also reached through `agent_studio.py dedupe`."""
+    parser = argparse.ArgumentParser(description="Near-duplicate detection over published posts and the topic queue.")
+    parser.add_argument("command", choices=["sync", "check", "queue", "stats"])
+    parser.add_argument("topic", nargs="?", help="Topic line or keyword for `check`.")
+    parser.add_argument("--posts", default="_posts")
+    parser.add_argument("--dry-run", action="store_true", help="For `queue`: report duplicates without marking them.")
+    args = parser.parse_args(argv)
+
+    index = get_index()
+    if args.command == "sync":
+        counts = index.sync_posts(args.posts)
+        print(f"Indexed {counts['added']} new and {counts['updated']} changed post(s), removed {counts['removed']}.")
+    elif args.command == "check":
+        if not args.topic:
+            parser.error("check needs a topic")
+        primary_keyword, secondary_keywords = parse_keywords(args.topic)
+        index.sync_posts(args.posts)
+        started = time.perf_counter()
+        matches = index.similar_posts(primary_keyword or args.topic, secondary_keywords)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for match in matches:
+            print(f"{match.score:.2f}  {match.title}  ({match.doc_id})")
+        print(f"{len(matches)} similar post(s) at threshold {index.threshold:.2f}, checked in {elapsed_ms:.2f} ms.")
+    elif args.command == "queue":
+        index.sync_posts(args.posts)
+        duplicates = dedupe_queue(args.dry_run)
+        for line, match in duplicates:
+            print(f"{match.score:.2f}  {line}\n      ~ {match.title} ({match.doc_id})")
+        verb = "Found" if args.dry_run else "Marked"
+        print(f"{verb} {len(duplicates)} duplicate topic(s) in the queue.")
+    else:
+        print(", ".join(f"{key}: {value}" for key, value in index.stats().items()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import argparse
+from contextlib import closing, contextmanager, nullcontext
+from typing import List, Optional
+
+class SQLiteStore:
+    """
+    Base of the SQLite-backed stores (topic queue, image ledger, batch store, similarity
+    index, response cache). Subclasses set `path` and create their tables in
+    _create_schema(); _transaction() opens a connection, runs the schema setup and yields
+    it inside an IMMEDIATE transaction: the write lock is taken up front, so concurrent
+    processes never race, and everything is rolled back if the block raises. A subclass
+    that also shares an instance between threads sets `_lock`, which is held throughout.
+    """
+    path: str
+    _lock = None
+
+    def _create_schema(self, connection: sqlite3.Connection) -> None:
+        """Creates the tables if they do not exist yet. Runs outside the transaction."""
+
+    @contextmanager
+    def _transaction(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock or nullcontext():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            try:
+                self._create_schema(connection)
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    yield connection
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+            finally:
+                connection.close()
+
+def checkpoint(path: str) -> None:
+    """Moves everything in the write-ahead log into the database file and empties the log."""
+    with closing(sqlite3.connect(path, timeout=30)) as connection:
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def same_rows(path: str, other_path: str) -> bool:
+    """True when both database files hold the same schema and rows, however their pages are laid out."""
+    dumps = []
+    for database in (path, other_path):
+        with closing(sqlite3.connect(database)) as connection:
+            dumps.append(list(connection.iterdump()))
+    return dumps[0] == dumps[1]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    `checkpoint DB...` folds any write-ahead log into the files before they are committed;
+    `compare DB OTHER` exits with 0 when both hold the same rows, 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Prepare the SQLite stores for committing.")
+    parser.add_argument("command", choices=["checkpoint", "compare"])
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "checkpoint":
+        for path in args.paths:
+            checkpoint(path)
+        return 0
+    if len(args.paths) != 2:
+        parser.error("compare takes exactly two database files")
+    return 0 if same_rows(*args.paths) else 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
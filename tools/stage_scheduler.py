@@ -0,0 +1,121 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+class StageError(Exception):
+    """Raised by a stage function to mark the stage as failed with a readable message."""
+
+class Stage:
+    """
+    A single pipeline step. `inputs` names the context values the function needs;
+    they are passed as keyword arguments and the return value is stored under `name`.
+    A stage with `required=False` stores None on failure so its dependents still run.
+    A stage listing `emits` receives an `emit(name, value)` keyword argument and can
+    publish those intermediate outputs before it finishes, so dependents start early.
+    """
+    def __init__(self, name: str, func: Callable[..., Any], inputs: Iterable[str] = (), required: bool = True, emits: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.required = required
+        self.emits = tuple(emits)
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r}, inputs={self.inputs!r})"
+
+def _validate(stages: List[Stage], context: Dict[str, Any]) -> None:
+    """Rejects duplicate names, unknown inputs and dependency cycles before anything runs."""
+    names = [stage.name for stage in stages]
+    outputs = names + [name for stage in stages for name in stage.emits]
+    if len(outputs) != len(set(outputs)):
+        raise ValueError(f"Duplicate stage outputs: {outputs}")
+
+    available = set(context) | set(outputs)
+    for stage in stages:
+        missing = [name for name in stage.inputs if name not in available]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' needs unknown input(s): {', '.join(missing)}")
+
+    resolved = set(context)
+    pending = list(stages)
+    while pending:
+        ready = [stage for stage in pending if all(name in resolved for name in stage.inputs)]
+        if not ready:
+            raise ValueError(f"Dependency cycle between stages: {[stage.name for stage in pending]}")
+        for stage in ready:
+            resolved.add(stage.name)
+            resolved.update(stage.emits)
+        pending = [stage for stage in pending if stage not in ready]
+
+def run_stages(stages: List[Stage], context: Dict[str, Any], max_workers: Optional[int] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Runs every stage as soon as all of its inputs are available, so independent stages
+    overlap and the total latency is the longest dependency chain rather than the sum.
+    Returns the final context (initial values plus stage outputs) and a name -> error map.
+    """
+    _validate(stages, context)
+    context = dict(context)
+    errors: Dict[str, str] = {}
+    pending = list(stages)
+    blocked = set()
+    finished = []
+    changed = threading.Condition()
+
+    def make_emit(stage: Stage) -> Callable[[str, Any], None]:
+        def emit(name: str, value: Any) -> None:
+            if name not in stage.emits:
+                raise ValueError(f"Stage '{stage.name}' does not declare the output '{name}'.")
+            with changed:
+                context[name] = value
+                changed.notify()
+        return emit
+
+    def on_done(stage: Stage, future) -> None:
+        with changed:
+            finished.append((stage, future))
+            changed.notify()
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(stages))) as executor:
+        running = 0
+        with changed:
+            while True:
+                for stage in list(pending):
+                    if any(name in blocked for name in stage.inputs):
+                        errors[stage.name] = f"Skipped: an input of '{stage.name}' failed."
+                        blocked.add(stage.name)
+                        pending.remove(stage)
+                    elif all(name in context for name in stage.inputs):
+                        kwargs = {name: context[name] for name in stage.inputs}
+                        if stage.emits:
+                            kwargs["emit"] = make_emit(stage)
+                        future = executor.submit(stage.func, **kwargs)
+                        future.add_done_callback(lambda f, stage=stage: on_done(stage, f))
+                        running += 1
+                        pending.remove(stage)
+
+                if not running and not finished:
+                    break
+
+                # Wake up when a stage finishes or emits an intermediate output.
+                if not finished:
+                    changed.wait()
+
+                while finished:
+                    stage, future = finished.pop(0)
+                    running -= 1
+                    try:
+                        context[stage.name] = future.result()
+                    except Exception as e:
+                        errors[stage.name] = str(e) if isinstance(e, StageError) else f"{type(e).__name__}: {e}"
+                        if stage.required:
+                            blocked.add(stage.name)
+                        else:
+                            context[stage.name] = None
+                    for name in stage.emits:
+                        if name not in context:
+                            if stage.required and stage.name in blocked:
+                                blocked.add(name)
+                            else:
+                                context[name] = None
+
+    return context, errors
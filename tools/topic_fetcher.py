@@ -1,4 +1,19 @@
 import os
+from typing import List
+from topic_queue import TopicQueue
+
+def fetch_topics(count: int) -> List[str]:
+    """
+    topics.txt 파일을 큐에 동기화한 뒤 다음 포스팅 주제를 최대 count개 가져오고, 완료 처리합니다.
+    실패 시 재시도가 필요하면 TopicQueue의 claim/ack/nack을 직접 사용하세요.
+    """
+    queue = TopicQueue()
+    queue.import_file('topics.txt')
+    topics = queue.claim(count)
+    for topic in topics:
+        queue.ack(topic.id)
+    queue.export_file('topics.txt')
+    return [topic.line for topic in topics]
 
 def fetch_topic() -> str:
     """
@@ -7,18 +22,10 @@ def fetch_topic() -> str:
     """
     file_path = 'topics.txt'
     try:
-        with open(file_path, 'r+', encoding='utf-8') as f:
-            lines = f.readlines()
-            if not lines:
-                return "처리할 주제가 없습니다."
-
-            topic = lines[0].strip()
-
-            f.seek(0)
-            f.writelines(lines[1:])
-            f.truncate()
-
-            return topic
+        topics = fetch_topics(1)
+        if not topics:
+            return "처리할 주제가 없습니다."
+        return topics[0]
     except FileNotFoundError:
         return f"오류: {file_path} 파일을 찾을 수 없습니다."
     except Exception as e:
@@ -0,0 +1,234 @@
+import os
+import re
+import socket
+import time
+import sqlite3
+import argparse
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlite_store import SQLiteStore
+
+class Topic(NamedTuple):
+    id: int
+    line: str
+    attempts: int
+
+def parse_keywords(topic_line: str) -> Tuple[str, List[str]]:
+    """Helper function to parse keywords from a string."""
+    primary_match = re.search(r"Primary:\s*(.*?)(;|$)", topic_line)
+    secondary_match = re.search(r"Secondary:\s*(.*)", topic_line)
+    primary_keyword = primary_match.group(1).strip() if primary_match else ""
+    if secondary_match and secondary_match.group(1):
+        secondary_keywords: List[str] = [kw.strip() for kw in secondary_match.group(1).split(',')]
+    else:
+        secondary_keywords: List[str] = []
+    return primary_keyword, secondary_keywords
+
+def queue_path() -> str:
+    """SQLite file backing the topic queue. Override with TOPIC_QUEUE_PATH."""
+    return os.getenv("TOPIC_QUEUE_PATH", os.path.join("data", "topic_queue.sqlite3"))
+
+class TopicQueue(SQLiteStore):
+    """
+    A durable topic queue with leases. claim() hands out pending topics atomically, so
+    concurrent workers never take the same one; ack() marks a topic done, nack() returns
+    it to the queue until it has failed `max_attempts` times. A claimed topic whose lease
+    expires (the worker died) becomes pending again on the next claim.
+    topics.txt stays the human-editable source: import_file() syncs it in, export_file()
+    writes the remaining pending topics back out.
+    """
+    def __init__(self, path: str = None, lease_seconds: int = None, max_attempts: int = None):
+        self.path = path or queue_path()
+        self.lease_seconds = lease_seconds or int(os.getenv("TOPIC_LEASE_SECONDS", "3600"))
+        self.max_attempts = max_attempts or int(os.getenv("TOPIC_MAX_ATTEMPTS", "3"))
+
+    def _create_schema(self, connection: sqlite3.Connection) -> None:
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS topics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                line TEXT NOT NULL UNIQUE,
+                status TEXT NOT NULL DEFAULT 'pending',
+                position INTEGER NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_until REAL,
+                worker TEXT,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )""")
+        connection.execute("CREATE INDEX IF NOT EXISTS topics_status_position ON topics (status, position)")
+
+    def import_file(self, file_path: str = 'topics.txt', prune: bool = True) -> Dict[str, int]:
+        """
+        Adds every line of the file that the queue has never seen, in file order. With
+        prune, pending topics that were deleted from the file are dropped from the queue.
+        Done or failed topics are never re-added, so a stale topics.txt cannot repeat a post.
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip()]
+
+        now = time.time()
+        added = pruned = 0
+        with self._transaction() as connection:
+            known = {row[0]: row[1] for row in connection.execute("SELECT line, status FROM topics")}
+            position = connection.execute("SELECT COALESCE(MAX(position), 0) FROM topics").fetchone()[0]
+            for line in lines:
+                if line in known:
+                    continue
+                position += 1
+                connection.execute(
+                    "INSERT INTO topics (line, position, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                    (line, position, now, now),
+                )
+                known[line] = "pending"
+                added += 1
+            if prune:
+                in_file = set(lines)
+                for line, status in known.items():
+                    if status == "pending" and line not in in_file:
+                        connection.execute("DELETE FROM topics WHERE line = ?", (line,))
+                        pruned += 1
+        return {"added": added, "pruned": pruned}
+
+    def export_file(self, file_path: str = 'topics.txt') -> int:
+        """Rewrites the file with the topics that are still pending or in flight, in queue order."""
+        with self._transaction() as connection:
+            lines = [row[0] for row in connection.execute(
+                "SELECT line FROM topics WHERE status IN ('pending', 'claimed') ORDER BY position"
+            )]
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.writelines(f"{line}\n" for line in lines)
+        return len(lines)
+
+    def claim(self, count: int = 1, worker: Optional[str] = None) -> List[Topic]:
+        """Atomically leases up to `count` pending topics to this worker."""
+        now = time.time()
+        worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE topics SET status = 'pending', worker = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE status = 'claimed' AND lease_until < ?",
+                (now, now),
+            )
+            rows = connection.execute(
+                "SELECT id, line, attempts FROM topics WHERE status = 'pending' ORDER BY position LIMIT ?",
+                (count,),
+            ).fetchall()
+            for topic_id, _, _ in rows:
+                connection.execute(
+                    "UPDATE topics SET status = 'claimed', worker = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                    (worker, now + self.lease_seconds, now, topic_id),
+                )
+        return [Topic(*row) for row in rows]
+
+    def claim_lines(self, lines: List[str], worker: Optional[str] = None) -> List[Topic]:
+        """
+        Leases the given topics out of queue order, including ones that used up their
+        attempts, e.g. to resume them by hand. Done, parked and live-claimed topics are left alone.
+        """
+        now = time.time()
+        worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        topics = []
+        with self._transaction() as connection:
+            for line in lines:
+                row = connection.execute(
+                    "SELECT id, line, attempts FROM topics WHERE line = ? AND "
+                    "(status IN ('pending', 'failed') OR (status = 'claimed' AND lease_until < ?))",
+                    (line, now),
+                ).fetchone()
+                if row:
+                    connection.execute(
+                        "UPDATE topics SET status = 'claimed', worker = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                        (worker, now + self.lease_seconds, now, row[0]),
+                    )
+                    topics.append(Topic(*row))
+        return topics
+
+    def extend(self, topic_id: int, lease_seconds: int) -> None:
+        """Pushes a claimed topic's lease further out, e.g. while an offline job runs."""
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE topics SET lease_until = ?, updated_at = ? WHERE id = ? AND status = 'claimed'",
+                (now + lease_seconds, now, topic_id),
+            )
+
+    def ack(self, topic_id: int) -> None:
+        """Marks a claimed topic as done."""
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE topics SET status = 'done', lease_until = NULL, last_error = NULL, updated_at = ? WHERE id = ?",
+                (time.time(), topic_id),
+            )
+
+    def nack(self, topic_id: int, error: str = "") -> str:
+        """
+        Returns a failed topic to the queue at its original position, or parks it as
+        'failed' once it has used up its attempts. Returns the new status.
+        """
+        with self._transaction() as connection:
+            attempts = connection.execute("SELECT attempts FROM topics WHERE id = ?", (topic_id,)).fetchone()[0] + 1
+            status = "failed" if attempts >= self.max_attempts else "pending"
+            connection.execute(
+                "UPDATE topics SET status = ?, attempts = ?, last_error = ?, worker = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (status, attempts, error[:2000], time.time(), topic_id),
+            )
+        return status
+
+    def pending(self) -> List[Topic]:
+        """Pending topics in queue order, without claiming them."""
+        with self._transaction() as connection:
+            return [Topic(*row) for row in connection.execute(
+                "SELECT id, line, attempts FROM topics WHERE status = 'pending' ORDER BY position"
+            )]
+
+    def mark_duplicate(self, topic_id: int, reason: str) -> None:
+        """Parks a topic that would repeat an existing post; it is never claimed or re-imported."""
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE topics SET status = 'duplicate', last_error = ?, worker = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (reason[:2000], time.time(), topic_id),
+            )
+
+    def requeue_failed(self) -> int:
+        """Gives every failed topic a fresh set of attempts."""
+        with self._transaction() as connection:
+            return connection.execute(
+                "UPDATE topics SET status = 'pending', attempts = 0, updated_at = ? WHERE status = 'failed'",
+                (time.time(),),
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._transaction() as connection:
+            return {status: count for status, count in connection.execute(
+                "SELECT status, COUNT(*) FROM topics GROUP BY status"
+            )}
+
+    def failed(self) -> List[tuple]:
+        with self._transaction() as connection:
+            return connection.execute(
+                "SELECT id, line, attempts, last_error FROM topics WHERE status = 'failed' ORDER BY position"
+            ).fetchall()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point, also reached through `agent_studio.py queue`."""
+    parser = argparse.ArgumentParser(description="Manage the durable topic queue.")
+    parser.add_argument("command", choices=["import", "export", "status", "requeue-failed"])
+    parser.add_argument("--file", default="topics.txt")
+    args = parser.parse_args(argv)
+
+    queue = TopicQueue()
+    if args.command == "import":
+        result = queue.import_file(args.file)
+        print(f"Imported {result['added']} new topic(s), dropped {result['pruned']} removed from '{args.file}'.")
+    elif args.command == "export":
+        print(f"Wrote {queue.export_file(args.file)} pending topic(s) to '{args.file}'.")
+    elif args.command == "requeue-failed":
+        print(f"Requeued {queue.requeue_failed()} failed topic(s).")
+    else:
+        counts = queue.counts()
+        print(", ".join(f"{status}: {count}" for status, count in sorted(counts.items())) or "The queue is empty.")
+        for topic_id, line, attempts, last_error in queue.failed():
+            print(f"  failed #{topic_id} after {attempts} attempt(s): {line}\n    {last_error}")
+
+if __name__ == '__main__':
+    main()